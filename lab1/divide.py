@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 from random import randint
-from sys import stderr
+from sys import argv, stderr, stdin, stdout
 
 from logger_config import logger
 
@@ -19,5 +19,29 @@ def main():
         exit(1)
 
 
+def stream():
+    """
+    Потоковый режим: делит каждое число из входа на случайное
+    и печатает результаты по мере чтения. Ошибочные значения
+    пропускаются с сообщением в stderr.
+    """
+    count = 0
+
+    for line in stdin:
+        try:
+            res = int(line) / randint(-10, 10)
+        except (ZeroDivisionError, ValueError) as exc:
+            print(exc, file=stderr)
+            continue
+
+        stdout.write(f"{res}\n")
+        count += 1
+
+    logger.debug(f"Divided {count} numbers")
+
+
 if __name__ == "__main__":
-    main()
+    if argv[1:2] == ["--stream"]:
+        stream()
+    else:
+        main()
@@ -1,5 +1,8 @@
 #!/usr/bin/python3
+import os
+from itertools import repeat
 from random import randint
+from sys import argv, stdout
 
 from logger_config import logger
 
@@ -10,5 +13,27 @@ def main():
     print(a)
 
 
+def stream(count=None):
+    """
+    Потоковый режим: печатает `count` случайных чисел по одному
+    в строке (без `count` - пока следующий процесс читает вывод).
+    """
+    try:
+        stdout.writelines(
+            f"{randint(-10, 10)}\n"
+            for _ in (repeat(None) if count is None else range(count))
+        )
+        stdout.flush()
+    except BrokenPipeError:
+        # Следующий процесс завершился: остаток буфера некуда записать
+        os.dup2(os.open(os.devnull, os.O_WRONLY), stdout.fileno())
+        return
+
+    logger.debug(f"Generated {count} numbers")
+
+
 if __name__ == "__main__":
-    main()
+    if argv[1:2] == ["--stream"]:
+        stream(int(argv[2]) if len(argv) > 2 else None)
+    else:
+        main()
@@ -1,9 +1,12 @@
 #!/usr/bin/python3
 from math import sqrt
-from sys import stderr
+from sys import argv, stderr, stdin
 
 from logger_config import logger
 
+# Размер буфера output.txt в потоковом режиме
+BUFFER_SIZE = 1 << 16
+
 
 def main():
     try:
@@ -20,5 +23,30 @@ def main():
         exit(1)
 
 
+def stream():
+    """
+    Потоковый режим: дописывает корни чисел из входа в output.txt,
+    который открыт один раз на весь поток. Ошибочные значения
+    пропускаются с сообщением в stderr.
+    """
+    count = 0
+
+    with open("output.txt", "a", buffering=BUFFER_SIZE) as file:
+        for line in stdin:
+            try:
+                res = sqrt(float(line))
+            except ValueError as exc:
+                print(exc, file=stderr)
+                continue
+
+            file.write(f"{res}\n")
+            count += 1
+
+    logger.debug(f"Wrote {count} roots")
+
+
 if __name__ == "__main__":
-    main()
+    if argv[1:2] == ["--stream"]:
+        stream()
+    else:
+        main()
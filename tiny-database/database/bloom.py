@@ -0,0 +1,108 @@
+import hashlib
+from math import ceil, log
+from operator import itemgetter
+from typing import Any, BinaryIO, Iterable, Mapping, Optional
+
+# Доля ложноположительных ответов фильтра, заполненного до capacity ключей
+ERROR_RATE = 0.01
+
+
+def _normalize(key: Any) -> Any:
+    """
+    Приводит равные числа к одному виду: 1, 1.0 и True - равные ключи
+    словаря, поэтому и в фильтре они должны давать одинаковые биты.
+    """
+    if isinstance(key, tuple):
+        return tuple(map(_normalize, key))
+
+    if isinstance(key, bool) or isinstance(key, float) and key.is_integer():
+        return int(key)
+
+    return key
+
+
+def digest(key: Any, size: int) -> bytes:
+    """
+    Хеш ключа длиной `size` байт. В отличие от `hash` он одинаков
+    во всех процессах, поэтому построенные по нему структуры можно
+    сохранять в файлы.
+    """
+    return hashlib.blake2b(
+        repr(_normalize(key)).encode(), digest_size=size
+    ).digest()
+
+
+class BloomFilter:
+    """
+    Фильтр Блума по одному или нескольким столбцам таблицы.
+
+    Отвечает, что ключа точно нет или что он, возможно, есть, и позволяет
+    не искать заведомо отсутствующие ключи. Ключи только добавляются:
+    ключи удаленных строк остаются в фильтре до его перестроения.
+    Биты выбираются по `digest` ключа, а не по `hash`, поэтому фильтр,
+    сохраненный в файл, действует и в других процессах.
+    """
+
+    def __init__(self, attrs: tuple[str, ...], capacity: int) -> None:
+        self.attrs = attrs
+        self.key = itemgetter(*attrs)
+        self.capacity = max(capacity, 64)
+        self.size = ceil(-self.capacity * log(ERROR_RATE) / log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * log(2)))
+        self.bits = bytearray(-(-self.size // 8))
+        self.count = 0
+
+    def _positions(self, key: Any) -> Iterable[int]:
+        key_digest = digest(key, 16)
+        # Двойное хеширование: i-й бит - h1 + i * h2
+        h1 = int.from_bytes(key_digest[:8], "little")
+        h2 = int.from_bytes(key_digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: Any) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+        self.count += 1
+
+    def __contains__(self, key: Any) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def build(self, data: Iterable[Optional[Mapping[str, Any]]]) -> None:
+        """Добавляет ключи строк, пропуская удаленные."""
+        for row in data:
+            if row is not None:
+                self.add(self.key(row))
+
+
+def dump_filters(blooms: Iterable[BloomFilter], f: BinaryIO) -> None:
+    """
+    Записывает фильтры в файл: для каждого - строка заголовка
+    со столбцами, вместимостью и числом ключей, затем биты фильтра.
+    """
+    for bloom in blooms:
+        header = f"{','.join(bloom.attrs)} {bloom.capacity} {bloom.count}\n"
+        f.write(header.encode())
+        f.write(bloom.bits)
+
+
+def load_filters(f: BinaryIO) -> dict[tuple[str, ...], BloomFilter]:
+    """Читает фильтры, записанные `dump_filters`. Поврежденный файл - ValueError."""
+    blooms = {}
+
+    while header := f.readline():
+        attrs, capacity, count = header.decode().split()
+        bloom = BloomFilter(tuple(attrs.split(",")), int(capacity))
+        bits = f.read(len(bloom.bits))
+
+        if bloom.capacity != int(capacity) or len(bits) != len(bloom.bits):
+            raise ValueError("Bloom filter file is truncated or corrupted.")
+
+        bloom.bits = bytearray(bits)
+        bloom.count = int(count)
+        blooms[bloom.attrs] = bloom
+
+    return blooms
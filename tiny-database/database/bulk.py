@@ -0,0 +1,75 @@
+import csv
+import os
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+from database import protocol
+
+# Форматы файлов импорта и экспорта: CSV с заголовком или JSON Lines,
+# строки которого кодируются как сообщения протокола сервера
+FORMATS = ("csv", "jsonl")
+
+
+def detect_format(path: str, file_format: Optional[str] = None) -> str:
+    """Формат файла: указанный явно или по расширению файла."""
+    if file_format is None:
+        file_format = os.path.splitext(path)[1].lstrip(".").lower()
+
+    if file_format not in FORMATS:
+        raise ValueError(
+            f"File format '{file_format}' is not supported, "
+            f"use one of {FORMATS}."
+        )
+
+    return file_format
+
+
+def read_file(
+    path: str, file_format: Optional[str] = None
+) -> Iterator[dict[str, Any]]:
+    """
+    Читает строки файла по одной, не загружая его целиком. Значения
+    CSV-файла - строки, значения JSONL-файла - значения JSON и даты.
+    """
+    if detect_format(path, file_format) == "csv":
+        with open(path, "r", newline="") as f:
+            yield from csv.DictReader(f)
+
+        return
+
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield protocol.decode(line)
+
+
+def write_file(
+    path: str,
+    rows: Iterable[Mapping[str, Any]],
+    file_format: Optional[str] = None,
+) -> int:
+    """
+    Записывает строки в файл по мере их получения и возвращает их
+    число. Заголовок CSV-файла берется из столбцов первой строки.
+    """
+    count = 0
+
+    if detect_format(path, file_format) == "jsonl":
+        with open(path, "wb") as f:
+            for row in rows:
+                f.write(protocol.encode(row))
+                count += 1
+
+        return count
+
+    with open(path, "w", newline="") as f:
+        writer: Optional[csv.DictWriter] = None
+
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                writer.writeheader()
+
+            writer.writerow(dict(row))
+            count += 1
+
+    return count
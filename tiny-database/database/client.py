@@ -0,0 +1,221 @@
+import queue
+import socket
+from contextlib import suppress
+from typing import Any, Literal, Optional
+
+from database import protocol
+from database.server import Address
+
+# Сколько байт запросов пачки отправляется, прежде чем читаются ответы
+# на них. Запросы окна помещаются в буферы сокетов, поэтому сервер
+# успевает их прочитать, даже если клиент еще не читает ответы.
+# Без окон большая пачка блокирует обе стороны в записи в сокет
+WINDOW_SIZE = 1 << 15
+
+
+class _Methods:
+    """Методы Database, вызываемые через сервер."""
+
+    def _call(self, method: str, args: tuple, kwargs: dict[str, Any]) -> Any:
+        raise NotImplementedError  # pragma: no cover
+
+    def insert(
+        self, table_name: str, data: str, *, sep: Literal[" ", ","] = " "
+    ) -> Any:
+        return self._call("insert", (table_name, data), {"sep": sep})
+
+    def update(
+        self, table_name: str, where: dict[str, Any], values: dict[str, Any]
+    ) -> Any:
+        return self._call("update", (table_name, where, values), {})
+
+    def delete(self, table_name: str, where: dict[str, Any]) -> Any:
+        return self._call("delete", (table_name, where), {})
+
+    def select(self, table_name: str, *args, **kwargs) -> Any:
+        return self._call("select", (table_name, *args), kwargs)
+
+    def join(
+        self,
+        tables: tuple[str, ...],
+        join_attrs: list[tuple[str, str]],
+        **kwargs,
+    ) -> Any:
+        return self._call("join", (tables, join_attrs), kwargs)
+
+    def aggregate(
+        self,
+        table_name: str,
+        column: str,
+        operation: str,
+        *,
+        group_by: Optional[str] = None,
+        percentile: float = 0.5,
+    ) -> Any:
+        return self._call(
+            "aggregate",
+            (table_name, column, operation),
+            {"group_by": group_by, "percentile": percentile},
+        )
+
+
+class Connection:
+    """Соединение с сервером базы данных."""
+
+    def __init__(self, address: Address) -> None:
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        self.socket.connect(address)
+
+        if family == socket.AF_INET:
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.file = self.socket.makefile("rwb")
+
+    def close(self) -> None:
+        # Буфер записи разорванного соединения уже не отправить
+        with suppress(OSError):
+            self.file.close()
+
+        self.socket.close()
+
+    def execute(self, requests: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Отправляет запросы окнами по `WINDOW_SIZE` байт, не дожидаясь
+        ответа на каждый запрос, и читает ответы на них.
+        """
+        responses: list[dict[str, Any]] = []
+        window: list[bytes] = []
+        size = 0
+
+        for request in requests:
+            window.append(protocol.encode(request))
+            size += len(window[-1])
+
+            if size >= WINDOW_SIZE:
+                self._exchange(window, responses)
+                window, size = [], 0
+
+        if window:
+            self._exchange(window, responses)
+
+        return responses
+
+    def _exchange(
+        self, window: list[bytes], responses: list[dict[str, Any]]
+    ) -> None:
+        self.file.write(b"".join(window))
+        self.file.flush()
+
+        for _ in window:
+            line = self.file.readline()
+
+            if not line:
+                raise ConnectionError("Connection closed by the server.")
+
+            responses.append(protocol.decode(line))
+
+
+class Client(_Methods):
+    """
+    Клиент сервера базы данных с пулом соединений.
+
+    Соединения открываются по мере необходимости, но не больше
+    `pool_size` одновременно, и переиспользуются между вызовами,
+    поэтому клиентом можно пользоваться из нескольких потоков.
+    Строки результатов возвращаются словарями.
+    """
+
+    def __init__(self, address: Address, pool_size: int = 4) -> None:
+        self.address = address
+        # Свободные соединения; None - место под еще не открытое соединение
+        self._pool: queue.LifoQueue[Optional[Connection]] = queue.LifoQueue()
+
+        for _ in range(pool_size):
+            self._pool.put(None)
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Закрывает свободные соединения пула."""
+        connections = []
+
+        while not self._pool.empty():
+            connections.append(self._pool.get_nowait())
+
+        for connection in connections:
+            if connection is not None:
+                connection.close()
+
+            self._pool.put(None)
+
+    def pipeline(self) -> "Pipeline":
+        """
+        Пачка запросов, которые отправляются серверу одним сообщением
+        по одному соединению, без ожидания ответа на каждый из них.
+        """
+        return Pipeline(self)
+
+    def execute(self, requests: list[dict[str, Any]]) -> list[Any]:
+        """
+        Выполняет запросы на свободном соединении пула и возвращает
+        их результаты. Если соединений `pool_size` и все заняты, ждет
+        освобождения одного из них. Если какой-либо запрос завершился
+        ошибкой, выбрасывается исключение первой ошибки.
+        """
+        connection = self._pool.get()
+
+        try:
+            if connection is None:
+                connection = Connection(self.address)
+
+            responses = connection.execute(requests)
+        except BaseException:
+            # Состояние соединения неизвестно, поэтому оно закрывается,
+            # а его место в пуле освобождается в любом случае
+            try:
+                if connection is not None:
+                    connection.close()
+            finally:
+                self._pool.put(None)
+
+            raise
+
+        self._pool.put(connection)
+
+        for response in responses:
+            if "error" in response:
+                error = response["error"]
+                raise protocol.ERRORS.get(error["type"], RuntimeError)(
+                    error["message"]
+                )
+
+        return [response["result"] for response in responses]
+
+    def _call(self, method: str, args: tuple, kwargs: dict[str, Any]) -> Any:
+        request = {"method": method, "args": args, "kwargs": kwargs}
+        return self.execute([request])[0]
+
+
+class Pipeline(_Methods):
+    """
+    Накапливает вызовы методов и выполняет их методом `execute`,
+    который возвращает список результатов в порядке вызовов.
+    """
+
+    def __init__(self, client: Client) -> None:
+        self.client = client
+        self.requests: list[dict[str, Any]] = []
+
+    def _call(self, method: str, args: tuple, kwargs: dict[str, Any]) -> None:
+        self.requests.append(
+            {"method": method, "args": args, "kwargs": kwargs}
+        )
+
+    def execute(self) -> list[Any]:
+        requests, self.requests = self.requests, []
+        return self.client.execute(requests) if requests else []
@@ -0,0 +1,148 @@
+import bz2
+import csv
+import gzip
+import io
+import lzma
+import os
+from itertools import islice
+from typing import Any, Iterable, Mapping, Optional, TextIO
+
+from database import storage
+from database.rows import Row
+
+# Модули сжатия стандартной библиотеки. Каждый из них читает файл
+# из нескольких записанных подряд сжатых потоков как один поток
+CODECS = {"gzip": gzip, "bz2": bz2, "lzma": lzma}
+
+# Сколько строк таблицы сжимается одним блоком
+BLOCK_ROWS = 4096
+
+
+def _codec(compression: str) -> Any:
+    try:
+        return CODECS[compression]
+    except KeyError:
+        raise ValueError(
+            f"Compression '{compression}' is not supported."
+        ) from None
+
+
+def blocks_path(path: str) -> str:
+    """Файл со смещениями и числом строк блоков сжатого файла."""
+    return f"{path}.blocks"
+
+
+def open_text(path: str, compression: Optional[str]) -> TextIO:
+    """Открывает файл таблицы на чтение, распаковывая его по ходу чтения."""
+    if compression is None:
+        return open(path, "r")
+
+    return _codec(compression).open(path, "rt")
+
+
+def write_rows(
+    path: str,
+    attrs: tuple[str, ...],
+    rows: Iterable[Mapping[str, Any]],
+    compression: Optional[str],
+    *,
+    append: bool,
+) -> None:
+    """
+    Записывает строки в CSV-файл таблицы заново или, если `append`,
+    дописывает их в конец. Заголовок пишется, если файл новый или пустой.
+
+    Сжатый файл состоит из независимо сжатых блоков: заголовка и пачек
+    по BLOCK_ROWS строк. Блоки сжимаются по одному, поэтому файл
+    не держится в памяти целиком, а дописывание - это новый блок в конце.
+    Смещения блоков и число строк в них записываются в `blocks_path`.
+    """
+    new_file = (
+        not append or not os.path.exists(path) or os.path.getsize(path) == 0
+    )
+
+    if compression is None:
+        with open(path, "w" if new_file else "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=attrs)
+
+            if new_file:
+                writer.writeheader()
+
+            writer.writerows(rows)
+
+        return
+
+    codec = _codec(compression)
+    mode = "w" if new_file else "a"
+
+    with open(path, f"{mode}b") as f, open(blocks_path(path), mode) as index:
+        if new_file:
+            buffer = io.StringIO()
+            csv.DictWriter(buffer, fieldnames=attrs).writeheader()
+            index.write(f"{f.tell()} 0\n")
+            f.write(codec.compress(buffer.getvalue().encode()))
+
+        rows = iter(rows)
+
+        while block := list(islice(rows, BLOCK_ROWS)):
+            buffer = io.StringIO()
+            csv.DictWriter(buffer, fieldnames=attrs).writerows(block)
+            index.write(f"{f.tell()} {len(block)}\n")
+            f.write(codec.compress(buffer.getvalue().encode()))
+
+
+def read_range(
+    path: str,
+    compression: Optional[str],
+    start: int,
+    stop: int,
+    row_type: Optional[type[Row]] = None,
+    types: tuple[tuple[str, type], ...] = (),
+) -> list:
+    """
+    Читает строки файла таблицы с позициями [start, stop).
+
+    У сжатого файла распаковываются только заголовок и блоки, в которые
+    попадает диапазон. Несжатый файл (или сжатый без файла блоков)
+    читается целиком.
+    """
+    if compression is None or not os.path.exists(blocks_path(path)):
+        with open_text(path, compression) as f:
+            return storage.read_rows(f, row_type, types)[start:stop]
+
+    codec = _codec(compression)
+
+    with open(blocks_path(path), "r") as f:
+        blocks = [tuple(map(int, line.split())) for line in f]
+
+    offsets = [offset for offset, _ in blocks] + [os.path.getsize(path)]
+    parts = []
+    first = position = 0
+
+    with open(path, "rb") as f:
+
+        def block(i: int) -> str:
+            f.seek(offsets[i])
+            return codec.decompress(
+                f.read(offsets[i + 1] - offsets[i])
+            ).decode()
+
+        header = block(0)
+
+        for i in range(1, len(blocks)):
+            count = blocks[i][1]
+
+            if position + count > start and position < stop:
+                if not parts:
+                    first = position
+
+                parts.append(block(i))
+
+            position += count
+
+    # Переводы строк приводятся к "\n", как при чтении через `open_text`
+    rows = storage.read_rows(
+        io.StringIO(header + "".join(parts), newline=None), row_type, types
+    )
+    begin, end = start - first, stop - first
+    return rows[begin:end]
@@ -1,23 +1,260 @@
 import csv
+import heapq
+import inspect
+import io
 import os
+import sys
+import threading
+import weakref
+import zlib
 from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import date
-from typing import Any, Callable, Literal, Optional, Union
+from functools import cache, partial
+from itertools import chain, islice
+from operator import eq, ge, gt, itemgetter, le, lt, methodcaller
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from database import (
+    bulk,
+    compression,
+    schema,
+    shared,
+    sketches,
+    spill,
+    storage,
+)
+from database.bloom import BloomFilter, dump_filters, load_filters
+from database.indexes import HashIndex, IntervalIndex, SortedIndex, UniqueIndex
+from database.rows import (
+    ColumnDictionary,
+    JoinedRow,
+    Row,
+    encoded_row_type,
+    joined_row_type,
+    row_type,
+)
+
+# Условие соединения: пара 'таблица.атрибут' с равными значениями или
+# ('таблица.атрибут', оператор, 'таблица.атрибут'). Таблицы связываются
+# одним условием или списком условий, которые должны выполняться вместе
+_JoinCondition = Sequence[str]
+_JoinLink = Union[_JoinCondition, Sequence[_JoinCondition]]
+
+_JOIN_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "=": eq,
+    "<": lt,
+    "<=": le,
+    ">": gt,
+    ">=": ge,
+}
+# Оператор того же условия с переставленными сторонами
+_FLIPPED_OPERATORS = {"=": "=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+class _JoinPlan(NamedTuple):
+    """План соединения, составленный `Database._plan_join`."""
+
+    tables: tuple[str, ...]
+    tables_objects: list["Table"]
+    # Столбцы результата ('таблица.атрибут')
+    attrs: tuple[str, ...]
+    # Класс строк результата из одной первой таблицы
+    first_type: type[JoinedRow]
+    # Присоединение каждой следующей таблицы
+    steps: list["_JoinStep"]
+
+
+class _JoinStep(NamedTuple):
+    """Присоединение следующей таблицы в плане соединения."""
+
+    # Столбцы результата ('таблица.атрибут') и столбцы присоединяемой
+    # таблицы, значения которых должны быть равны
+    left_attrs: tuple[str, ...]
+    right_attrs: tuple[str, ...]
+    # Условия сравнения: столбец результата, оператор, столбец таблицы
+    conditions: tuple[tuple[str, str, str], ...]
+    # Класс строк результата после присоединения
+    joined_type: type[JoinedRow]
+
+
+class _AggregatePlan(NamedTuple):
+    """План агрегации, составленный `Database._plan_aggregate`."""
+
+    table: "Table"
+    column: str
+    operation: str
+    group_by: Optional[str]
+    aggregate_func: Callable[[Iterable[Any]], Any]
+    # Вычисление приближенной операции по скетчу (None - точная операция)
+    approximate: Optional[Callable[[sketches.ColumnSketch], Any]]
 
 
 class SingletonMeta(type):
-    """Синглтон метакласс для Database."""
+    """
+    Метакласс именованных экземпляров Database: экземпляр с именем
+    `name` создается при первом вызове, а следующие вызовы с тем же
+    именем возвращают его. `Database()` - экземпляр по умолчанию,
+    `name=None` - новый экземпляр, который нигде не запоминается.
+
+    Аргументы следующих вызовов не отбрасываются: переданные значения
+    присваиваются одноименным атрибутам существующего экземпляра
+    (аргументы `__init__` класса должны храниться в таких атрибутах).
+    """
 
     _instances: dict = {}
+    _instances_lock = threading.Lock()
+
+    def __call__(cls, *args, name: Optional[str] = "default", **kwargs) -> Any:
+        if name is None:
+            return super().__call__(*args, name=name, **kwargs)
+
+        with cls._instances_lock:
+            instance = cls._instances.get((cls, name))
+
+            if instance is None:
+                instance = cls._instances[cls, name] = super().__call__(
+                    *args, name=name, **kwargs
+                )
+            elif args or kwargs:
+                arguments = (
+                    inspect.signature(cls.__init__)
+                    .bind_partial(instance, *args, **kwargs)
+                    .arguments
+                )
+
+                for attr, value in islice(arguments.items(), 1, None):
+                    setattr(instance, attr, value)
+
+            return instance
+
+
+class TableRegistry(MutableMapping):
+    """
+    Таблицы базы данных по именам. Вместо таблицы можно зарегистрировать
+    функцию, которая ее создает (например, класс таблицы): она
+    вызывается при первом обращении к таблице, поэтому таблица
+    загружается из файла, только если она нужна. Такую таблицу можно
+    выгрузить (`unload`), и она снова загрузится при обращении.
+    """
+
+    def __init__(
+        self, on_create: Optional[Callable[[str], None]] = None
+    ) -> None:
+        self._tables: dict[str, Union["Table", Callable[[], "Table"]]] = {}
+        self._factories: dict[str, Callable[[], "Table"]] = {}
+        self._pending: set[str] = set()
+        # Имена таблиц от давно использованных к недавно использованным
+        self._used: dict[str, None] = {}
+        self._lock = threading.Lock()
+        # Вызывается с именем таблицы после ее создания при обращении
+        self._on_create = on_create
+
+    def __getitem__(self, table_name: str) -> "Table":
+        created = False
+
+        if table_name in self._pending:
+            with self._lock:
+                if table_name in self._pending:
+                    self._tables[table_name] = self._tables[table_name]()
+                    self._pending.discard(table_name)
+                    created = True
+
+        table = self._tables[table_name]
+        self._used.pop(table_name, None)
+        self._used[table_name] = None
+
+        if created and self._on_create is not None:
+            self._on_create(table_name)
+
+        return table
+
+    def __setitem__(self, table_name: str, table: "Table") -> None:
+        self._tables[table_name] = table
+        self._factories.pop(table_name, None)
+        self._pending.discard(table_name)
+
+    def __delitem__(self, table_name: str) -> None:
+        del self._tables[table_name]
+        self._factories.pop(table_name, None)
+        self._pending.discard(table_name)
+        self._used.pop(table_name, None)
+
+    def __contains__(self, table_name: object) -> bool:
+        return table_name in self._tables
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._tables))
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def register_lazy(
+        self, table_name: str, factory: Callable[[], "Table"]
+    ) -> None:
+        self._tables[table_name] = factory
+        self._factories[table_name] = factory
+        self._pending.add(table_name)
+
+    def created(self) -> dict[str, "Table"]:
+        """Таблицы, которые уже созданы (без отложенных)."""
+        return {
+            table_name: table
+            for table_name, table in list(self._tables.items())
+            if table_name not in self._pending
+        }
+
+    def unloadable(self) -> list[str]:
+        """
+        Созданные отложенные таблицы, которые можно выгрузить без потери
+        данных (файл соответствует строкам, и снимков таблицы нет),
+        от давно использованных к недавно использованным.
+        """
+        return [
+            table_name
+            for table_name in list(self._used)
+            if table_name in self._factories
+            and table_name not in self._pending
+            and self._tables[table_name]._can_unload()
+        ]
+
+    def unload(self, table_name: str) -> None:
+        """
+        Выгружает отложенную таблицу до следующего обращения к ней.
+        Объект выгруженной таблицы больше не используется (см.
+        `Table._unload`).
+        """
+        with self._lock:
+            table = self._tables[table_name]
+            self._tables[table_name] = self._factories[table_name]
+            self._pending.add(table_name)
+            self._used.pop(table_name, None)
 
-    def __call__(cls, *args, **kwargs) -> Any:
-        if cls not in cls._instances:
-            cls._instances[cls] = super().__call__(*args, **kwargs)
-        return cls._instances[cls]
+        table._unload()
 
 
 class Database(metaclass=SingletonMeta):
-    """Класс-синглтон базы данных с таблицами, хранящимися в файлах."""
+    """
+    База данных с таблицами, хранящимися в файлах. `Database()` всегда
+    возвращает один экземпляр по умолчанию, а `Database(name=...)` -
+    отдельный именованный экземпляр со своими таблицами. Лимиты,
+    переданные при повторном вызове (`Database(memory_budget=...)`),
+    применяются к существующему экземпляру.
+    """
 
     _aggregate_functions: dict[str, Callable] = {
         "SUM": sum,
@@ -26,309 +263,2772 @@ class Database(metaclass=SingletonMeta):
         "MAX": max,
         "COUNT": len,
     }
+    # Приближенные операции: значения столбца сводятся в скетч
+    # (см. sketches.ColumnSketch) с ошибкой `Table.SKETCH_ERROR`,
+    # а результат вычисляется по нему с учетом процентиля
+    _approximate_functions: dict[
+        str, Callable[[sketches.ColumnSketch, float], Any]
+    ] = {
+        "APPROX_COUNT_DISTINCT": lambda sketch, percentile: sketch.distinct(),
+        "APPROX_MEDIAN": lambda sketch, percentile: sketch.quantile(0.5),
+        "APPROX_PERCENTILE": lambda sketch, percentile: sketch.quantile(
+            percentile
+        ),
+    }
+
+    _RT = dict[str, str]
+
+    def __init__(
+        self,
+        memory_limit: Optional[int] = None,
+        *,
+        memory_budget: Optional[int] = None,
+        name: Optional[str] = "default",
+    ) -> None:
+        # Имя экземпляра (см. SingletonMeta); у каждого экземпляра
+        # свои таблицы
+        self.name = name
+        self.tables = TableRegistry(on_create=self._after_create)
+
+        # Сколько строк (а не байт) join и группирующий aggregate могут
+        # держать в памяти; при превышении данные сбрасываются
+        # во временные файлы.
+        self.memory_limit = memory_limit
+        # Бюджет памяти в байтах на созданные таблицы и на данные,
+        # которые запросы держат в памяти (см. memory_usage). Запросы
+        # сбрасывают данные во временные файлы, если не укладываются
+        # в свободную часть бюджета, и отклоняются (MemoryError),
+        # если бюджета не хватает и на это.
+        self.memory_budget = memory_budget
+        self._query_memory = 0
+        self._memory_lock = threading.Lock()
+
+    def register_table(
+        self,
+        table_name: str,
+        table: Union["Table", Callable[[], "Table"]],
+    ) -> None:
+        """
+        Регистрирует таблицу или функцию, которая ее создает (например,
+        класс таблицы). Такая функция вызывается при первом обращении
+        к таблице, и процесс, которому нужна одна таблица, не загружает
+        остальные.
+        """
+        if isinstance(table, Table):
+            self.tables[table_name] = table
+        else:
+            self.tables.register_lazy(table_name, table)
+
+    def memory_usage(self) -> dict[str, Any]:
+        """
+        Приблизительный объем памяти в байтах: созданных таблиц (строки
+        и индексы, см. `Table.memory_usage`), данных выполняющихся
+        запросов и их сумма, а также бюджет памяти.
+        """
+        tables = {
+            table_name: table.memory_usage()
+            for table_name, table in self.tables.created().items()
+        }
+        return {
+            "tables": tables,
+            "queries": self._query_memory,
+            "total": sum(tables.values()) + self._query_memory,
+            "budget": self.memory_budget,
+        }
+
+    def _free_memory(self, keep: Iterable["Table"] = ()) -> Optional[int]:
+        """
+        Свободная часть бюджета памяти (None - бюджета нет). Если
+        бюджет превышен, сначала выгружаются давно использованные
+        отложенные таблицы, кроме таблиц `keep`.
+        """
+        if self.memory_budget is None:
+            return None
+
+        usage = self.memory_usage()
+        free = self.memory_budget - usage["total"]
+        created = self.tables.created()
+
+        for table_name in self.tables.unloadable():
+            if free >= 0:
+                break
+
+            if created[table_name] not in keep:
+                free += usage["tables"][table_name]
+                self.tables.unload(table_name)
+
+        return free
+
+    def _after_create(self, table_name: str) -> None:
+        """Освобождает бюджет для таблицы, загруженной при обращении."""
+        self._free_memory(keep=[self.tables.created()[table_name]])
+
+    def _memory_rows(
+        self, table: Union["Table", "TableSnapshot"], keep: Iterable["Table"]
+    ) -> Optional[int]:
+        """
+        Сколько строк таблицы запрос может держать в памяти: не больше
+        `memory_limit` и свободной части бюджета (None - без ограничений).
+        """
+        free = self._free_memory(keep)
+        limits = [
+            limit
+            for limit in (
+                self.memory_limit,
+                None if free is None else max(0, free) // table.row_size(),
+            )
+            if limit is not None
+        ]
+        return min(limits, default=None)
+
+    @contextmanager
+    def _reserve(self, size: int, keep: Iterable["Table"]) -> Iterator[None]:
+        """
+        Числит за запросом `size` байт бюджета: столько памяти занимают
+        данные, которые он держит. Запрос, которому не хватает бюджета
+        даже после выгрузки отложенных таблиц (кроме `keep`),
+        отклоняется.
+        """
+        with self._memory_lock:
+            free = self._free_memory(keep)
+
+            if free is not None and size > free:
+                raise MemoryError(
+                    f"Query needs about {size} bytes of memory, but only "
+                    f"{max(0, free)} of the {self.memory_budget}-byte "
+                    f"memory budget are free."
+                )
+
+            self._query_memory += size
+
+        try:
+            yield
+        finally:
+            with self._memory_lock:
+                self._query_memory -= size
+
+    def _reserved(
+        self, size: int, keep: Iterable["Table"], rows: Iterable[Any]
+    ) -> Iterator[Any]:
+        """Отдает `rows`, пока за запросом числится `size` байт бюджета."""
+        with self._reserve(size, keep):
+            yield from rows
+
+    def create_table(
+        self,
+        table_name: str,
+        columns: Iterable[str],
+        types: Optional[Mapping[str, type]] = None,
+        unique: Iterable[Union[str, tuple[str, ...]]] = (),
+        indexes: Iterable[Union[str, tuple[str, ...]]] = (),
+        storage: Optional[str] = None,
+        *,
+        compression: Optional[str] = None,
+        load_data: bool = True,
+    ) -> "Table":
+        """
+        Создает и регистрирует таблицу без своего подкласса `Table`.
+
+        :param columns: Столбцы таблицы.
+        :param types: Типы столбцов (по умолчанию - str).
+        :param unique: Уникальные столбцы или кортежи столбцов; по ним
+        строятся уникальные индексы и фильтры Блума.
+        :param indexes: Столбцы или кортежи столбцов вторичных индексов.
+        :param storage: Файл таблицы (по умолчанию `<table_name>.csv`).
+        :param compression: Сжатие файла таблицы (см. `Table.COMPRESSION`).
+        :param load_data: Загрузить строки из файла таблицы сразу.
+
+        `select` созданной таблицы ищет строки по значениям столбцов
+        через объявленные индексы (см. `DeclaredTable`).
+        """
+        columns = tuple(columns)
+        types = dict(types or {})
+        unique = tuple(unique)
+        indexes = tuple(indexes)
+
+        if not columns or len(set(columns)) != len(columns):
+            raise ValueError(
+                f"Columns {columns} of the table '{table_name}' "
+                f"must be unique and not empty."
+            )
+
+        for column_type in types.values():
+            schema.parser(column_type)
+
+        for attrs in (*types, *unique, *indexes):
+            for attr in _as_attrs(attrs):
+                if attr not in columns:
+                    raise ValueError(
+                        f"'{attr}' is not a column "
+                        f"of the table '{table_name}'."
+                    )
+
+        class_name = "".join(
+            part.capitalize() for part in table_name.split("_")
+        )
+        table_class = type(
+            f"{class_name}Table",
+            (DeclaredTable,),
+            {
+                "ATTRS": columns,
+                "TYPES": types,
+                "UNIQUE_ATTRS": unique,
+                "INDEXES": indexes,
+                "BLOOM_ATTRS": unique,
+                "FILE_PATH": storage or f"{table_name}.csv",
+                "COMPRESSION": compression,
+            },
+        )
+        table = table_class(load_data=load_data)
+        self.register_table(table_name, table)
+        return table
+
+    def load_all(
+        self, *, processes: bool = False, max_workers: Optional[int] = None
+    ) -> None:
+        """
+        Загружает все зарегистрированные таблицы из их CSV-файлов.
+
+        Таблицы для этого создаются с `load_data=False`, чтобы они не
+        загружались в конструкторах. Отложенные таблицы (см.
+        `register_table`) не создаются: они загрузятся при первом
+        обращении к ним.
+
+        По умолчанию таблицы загружаются по очереди: разбор CSV упирается
+        в GIL, поэтому пул потоков загрузку не ускоряет.
+
+        :param processes: Разбирать файлы в пуле процессов. Строки
+        возвращаются из процессов через pickle, а индексы все равно
+        строятся в этом процессе, поэтому на больших таблицах это
+        медленнее последовательной загрузки (4 таблицы по 400 тыс. строк:
+        около 21 с против 11 с). Имеет смысл, только если файлы дорого
+        читать (например, сжатые), а строк в них немного.
+        :param max_workers: Размер пула процессов (по умолчанию
+        выбирается пулом).
+        """
+        # Разделы таблиц читаются из своих файлов как отдельные таблицы
+        tables = [
+            stored
+            for table in self.tables.created().values()
+            for stored in table.stored_tables()
+        ]
+
+        if not processes:
+            for table in tables:
+                table.load()
+
+            return
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # Рабочим передаются только пути и схема строк, а не таблицы
+            # целиком; индексы строятся один раз, уже в этом процессе
+            futures = [
+                executor.submit(
+                    _read_table,
+                    table.FILE_PATH,
+                    table.deleted_path,
+                    table._load_row_type(processes),
+                    table.column_types,
+                    table.COMPRESSION,
+                )
+                for table in tables
+            ]
+
+            for table, future in zip(tables, futures):
+                data, file_rows, deleted, file_state = future.result()
+
+                if table.dictionaries:
+                    # Коды словарей процесса-загрузчика здесь не действуют,
+                    # поэтому значения кодируются словарями этой таблицы
+                    data = [
+                        row and table.row_type(*row.astuple()) for row in data
+                    ]
+
+                table._set_data(data, file_rows, deleted, file_state)
+
+    def publish(self, name: str) -> shared.SharedSegments:
+        """
+        Публикует все таблицы в разделяемой памяти под именем `name`,
+        чтобы другие процессы подключились к ним методом `attach`
+        без собственной загрузки CSV-файлов.
+
+        Сегменты существуют, пока не закрыт возвращаемый объект;
+        процесс-публикатор должен держать его открытым, пока
+        с таблицами работают другие процессы.
+        """
+        segments = shared.SharedSegments(owner=True)
+
+        try:
+            for table_name, table in self.tables.items():
+                table.publish_shared(f"{name}_{table_name}", segments)
+        except BaseException:
+            segments.close()
+            raise
+
+        return segments
+
+    def attach(self, name: str) -> shared.SharedSegments:
+        """
+        Подключает зарегистрированные таблицы к данным и индексам,
+        опубликованным методом `publish` под именем `name`.
+
+        Строки не копируются в процесс, а читаются из разделяемой памяти
+        при обращении к ним, поэтому подключение почти мгновенно.
+        Подключенные таблицы доступны только для чтения.
+        """
+        segments = shared.SharedSegments(owner=False)
+
+        try:
+            for table_name, table in self.tables.items():
+                table.attach_shared(f"{name}_{table_name}", segments)
+        except BaseException:
+            segments.close()
+            raise
+
+        return segments
+
+    def prepare(self, method: str, *args, **kwargs) -> "PreparedQuery":
+        """
+        Подготавливает запрос для многократного выполнения: аргументы
+        проверяются, имена столбцов разбираются, а план (классы строк
+        результата, функция агрегации, индекс поиска) выбирается один раз.
+
+        - prepare("join", tables, join_attrs, order_by=..., limit=...)
+          и prepare("iter_join", tables, join_attrs) - соединения;
+        - prepare("aggregate", table_name, column, operation, ...)
+          - агрегация;
+        - prepare("find", table_name, attrs) - поиск строк, значения
+          столбцов `attrs` которых передаются в `execute`.
+
+        План связан с таблицами, зарегистрированными на момент подготовки,
+        и составляется заново, только если какая-то из них выгружена
+        из памяти.
+        """
+        if method not in _PREPARE_OPTIONS:
+            raise ValueError(f"Method '{method}' can not be prepared.")
+
+        unknown = kwargs.keys() - _PREPARE_OPTIONS[method]
+
+        if unknown:
+            raise TypeError(
+                f"Prepared '{method}' got unexpected keyword arguments: "
+                f"{', '.join(sorted(unknown))}."
+            )
+
+        if method in ("join", "iter_join"):
+            order_by = kwargs.get("order_by")
+            descending = kwargs.get("descending", False)
+            limit = kwargs.get("limit")
+
+            def plan_join() -> tuple[Callable[..., Any], list[Table]]:
+                plan = self._plan_join(*args)
+
+                if method == "iter_join":
+                    return partial(self._run_join, plan), plan.tables_objects
+
+                _check_order_by(order_by, plan.attrs, "join")
+                return (
+                    lambda: _order_rows(
+                        self._run_join(plan), order_by, descending, limit
+                    ),
+                    plan.tables_objects,
+                )
+
+            return PreparedQuery(plan_join)
+
+        if method == "aggregate":
+            table_name, column, operation = args
+
+            def plan_aggregate() -> tuple[Callable[..., Any], list[Table]]:
+                plan = self._plan_aggregate(
+                    table_name,
+                    column,
+                    operation,
+                    kwargs.get("group_by"),
+                    kwargs.get("percentile", 0.5),
+                )
+                return partial(self._run_aggregate, plan), [plan.table]
+
+            return PreparedQuery(plan_aggregate)
+
+        table_name, attrs = args
+
+        def plan_find() -> tuple[Callable[..., Any], list[Table]]:
+            table = self.tables.get(table_name)
+
+            if not table:
+                raise ValueError(f"Table '{table_name}' does not exist.")
+
+            return table._prepare_find(_as_attrs(attrs)), [table]
+
+        return PreparedQuery(plan_find)
+
+    def insert(
+        self, table_name, data, *, sep: Literal[" ", ","] = " "
+    ) -> None:
+        table = self.tables.get(table_name)
+        if table:
+            table.insert(data, sep=sep)
+        else:
+            raise ValueError(f"Table '{table_name}' does not exist.")
+
+    def import_file(
+        self,
+        table_name: str,
+        path: str,
+        *,
+        file_format: Optional[str] = None,
+        batch_size: int = 10000,
+    ) -> int:
+        """
+        Потоково импортирует строки CSV- или JSONL-файла в таблицу
+        пачками по `batch_size` (см. `Table.insert_many`) и возвращает
+        их число. Формат определяется по расширению файла, если
+        не указан `file_format`.
+        """
+        table = self.tables.get(table_name)
+
+        if not table:
+            raise ValueError(f"Table '{table_name}' does not exist.")
+
+        return table.insert_many(
+            bulk.read_file(path, file_format), batch_size=batch_size
+        )
+
+    def export_file(
+        self,
+        path: str,
+        rows: Union[Iterable[_RT], _RT],
+        *,
+        file_format: Optional[str] = None,
+    ) -> int:
+        """
+        Потоково записывает строки результата select, iter_join или
+        aggregate в CSV- или JSONL-файл и возвращает их число. Строки
+        генератора (например, `iter_join`) не накапливаются в памяти.
+        """
+        if isinstance(rows, Mapping):  # Результат aggregate без группировки
+            rows = [rows]
+
+        return bulk.write_file(path, rows, file_format)
+
+    def update(
+        self, table_name: str, where: dict[str, Any], values: dict[str, Any]
+    ) -> int:
+        table = self.tables.get(table_name)
+        if table:
+            return table.update(where, values)
+        else:
+            raise ValueError(f"Table '{table_name}' does not exist.")
+
+    def delete(self, table_name: str, where: dict[str, Any]) -> int:
+        table = self.tables.get(table_name)
+        if table:
+            return table.delete(where)
+        else:
+            raise ValueError(f"Table '{table_name}' does not exist.")
+
+    def select(
+        self,
+        table_name: str,
+        *args,
+        order_by: Union[str, tuple[str, ...], None] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        **kwargs,
+    ) -> Optional[list[_RT]]:
+        """
+        Выборка `select` таблицы. Строки результата можно упорядочить
+        по столбцам `order_by` и оставить первые `limit` из них
+        (см. `_order_rows`).
+        """
+        table = self.tables.get(table_name)
+
+        if not table:
+            return None
+
+        _check_order_by(order_by, table.ATTRS, table_name)
+        return _order_rows(
+            table.select(*args, **kwargs), order_by, descending, limit
+        )
+
+    def join(
+        self,
+        tables: tuple[str, ...],
+        join_attrs: list[_JoinLink],
+        *,
+        order_by: Union[str, tuple[str, ...], None] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> list[_RT]:
+        """
+        Объединяет несколько таблиц по указанным аттрибутам.
+
+        :param tables: Кортеж имен таблиц.
+        :param join_attrs: Список условий, которыми каждая следующая
+        таблица связана с предыдущими: пара 'таблица.атрибут'
+        с равными значениями, условие сравнения
+        ('таблица.атрибут', '<=', 'таблица.атрибут') с одним из
+        операторов =, <, <=, >, >= или список таких условий
+        (например, пары равенства составного ключа или границы
+        отрезка дат).
+        :param order_by: Столбцы результата ('таблица.атрибут'),
+        по которым упорядочиваются строки.
+        :param descending: Упорядочить по убыванию.
+        :param limit: Сколько первых строк вернуть. Строки соединения
+        при этом не накапливаются: в памяти держатся только `limit`
+        лучших из них.
+
+        :return: Результат объединения таблиц, если удалось объединить
+        таблицы по указанным атрибутам, иначе пустой список.
+        """
+        plan = self._plan_join(tables, join_attrs)
+        _check_order_by(order_by, plan.attrs, "join")
+        return _order_rows(self._run_join(plan), order_by, descending, limit)
+
+    def iter_join(
+        self, tables: tuple[str, ...], join_attrs: list[_JoinLink]
+    ) -> Iterator[_RT]:
+        """
+        Потоковый вариант join: строки результата отдаются по одной,
+        промежуточные результаты между соединениями не накапливаются.
+
+        Соединение с условиями равенства выполняется хешированием
+        присоединяемой таблицы по ключу из столбцов этих условий.
+        Если она больше `memory_limit` строк или не укладывается
+        в свободную часть бюджета памяти, обе стороны соединения
+        разбиваются на разделы во временных файлах (grace hash join),
+        и в памяти одновременно находится хеш-таблица только одного раздела.
+        В этом случае порядок строк результата не гарантируется.
+        Соединение только по условиям сравнения выполняется по индексу,
+        построенному по присоединяемой таблице (см. `_range_join`).
+        """
+        return self._run_join(self._plan_join(tables, join_attrs))
+
+    def _plan_join(
+        self, tables: tuple[str, ...], join_attrs: list[_JoinLink]
+    ) -> "_JoinPlan":
+        """
+        Проверяет аргументы соединения, разбирает условия соединения
+        и выбирает классы строк результата.
+        """
+        if len(tables) < 2:
+            raise ValueError(
+                "At least two tables are required to perform a join."
+            )
+
+        tables_objects = [self.tables.get(table_name) for table_name in tables]
+
+        for table_name, table in zip(tables, tables_objects):
+            if not table:
+                raise ValueError(f"Table '{table_name}' does not exist.")
+
+        if len(join_attrs) != len(tables) - 1:
+            raise ValueError(
+                "Number of join attributes must be "
+                "one less than the number of tables."
+            )
+
+        # Строки результата ссылаются на строки таблиц (см. JoinedRow),
+        # и каждому числу соединенных таблиц соответствует свой класс
+        joined_tables = ((tables[0], tables_objects[0].ATTRS),)
+        first_type = joined_row_type(joined_tables)
+        steps = []
+
+        for i in range(1, len(tables_objects)):
+            conditions = [
+                self._join_condition(condition, tables[:i], tables[i])
+                for condition in _join_conditions(join_attrs[i - 1])
+            ]
+            joined_tables += ((tables[i], tables_objects[i].ATTRS),)
+            equal = [
+                (left, right) for left, op, right in conditions if op == "="
+            ]
+            steps.append(
+                _JoinStep(
+                    tuple(left for left, _ in equal),
+                    tuple(right for _, right in equal),
+                    tuple(
+                        condition
+                        for condition in conditions
+                        if condition[1] != "="
+                    ),
+                    joined_row_type(joined_tables),
+                )
+            )
+
+        return _JoinPlan(
+            tuple(tables),
+            tables_objects,
+            steps[-1].joined_type.ATTRS,
+            first_type,
+            steps,
+        )
+
+    def _join_condition(
+        self,
+        condition: tuple[str, ...],
+        joined: tuple[str, ...],
+        table_name: str,
+    ) -> tuple[str, str, str]:
+        """
+        Проверяет условие соединения и приводит его к виду (столбец
+        результата, оператор, столбец присоединяемой таблицы
+        `table_name`), переставляя стороны условия при необходимости.
+        """
+        if len(condition) == 2:
+            condition = (condition[0], "=", condition[1])
+
+        if len(condition) != 3 or condition[1] not in _JOIN_OPERATORS:
+            raise ValueError(
+                "The join_attrs elements must consist of 2 "
+                "elements with which the tables will be linked "
+                "or of 2 elements and an operator between them "
+                f"({', '.join(_JOIN_OPERATORS)})."
+            )
+
+        attr1, op, attr2 = condition
+
+        for attr in (attr1, attr2):
+            if not attr.count("."):
+                raise ValueError(
+                    f"Join attribute '{attr}' must have the "
+                    f"following format 'table_name.table_attribute'."
+                )
+
+            _table_name, _attr = attr.split(".")
+            _table = self.tables.get(_table_name)
+
+            if not _table:
+                raise ValueError(f"Table '{_table_name}' does not exist.")
+
+            if _attr not in _table.ATTRS:
+                raise ValueError(
+                    f"'{_attr}' is not an "
+                    f"attribute of table '{_table_name}'."
+                )
+
+        # Присоединяемая таблица обычно справа, как в паре равенства
+        if attr2.split(".")[0] != table_name and (
+            attr1.split(".")[0] == table_name
+        ):
+            attr1, op, attr2 = attr2, _FLIPPED_OPERATORS[op], attr1
+
+        if (
+            attr1.split(".")[0] not in joined
+            or attr2.split(".")[0] != table_name
+        ):
+            raise ValueError(
+                f"Join condition {condition} must link table "
+                f"'{table_name}' with the tables joined before it."
+            )
+
+        return attr1, op, attr2.split(".")[1]
+
+    def _run_join(self, plan: "_JoinPlan") -> Iterator[_RT]:
+        # Соединение читает версии таблиц на момент вызова: изменения,
+        # сделанные во время перебора результата, в него не попадают
+        snapshots = [table.snapshot() for table in plan.tables_objects]
+        result: Iterable[JoinedRow] = map(plan.first_type, snapshots[0].rows())
+
+        for step, table in zip(plan.steps, snapshots[1:]):
+            result = self._join_table(result, table, step, plan.tables_objects)
+
+        return iter(result)
+
+    def _join_table(
+        self,
+        rows: Iterable[JoinedRow],
+        table: "TableSnapshot",
+        step: "_JoinStep",
+        keep: list["Table"],
+    ) -> Iterator[JoinedRow]:
+        """
+        Присоединяет таблицу. Хеш-таблица или индекс по ее строкам
+        числятся за запросом в бюджете памяти (см. `_reserve`), а если
+        хеш-таблица не укладывается в лимит строк или в свободную часть
+        бюджета, соединение выполняется по разделам. Лимит считается,
+        когда начинается перебор строк, а не при составлении запроса.
+        """
+        size = table.length * table.row_size()
+
+        if not step.right_attrs:
+            yield from self._reserved(
+                size, keep, _range_join(rows, table.rows(), step)
+            )
+            return
+
+        limit = self._memory_rows(table, keep)
+
+        if limit is None or table.length <= limit:
+            yield from self._reserved(
+                size, keep, self._hash_join(rows, table.rows(), step)
+            )
+            return
+
+        limit = max(limit, 1)
+        yield from self._reserved(
+            limit * table.row_size(),
+            keep,
+            self._grace_hash_join(rows, table, step, limit),
+        )
+
+    @staticmethod
+    def _hash_join(
+        rows: Iterable[JoinedRow],
+        table_rows: Iterable[_RT],
+        step: "_JoinStep",
+    ) -> Iterator[JoinedRow]:
+        """
+        Соединение по равенству столбцов (одного или нескольких):
+        строки таблицы раскладываются по значениям ключа, а остальные
+        условия проверяются только у строк с тем же ключом.
+        """
+        buckets: dict[Any, list[Database._RT]] = {}
+        right_key = itemgetter(*step.right_attrs)
+        left_key = itemgetter(*step.left_attrs)
+
+        for row2 in table_rows:
+            key = right_key(row2)
+            if key not in buckets:
+                buckets[key] = []
+            buckets[key].append(row2)
+
+        joined_type = step.joined_type
+
+        # Строка результата - ссылки на строки таблиц, значения
+        # столбцов не копируются
+        for row1 in rows:
+            for row2 in buckets.get(left_key(row1), ()):
+                if _join_matches(step.conditions, row1, row2):
+                    yield joined_type(*row1.rows, row2)
+
+    def _grace_hash_join(
+        self,
+        rows: Iterable[JoinedRow],
+        table: "TableSnapshot",
+        step: "_JoinStep",
+        limit: int,
+    ) -> Iterator[JoinedRow]:
+        partitions = _spill_partitions(table.length, limit)
+        bloom = table.blooms.get(step.right_attrs)
+        left_key = itemgetter(*step.left_attrs)
+
+        if bloom is not None:
+            # Строки без пары не сбрасываются на диск
+            rows = (row for row in rows if left_key(row) in bloom)
+
+        right = spill.partition(
+            table.rows(), itemgetter(*step.right_attrs), partitions
+        )
+        left = spill.partition(rows, left_key, partitions)
+
+        try:
+            for left_part, right_part in zip(left, right):
+                yield from self._hash_join(left_part, right_part, step)
+        finally:
+            for part in left + right:
+                part.close()
+
+    def aggregate(
+        self,
+        table_name: str,
+        column: str,
+        operation: str,
+        *,
+        group_by: Optional[str] = None,
+        percentile: float = 0.5,
+    ) -> Union[_RT, list[_RT]]:
+        """
+        Выполняет агрегацию по указанной таблице и столбцу.
+
+        :param table_name: Имя таблицы
+        :param column: Столбец для агрегации
+        :param operation: Операция агрегации
+        ('SUM', 'AVG', 'COUNT', 'MIN', 'MAX') или приближенная операция
+        ('APPROX_COUNT_DISTINCT', 'APPROX_MEDIAN', 'APPROX_PERCENTILE')
+
+        :param group_by: Столбец для группировки
+        :param percentile: Доля от 0 до 1 для 'APPROX_PERCENTILE'
+        :return: Результат агрегации
+
+        Приближенная операция без группировки по столбцу из
+        `Table.SKETCH_ATTRS` читает скетч, который таблица обновляет
+        при вставках, и не перебирает строки.
+
+        Если в таблице больше `memory_limit` строк или она не укладывается
+        в свободную часть бюджета памяти, группировка выполняется
+        по разделам во временных файлах, а порядок групп не гарантируется.
+        """
+        return self._run_aggregate(
+            self._plan_aggregate(
+                table_name, column, operation, group_by, percentile
+            )
+        )
+
+    def _plan_aggregate(
+        self,
+        table_name: str,
+        column: str,
+        operation: str,
+        group_by: Optional[str],
+        percentile: float,
+    ) -> "_AggregatePlan":
+        """Проверяет аргументы агрегации и выбирает функцию агрегации."""
+        table = self.tables.get(table_name)
+
+        if not table:
+            raise ValueError(f"Table '{table_name}' does not exist.")
+
+        if column not in table.ATTRS:
+            raise ValueError(
+                f"Column '{column}' does not exist in table '{table_name}'."
+            )
+
+        if group_by and group_by not in table.ATTRS:
+            raise ValueError(
+                f"Column '{group_by}' does not exist in table '{table_name}'."
+            )
+
+        aggregate_func = self._aggregate_functions.get(operation)
+        approximate = self._approximate_functions.get(operation)
+
+        if approximate is not None:
+            if not 0 <= percentile <= 1:
+                raise ValueError("Percentile must be between 0 and 1.")
+
+            aggregate_func = partial(
+                _approximate_aggregate,
+                approximate,
+                table.SKETCH_ERROR,
+                percentile,
+            )
+
+        if not aggregate_func:
+            raise ValueError(f"Operation '{operation}' is not supported.")
+
+        if (
+            operation in ("AVG", "SUM")
+            and table.TYPES.get(column, str) not in schema.NUMERIC_TYPES
+        ):
+            raise TypeError(
+                f"The '{operation}' operation cannot be applied to column "
+                f"'{column}' as it contains non-numeric data."
+            )
+
+        return _AggregatePlan(
+            table,
+            column,
+            operation,
+            group_by,
+            aggregate_func,
+            (
+                None
+                if approximate is None
+                else partial(approximate, percentile=percentile)
+            ),
+        )
+
+    def _run_aggregate(self, plan: "_AggregatePlan") -> Union[_RT, list[_RT]]:
+        table, column, operation, group_by, aggregate_func, _ = plan
+
+        if plan.approximate is not None and not group_by:
+            sketch = table.sketches.get(column)
+
+            if sketch is not None:
+                result = plan.approximate(sketch)
+                return {f"{operation}({column})": str(result)}
+
+        table = table.snapshot()
+
+        if not group_by:
+            values: Iterable[Any] = (row[column] for row in table.rows())
+
+            if plan.approximate is None:
+                values = list(values)
+
+            return {f"{operation}({column})": str(aggregate_func(values))}
+
+        # Закодированный словарем столбец группируется по кодам,
+        # которые переводятся обратно в значения только для результата
+        dictionary = table.dictionaries.get(group_by)
+        key: Callable[[Any], Any] = (
+            itemgetter(group_by)
+            if dictionary is None
+            else methodcaller("code", group_by)
+        )
+        decode = None if dictionary is None else dictionary.values
+        pairs = ((key(row), row[column]) for row in table.rows())
+        # Группы держат значения столбца, а не строки целиком, поэтому
+        # их размер оценивается по строке сверху
+        keep = [plan.table]
+        limit = self._memory_rows(table, keep)
+
+        if limit is None or table.length <= limit:
+            with self._reserve(table.length * table.row_size(), keep):
+                return self._group(
+                    pairs, column, operation, group_by, decode, aggregate_func
+                )
+
+        limit = max(limit, 1)
+        parts = spill.partition(
+            pairs, itemgetter(0), _spill_partitions(table.length, limit)
+        )
+        result = []
+
+        try:
+            with self._reserve(limit * table.row_size(), keep):
+                for part in parts:
+                    result.extend(
+                        self._group(
+                            part,
+                            column,
+                            operation,
+                            group_by,
+                            decode,
+                            aggregate_func,
+                        )
+                    )
+        finally:
+            for part in parts:
+                part.close()
+
+        return result
+
+    def _group(
+        self,
+        pairs: Iterable[tuple[Any, Any]],
+        column: str,
+        operation: str,
+        group_by: str,
+        decode: Optional[list[str]],
+        aggregate_func: Callable[[list[Any]], Any],
+    ) -> list[_RT]:
+        grouping: dict[Any, list[Any]] = {}
+
+        for key, value in pairs:
+            if key not in grouping:
+                grouping[key] = []
+
+            grouping[key].append(value)
+
+        return [
+            {
+                f"{group_by}": key if decode is None else decode[key],
+                f"{operation}({column})": str(aggregate_func(value)),
+            }
+            for key, value in grouping.items()
+        ]
+
+
+def _spill_partitions(rows_count: int, limit: int) -> int:
+    """Число разделов, при котором каждый из них укладывается в лимит."""
+    return max(2, -(-rows_count // limit))
+
+
+def _join_conditions(link: _JoinLink) -> list[tuple[str, ...]]:
+    """Условия, которыми связана очередная таблица соединения."""
+    if all(isinstance(item, str) for item in link):
+        return [tuple(link)]  # type: ignore[arg-type]
+
+    return [tuple(condition) for condition in link]
+
+
+def _join_matches(
+    conditions: Iterable[tuple[str, str, str]],
+    row1: Mapping[str, Any],
+    row2: Mapping[str, Any],
+) -> bool:
+    """Выполняются ли условия сравнения; пустые значения не совпадают."""
+    for left, op, right in conditions:
+        value1, value2 = row1[left], row2[right]
+
+        if (
+            value1 is None
+            or value2 is None
+            or not _JOIN_OPERATORS[op](value1, value2)
+        ):
+            return False
+
+    return True
+
+
+def _range_join(
+    rows: Iterable[JoinedRow],
+    table_rows: Iterable[Mapping[str, Any]],
+    step: _JoinStep,
+) -> Iterator[JoinedRow]:
+    """
+    Соединение по условиям сравнения без равенств. По строкам
+    таблицы строится индекс, который для строки результата сразу
+    находит строки-кандидаты, а не перебирает всю таблицу:
+
+    - если столбец результата x должен попасть в отрезок
+      [start, end] из столбцов таблицы (x >= start и x <= end),
+      используется дерево отрезков по (start, end);
+    - иначе используется упорядоченный индекс по столбцу таблицы
+      из первого условия, а границы диапазона берутся из условий
+      с этим столбцом.
+
+    Остальные условия и строгость сравнений проверяются у кандидатов.
+    """
+    conditions = step.conditions
+    joined_type = step.joined_type
+    # Столбцы результата, которые ограничивают столбец таблицы снизу
+    # (left <= right) и сверху (left >= right)
+    lower = [
+        (left, right) for left, op, right in conditions if op in ("<", "<=")
+    ]
+    upper = [
+        (left, right) for left, op, right in conditions if op in (">", ">=")
+    ]
+    interval = next(
+        (
+            (left, start, end)
+            for left, start in upper
+            for left_end, end in lower
+            if left == left_end and start != end
+        ),
+        None,
+    )
+    candidates: Callable[[JoinedRow], Iterable[Mapping[str, Any]]]
+
+    if interval is not None:
+        point, start, end = interval
+        tree = IntervalIndex(start, end, table_rows)
+
+        def candidates(row1: JoinedRow) -> Iterable[Mapping[str, Any]]:
+            return () if row1[point] is None else tree.stab(row1[point])
+
+    else:
+        attr = conditions[0][2]
+        index = SortedIndex(attr, table_rows)
+        low = next((left for left, right in lower if right == attr), None)
+        high = next((left for left, right in upper if right == attr), None)
+
+        def candidates(row1: JoinedRow) -> Iterable[Mapping[str, Any]]:
+            if None in [row1[left] for left in (low, high) if left]:
+                return ()
+
+            return index.range(
+                None if low is None else row1[low],
+                None if high is None else row1[high],
+            )
+
+    for row1 in rows:
+        for row2 in candidates(row1):
+            if _join_matches(conditions, row1, row2):
+                yield joined_type(*row1.rows, row2)
+
+
+def _approximate_aggregate(
+    approximate: Callable[[sketches.ColumnSketch, float], Any],
+    error: float,
+    percentile: float,
+    values: Iterable[Any],
+) -> Any:
+    return approximate(sketches.ColumnSketch.of(values, error), percentile)
+
+
+def _read_table(
+    path: str,
+    deleted_path: str,
+    row_class: Union[type[Row], tuple[str, tuple[str, ...]], None],
+    types: tuple[tuple[str, type], ...],
+    file_compression: Optional[str] = None,
+) -> tuple[list, int, int, Optional["_FileState"]]:
+    """
+    Читает строки CSV-файла таблицы и помечает удаленные по журналу
+    удалений. Возвращает строки, число строк в файле, число удаленных
+    и состояние прочитанного файла для `Table.refresh`.
+    Выполняется и в рабочих потоках или процессах `load_all`, поэтому
+    не обращается к самой таблице.
+
+    Классы строк передаются в процессы аргументами `row_type`
+    (имя и атрибуты), так как сами классы создаются динамически.
+    """
+    if isinstance(row_class, tuple):
+        row_class = row_type(*row_class)
+
+    if not os.path.exists(path):
+        return [], 0, 0, None
+
+    # Сжатый файл нельзя дочитать с места остановки, поэтому его
+    # состояние берется до чтения: изменение во время чтения
+    # приведет к полной перезагрузке при следующем refresh
+    state = _file_state(path, deleted_path)
+
+    with compression.open_text(path, file_compression) as f:
+        data = storage.read_rows(f, row_class, types)
+
+        if file_compression is None:
+            # Файл прочитан до конца, и позиция буфера - число
+            # прочитанных байт, даже если файл уже дописали
+            state = _file_state(path, deleted_path, f.buffer.tell())
+
+    deleted = 0
+
+    for position in _read_deleted(deleted_path, len(data)):
+        if data[position] is not None:
+            data[position] = None
+            deleted += 1
+
+    return data, len(data), deleted, state
+
+
+class _FileState(NamedTuple):
+    """
+    Файл таблицы на момент последнего чтения или записи, по которому
+    `Table.refresh` находит изменения, сделанные другими процессами.
+    """
+
+    inode: int
+    mtime_ns: int
+    # Сколько первых байт файла соответствует строкам таблицы
+    # и последние из них: если они изменились, файл перезаписан
+    size: int
+    tail: bytes
+    # Сколько байт журнала удалений применено к строкам таблицы
+    deleted_size: int
+
+
+# Сколько последних прочитанных байт файла сравнивается при refresh
+_TAIL_SIZE = 64
+
+# По скольким первым строкам оценивается средний размер строки
+_ROW_SIZE_SAMPLE = 100
+
+
+def _file_state(
+    path: str, deleted_path: str, size: Optional[int] = None
+) -> _FileState:
+    """
+    Состояние файла таблицы, у которого прочитаны первые `size` байт
+    (по умолчанию - весь файл).
+    """
+    stat = os.stat(path)
+    deleted_size = _file_size(deleted_path)
+
+    if size is None:
+        size = stat.st_size
+
+    return _FileState(
+        stat.st_ino,
+        stat.st_mtime_ns,
+        size,
+        _read_bytes(path, max(0, size - _TAIL_SIZE), size),
+        deleted_size,
+    )
+
+
+def _file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _checksum(path: str, size: int) -> int:
+    """Контрольная сумма (CRC-32) первых `size` байт файла."""
+    checksum = 0
+
+    with open(path, "rb") as f:
+        while chunk := f.read(min(size, 1 << 20)):
+            checksum = zlib.crc32(chunk, checksum)
+            size -= len(chunk)
+
+    return checksum
+
+
+def _read_bytes(path: str, start: int, stop: int) -> bytes:
+    """Байты файла с позициями [start, stop)."""
+    if start >= stop:
+        return b""
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(stop - start)
+
+
+def _complete_lines(chunk: bytes) -> bytes:
+    """
+    Начало `chunk` до последнего перевода строки: строку, которую
+    другой процесс еще дописывает, нужно дочитать позже.
+    """
+    return chunk[: chunk.rfind(b"\n") + 1]
+
+
+def _read_deleted(
+    deleted_path: str, file_rows: Optional[int] = None
+) -> list[int]:
+    """
+    Позиции из журнала удалений. Если известно число строк в файле
+    `file_rows`, журнал с позициями вне файла отбрасывается.
+    """
+    if not os.path.exists(deleted_path):
+        return []
+
+    with open(deleted_path, "r") as f:
+        positions = list(map(int, f))
+
+    if file_rows is None or all(
+        0 <= position < file_rows for position in positions
+    ):
+        return positions
+
+    # Журнал остался от другой версии файла (например, файл
+    # перезаписали вне базы) и к нему не относится
+    os.remove(deleted_path)
+    return []
+
+
+def _find_positions(
+    data: list[Optional[dict[str, str]]],
+    length: int,
+    indexes: dict[tuple[str, ...], HashIndex],
+    dictionaries: dict[str, ColumnDictionary],
+    blooms: dict[tuple[str, ...], BloomFilter],
+    where: dict[str, Any],
+) -> list[int]:
+    """
+    Позиции строк среди первых `length` строк `data`, равных `where`.
+    Значения закодированных словарем столбцов сравниваются по кодам.
+    """
+    for attrs, bloom in blooms.items():
+        if all(attr in where for attr in attrs) and (
+            bloom.key(where) not in bloom
+        ):
+            return []  # Фильтр Блума знает, что таких строк нет
+
+    checks: list[tuple[Callable[[Any], Any], Any]] = []
+
+    for attr, value in where.items():
+        dictionary = dictionaries.get(attr)
+
+        if dictionary is None:
+            checks.append((itemgetter(attr), value))
+        elif value in dictionary.codes:
+            checks.append(
+                (methodcaller("code", attr), dictionary.codes[value])
+            )
+        else:
+            return []  # Значения нет в словаре, значит, нет и строк с ним
+
+    for attrs, index in indexes.items():
+        if all(attr in where for attr in attrs):
+            positions: Iterable[int] = index.lookup(index.key(where))
+            break
+    else:
+        positions = range(length)
+
+    return [
+        position
+        for position in positions
+        if position < length
+        and (row := data[position]) is not None
+        and all(get(row) == value for get, value in checks)
+    ]
+
+
+# Именованные аргументы запросов, которые можно подготовить
+_PREPARE_OPTIONS = {
+    "join": {"order_by", "descending", "limit"},
+    "iter_join": set(),
+    "aggregate": {"group_by", "percentile"},
+    "find": set(),
+}
+
+
+def _check_values_count(attrs: tuple[str, ...], values: tuple) -> None:
+    if len(values) != len(attrs):
+        raise ValueError(
+            f"Expected {len(attrs)} values for {attrs}, got {len(values)}."
+        )
+
+
+class PreparedQuery:
+    """
+    Запрос, подготовленный `Database.prepare`. Метод `execute`
+    выполняет его по готовому плану, не повторяя проверок.
+
+    `plan` составляет план: функцию выполнения и таблицы, с которыми
+    она работает. Если одна из них выгружена из памяти (см.
+    `TableRegistry.unload`), план составляется заново по таблицам базы.
+    """
+
+    def __init__(
+        self, plan: Callable[[], tuple[Callable[..., Any], list["Table"]]]
+    ) -> None:
+        self._plan = plan
+        self._run, self._tables = plan()
+
+    def execute(self, *params: Any) -> Any:
+        if any(table._unloaded for table in self._tables):
+            self._run, self._tables = self._plan()
+
+        return self._run(*params)
+
+
+def _as_attrs(attrs: Union[str, tuple[str, ...]]) -> tuple[str, ...]:
+    return (attrs,) if isinstance(attrs, str) else tuple(attrs)
+
+
+def _check_order_by(
+    order_by: Union[str, tuple[str, ...], None],
+    attrs: tuple[str, ...],
+    source: str,
+) -> None:
+    for attr in _as_attrs(order_by or ()):
+        if attr not in attrs:
+            raise ValueError(f"'{attr}' is not an attribute of '{source}'.")
+
+
+def _order_rows(
+    rows: Iterable[Any],
+    order_by: Union[str, tuple[str, ...], None],
+    descending: bool,
+    limit: Optional[int],
+) -> list:
+    """
+    Упорядочивает строки по столбцам `order_by` (пустые значения -
+    в конце) и оставляет первые `limit` из них.
+
+    С `limit` лучшие строки выбираются кучей размера `limit`
+    (heapq.nsmallest/nlargest) за O(N log k) без сортировки
+    и без накопления всех строк; строки с равными ключами
+    сохраняют исходный порядок.
+    """
+    if limit is not None and limit < 0:
+        raise ValueError("Limit must be a non-negative number.")
+
+    if order_by is None:
+        return list(islice(rows, limit))
+
+    attrs = _as_attrs(order_by)
+
+    def key(row: Any) -> tuple:
+        # Пустое значение не сравнивается с остальными и идет последним
+        return tuple(
+            ((row[attr] is None) != descending, row[attr]) for attr in attrs
+        )
+
+    if limit is None:
+        return sorted(rows, key=key, reverse=descending)
+
+    select = heapq.nlargest if descending else heapq.nsmallest
+    return select(limit, rows, key=key)
+
+
+class Table(ABC):
+    """Абстрактный базовый класс для таблиц с вводом/выводом файлов CSV."""
+
+    ATTRS: tuple[str, ...] = ()
+    UNIQUE_ATTRS: tuple[Union[str, tuple[str, ...]], ...] = ()
+    # Вторичные (неуникальные) индексы по столбцам или кортежам столбцов
+    INDEXES: tuple[Union[str, tuple[str, ...]], ...] = ()
+    # Типы столбцов (int, float, date, str), по умолчанию - str.
+    # Значения переводятся в них один раз при load и insert
+    TYPES: dict[str, type] = {}
+    FILE_PATH: str = ""
+
+    # Хранить строки в компактных объектах со слотами вместо словарей
+    COMPACT_ROWS: bool = False
+    # Столбцы с небольшим числом различных значений, которые хранятся
+    # в строках кодами словаря (такие таблицы всегда хранят компактные
+    # строки)
+    ENCODED_ATTRS: tuple[str, ...] = ()
+    # Доля удаленных строк, при которой файл таблицы перезаписывается
+    # без них автоматически (None - только явный вызов compact)
+    AUTO_COMPACT_RATIO: Optional[float] = 0.5
+    # Сжатие файла таблицы: "gzip", "bz2", "lzma" или None
+    COMPRESSION: Optional[str] = None
+    # Столбцы или кортежи столбцов с фильтрами Блума, которые отсекают
+    # заведомо отсутствующие значения до поиска по индексам и до сброса
+    # строк соединения во временные файлы
+    BLOOM_ATTRS: tuple[Union[str, tuple[str, ...]], ...] = ()
+    # Столбцы, для которых при вставках обновляются скетчи приближенных
+    # агрегатов, и допустимая относительная ошибка скетчей
+    SKETCH_ATTRS: tuple[str, ...] = ()
+    SKETCH_ERROR: float = 0.01
+
+    def __init__(self, load_data=True) -> None:
+        # Таблица выгружена из базы (см. TableRegistry.unload)
+        self._unloaded = False
+        # Удаленные строки остаются в data как None (tombstone),
+        # чтобы позиции строк совпадали с их порядком в файле
+        self.data: list[Optional[dict[str, str]]] = []
+        self.dictionaries = {
+            attr: ColumnDictionary() for attr in self.ENCODED_ATTRS
+        }
+        self._encoded_row_type = self._make_encoded_row_type()
+        self.indexes: dict[tuple[str, ...], HashIndex] = {}
+
+        for attrs in self.UNIQUE_ATTRS:
+            self.indexes[_as_attrs(attrs)] = UniqueIndex(_as_attrs(attrs))
+
+        for attrs in self.INDEXES:
+            if _as_attrs(attrs) not in self.indexes:
+                self.indexes[_as_attrs(attrs)] = HashIndex(_as_attrs(attrs))
+
+        self.blooms: dict[tuple[str, ...], BloomFilter] = {}
+        self._build_blooms()
+        self.sketches: dict[str, sketches.ColumnSketch] = {}
+        self._build_sketches()
+
+        # Сколько первых строк data записано в файл таблицы (None - не
+        # известно). Изменения дописываются в конец файла, только если
+        # он соответствует data, иначе файл перезаписывается целиком
+        self._file_rows: Optional[int] = None
+        self._deleted = 0
+        # Файл таблицы на момент последнего чтения или записи
+        # (см. refresh)
+        self._file_state: Optional[_FileState] = None
+
+        # Изменения таблицы выполняются под блокировкой, а читатели
+        # работают со снимками и изменений не ждут
+        self._lock = threading.RLock()
+        self._snapshots: weakref.WeakSet[TableSnapshot] = weakref.WeakSet()
+        # Таблица подключена к разделяемой памяти и не изменяется
+        self._read_only = False
+
+        if load_data:
+            self.load()  # Подгружаем из CSV-файла сразу при инициализации
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Класс строк со словарями, блокировка и снимки
+        # создаются заново при восстановлении
+        state = self.__dict__.copy()
+        del state["_encoded_row_type"], state["_lock"], state["_snapshots"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._encoded_row_type = self._make_encoded_row_type()
+        self._lock = threading.RLock()
+        self._snapshots = weakref.WeakSet()
+
+    def _make_encoded_row_type(self) -> Optional[type[Row]]:
+        if not self.dictionaries:
+            return None
+
+        return encoded_row_type(
+            self.__class__.__name__, self.ATTRS, self.dictionaries
+        )
+
+    @property
+    def deleted_path(self) -> str:
+        """Журнал позиций удаленных строк, которые еще есть в файле."""
+        return f"{self.FILE_PATH}.deleted"
+
+    @property
+    def bloom_path(self) -> str:
+        """Фильтры Блума и число строк файла, по которым они построены."""
+        return f"{self.FILE_PATH}.bloom"
+
+    def snapshot(self) -> "TableSnapshot":
+        """
+        Версия таблицы на текущий момент для долгого чтения.
+
+        Снимок не копирует строки: он запоминает текущий список строк,
+        его длину и индексы. Пока снимок жив, изменение, которое
+        затрагивает уже существующие строки или индексы (update, delete,
+        save, load), сначала копирует их, а вставки только дописываются
+        в конец и снимку не видны.
+        """
+        with self._lock:
+            self._check_loaded()
+            snapshot = TableSnapshot(self)
+            self._snapshots.add(snapshot)
+
+        return snapshot
+
+    def _detach(self, copy_data: bool = True) -> None:
+        """
+        Отделяет данные таблицы от снимков перед их изменением.
+
+        Список строк копируется неглубоко (одним копированием ссылок),
+        и только если строки изменяются на месте (`copy_data`), а не
+        заменяются целиком. Индексы копируют только словари ключей:
+        списки позиций остаются общими со снимками, пока их не изменят
+        (см. `HashIndex.copy`).
+        """
+        if not self._snapshots:
+            return
+
+        if copy_data:
+            self.data = list(self.data)
+
+        self.indexes = {
+            attrs: index.copy() for attrs, index in self.indexes.items()
+        }
+        # Старые данные теперь принадлежат только существующим снимкам
+        self._snapshots = weakref.WeakSet()
+
+    def stored_tables(self) -> list["Table"]:
+        """Таблицы со своими файлами: сама таблица или ее разделы."""
+        return [self]
+
+    def row_size(self) -> int:
+        """
+        Средний объем памяти строки в байтах (строка и ее значения)
+        по первым _ROW_SIZE_SAMPLE строкам, не меньше 1.
+        """
+        sample = list(islice(self.rows(), _ROW_SIZE_SAMPLE))
+        size = sum(
+            sys.getsizeof(row) + sum(map(sys.getsizeof, row.values()))
+            for row in sample
+        )
+        return max(1, size // max(1, len(sample)))
+
+    def memory_usage(self) -> int:
+        """
+        Примерный объем памяти таблицы в байтах: список строк, строки
+        (по `row_size`), индексы и фильтры Блума. Таблица, подключенная
+        к разделяемой памяти, памяти процесса не занимает: ее строки
+        и индексы лежат в сегментах публикатора, а строки собираются
+        только при обращении к ним.
+        """
+        return sum(
+            sys.getsizeof(table.data)
+            + (len(table.data) - table._deleted) * table.row_size()
+            + sum(index.memory_usage() for index in table.indexes.values())
+            + sum(len(bloom.bits) for bloom in table.blooms.values())
+            for table in self.stored_tables()
+            if not table._read_only
+        )
+
+    def _can_unload(self) -> bool:
+        """
+        Таблицу можно выгрузить и загрузить заново из файла: файл
+        соответствует строкам, снимков нет, и она не подключена
+        к разделяемой памяти.
+        """
+        return not self._read_only and all(
+            table._file_rows == len(table.data) and not table._snapshots
+            for table in self.stored_tables()
+        )
+
+    def publish_shared(
+        self, prefix: str, segments: shared.SharedSegments
+    ) -> None:
+        """Публикует таблицу в разделяемой памяти для `Database.publish`."""
+        shared.publish(self, prefix, segments)
+
+    def attach_shared(
+        self, prefix: str, segments: shared.SharedSegments
+    ) -> None:
+        """Подключает таблицу к данным, опубликованным `Database.publish`."""
+        with self._lock:
+            self._detach(copy_data=False)
+            self.data, self.indexes = shared.attach(self, prefix, segments)
+            # Фильтры и скетчи не публикуются, а пустые фильтры
+            # отсекли бы все строки
+            self.blooms = {}
+            self.sketches = {}
+            self._read_only = True
+
+    def _unload(self) -> None:
+        """
+        Освобождает строки таблицы, выгруженной из базы. Объект таблицы
+        больше не используется: обращения к нему выбрасывают ValueError,
+        а не читают и не пишут устаревшую копию файла.
+        """
+        with self._lock:
+            for table in {self, *self.stored_tables()}:
+                table._unloaded = True
+                table.data = []
+                table._build_indexes()
+                table.blooms = {}
+                table.sketches = {}
+
+    def _check_loaded(self) -> None:
+        if self._unloaded:
+            raise ValueError(
+                f"Table '{self.__class__.__name__}' was unloaded to free "
+                f"memory, get it from the database again."
+            )
+
+    def _check_writable(self) -> None:
+        self._check_loaded()
+
+        if self._read_only:
+            raise ValueError(
+                f"Table '{self.__class__.__name__}' is attached "
+                f"from shared memory and is read-only."
+            )
+
+    def save(self) -> None:
+        """
+        Полностью перезаписывает файл таблицы. Удаленные строки при этом
+        отбрасываются, а журнал удалений очищается.
+        """
+        with self._lock:
+            self._check_writable()
+            self._detach(copy_data=False)
+            self.data = list(self.rows())
+            self._deleted = 0
+            self._build_indexes()
+            self._build_blooms()
+            self._build_sketches()
+
+            compression.write_rows(
+                self.FILE_PATH,
+                self.ATTRS,
+                self.data,
+                self.COMPRESSION,
+                append=False,
+            )
+
+            if os.path.exists(self.deleted_path):
+                os.remove(self.deleted_path)
+
+            self._file_rows = len(self.data)
+            self._file_state = _file_state(self.FILE_PATH, self.deleted_path)
+            self._save_blooms()
+
+    def compact(self) -> None:
+        """Убирает удаленные строки из памяти и из файла таблицы."""
+        self.save()
+
+    def load(self) -> None:
+        self._set_data(
+            *_read_table(
+                self.FILE_PATH,
+                self.deleted_path,
+                self.row_type,
+                self.column_types,
+                self.COMPRESSION,
+            )
+        )
+
+    def refresh(self) -> bool:
+        """
+        Применяет изменения файла таблицы, сделанные другим процессом,
+        и возвращает, изменилась ли таблица.
+
+        По размеру и времени изменения файла и журнала удалений
+        проверяется, менялись ли они с последнего чтения или записи.
+        Если файл только дописывали, читаются лишь новые байты: новые
+        строки и удаления добавляются в data, индексы, фильтры и скетчи.
+        Таблица перезагружается целиком, только если файл перезаписан
+        или укорочен (а также если он сжат).
+        """
+        with self._lock:
+            self._check_writable()
+            state = self._file_state
+
+            try:
+                stat = os.stat(self.FILE_PATH)
+            except FileNotFoundError:
+                stat = None
+
+            if state is None or stat is None:
+                if state is None and stat is None:
+                    return False
+
+                self.load()
+                return True
+
+            deleted_size = _file_size(self.deleted_path)
+
+            if (stat.st_mtime_ns, stat.st_size, deleted_size) == (
+                state.mtime_ns,
+                state.size,
+                state.deleted_size,
+            ):
+                return False
+
+            if not self._appended_only(state, stat, deleted_size):
+                self.load()
+                return True
+
+            return self._read_appended(state, stat.st_size, deleted_size)
+
+    def _appended_only(
+        self, state: _FileState, stat: os.stat_result, deleted_size: int
+    ) -> bool:
+        """Файл и журнал удалений с момента `state` только дописывались."""
+        return (
+            self.COMPRESSION is None
+            and self._file_rows == len(self.data)
+            and stat.st_ino == state.inode
+            and deleted_size >= state.deleted_size
+            and (
+                stat.st_size > state.size or stat.st_mtime_ns == state.mtime_ns
+            )
+            and _read_bytes(
+                self.FILE_PATH, state.size - len(state.tail), state.size
+            )
+            == state.tail
+        )
+
+    def _read_appended(
+        self, state: _FileState, size: int, deleted_size: int
+    ) -> bool:
+        """
+        Добавляет строки и удаления, дописанные в файлы после `state`,
+        и возвращает, были ли они.
+        """
+        chunk = _complete_lines(_read_bytes(self.FILE_PATH, state.size, size))
+        new_rows: list = []
+
+        if chunk:
+            with open(self.FILE_PATH, "r", newline="") as f:
+                header = f.readline()
+
+            # Переводы строк приводятся к "\n", как при чтении файла
+            new_rows = storage.read_rows(
+                io.StringIO(header + chunk.decode(), newline=None),
+                self.row_type,
+                self.column_types,
+            )
+
+        deleted_chunk = _complete_lines(
+            _read_bytes(self.deleted_path, state.deleted_size, deleted_size)
+        )
+        positions = list(map(int, deleted_chunk.split()))
+
+        if not all(
+            0 <= position < len(self.data) + len(new_rows)
+            for position in positions
+        ):
+            self.load()
+            return True
+
+        self._add_rows(new_rows)
+        self._file_rows = len(self.data)
+        positions = [
+            position
+            for position in positions
+            if self.data[position] is not None
+        ]
+
+        if positions:
+            self._detach()
+
+            for position in positions:
+                for index in self.indexes.values():
+                    index.remove(self.data[position], position)
+
+                self.data[position] = None
+
+            self._deleted += len(positions)
+
+        self._file_state = _file_state(
+            self.FILE_PATH,
+            self.deleted_path,
+            state.size + len(chunk),
+        )._replace(deleted_size=state.deleted_size + len(deleted_chunk))
+        return bool(new_rows or positions)
+
+    def read_range(self, start: int, stop: int) -> list:
+        """
+        Читает из файла таблицы строки с позициями [start, stop),
+        не загружая таблицу. Удаленные строки пропускаются. У сжатой
+        таблицы распаковываются только блоки с этими строками.
+        """
+        rows = compression.read_range(
+            self.FILE_PATH,
+            self.COMPRESSION,
+            start,
+            stop,
+            self.row_type,
+            self.column_types,
+        )
+        deleted = set(_read_deleted(self.deleted_path))
+        return [
+            row
+            for position, row in enumerate(rows, start)
+            if position not in deleted
+        ]
+
+    def _set_data(
+        self,
+        data: list,
+        file_rows: int,
+        deleted: int,
+        file_state: Optional[_FileState],
+    ) -> None:
+        """Заменяет строки таблицы прочитанными из файла."""
+        with self._lock:
+            self._check_writable()
+            self._detach(copy_data=False)
+            self.data = data
+            self._file_rows = file_rows
+            self._deleted = deleted
+            self._file_state = file_state
+            self._build_indexes()
+            self._load_blooms()
+            self._build_sketches()
+
+    def _load_row_type(
+        self, processes: bool
+    ) -> Union[type[Row], tuple[str, tuple[str, ...]], None]:
+        """
+        Класс строк для чтения файла в `_read_table`. В другой процесс
+        передаются аргументы `row_type`, а строки со словарями таблицы
+        читаются там обычными компактными и кодируются после загрузки.
+        """
+        if processes and self.row_type is not None:
+            return self.__class__.__name__, self.ATTRS
+
+        return self.row_type
+
+    def rows(self) -> Iterator[dict[str, str]]:
+        """Строки таблицы без удаленных."""
+        self._check_loaded()
+        return filter(None, self.data)
+
+    def _build_indexes(self) -> None:
+        for index in self.indexes.values():
+            index.build(self.data)
+
+    def _build_blooms(self) -> None:
+        """
+        Строит фильтры Блума заново с запасом вдвое на вставки. Фильтры
+        заменяются новыми объектами, поэтому снимки сохраняют старые.
+        """
+        blooms = {}
+
+        for attrs in self.BLOOM_ATTRS:
+            bloom = BloomFilter(_as_attrs(attrs), 2 * len(self.data))
+            bloom.build(self.data)
+            blooms[bloom.attrs] = bloom
+
+        self.blooms = blooms
+
+    def _build_sketches(self) -> None:
+        """
+        Строит скетчи столбцов SKETCH_ATTRS заново. Значения удаленных
+        и измененных строк остаются в скетчах до перестроения при
+        компактизации или загрузке.
+        """
+        self.sketches = {
+            attr: sketches.ColumnSketch.of(
+                (row[attr] for row in self.rows()), self.SKETCH_ERROR
+            )
+            for attr in self.SKETCH_ATTRS
+        }
+
+    def _load_blooms(self) -> None:
+        """
+        Читает фильтры Блума из `bloom_path` и добавляет в них строки,
+        дописанные в файл таблицы после сохранения фильтров. Фильтры
+        подходят к файлу, только если его начало, по которому они
+        построены, не изменилось (сверяется контрольная сумма).
+        Иначе, как и без файла фильтров, они строятся заново.
+        """
+        if not self.BLOOM_ATTRS:
+            return
+
+        try:
+            with open(self.bloom_path, "rb") as f:
+                rows, size, checksum = map(int, f.readline().split())
+                blooms = load_filters(f)
+        except (FileNotFoundError, ValueError):
+            rows, blooms = None, {}
+        else:
+            if (
+                rows > len(self.data)
+                or size > _file_size(self.FILE_PATH)
+                or _checksum(self.FILE_PATH, size) != checksum
+            ):
+                rows, blooms = None, {}
+
+        if rows is None or blooms.keys() != set(
+            map(_as_attrs, self.BLOOM_ATTRS)
+        ):
+            self._build_blooms()
+        else:
+            for bloom in blooms.values():
+                bloom.build(islice(self.data, rows, None))
+
+            self.blooms = blooms
+
+            if any(bloom.count > bloom.capacity for bloom in blooms.values()):
+                self._build_blooms()
+
+        if rows != len(self.data):
+            self._save_blooms()
+
+    def _save_blooms(self) -> None:
+        """
+        Сохраняет фильтры Блума вместе с числом строк и контрольной
+        суммой прочитанной части файла, по которым они построены.
+        Для пустой таблицы или таблицы без файла фильтры не сохраняются.
+        """
+        state = self._file_state
+
+        if (
+            not self.BLOOM_ATTRS
+            or self._file_rows != len(self.data)
+            or not self.data
+            or state is None
+        ):
+            return
+
+        with open(self.bloom_path, "wb") as f:
+            checksum = _checksum(self.FILE_PATH, state.size)
+            f.write(f"{len(self.data)} {state.size} {checksum}\n".encode())
+            dump_filters(self.blooms.values(), f)
+
+    @property
+    def column_types(self) -> tuple[tuple[str, type], ...]:
+        """Столбцы, значения которых хранятся не строками, и их типы."""
+        return tuple(
+            (attr, self.TYPES[attr])
+            for attr in self.ATTRS
+            if self.TYPES.get(attr, str) is not str
+        )
+
+    @property
+    def row_type(self) -> Optional[type[Row]]:
+        """Класс компактных строк таблицы или None, если строки - словари."""
+        if self._encoded_row_type is not None:
+            return self._encoded_row_type
+
+        if not self.COMPACT_ROWS:
+            return None
+
+        return row_type(self.__class__.__name__, self.ATTRS)
+
+    @abstractmethod
+    def select(self, *args, **kwargs) -> list[dict[str, str]]:
+        pass  # pragma: no cover
+
+    def find(self, where: dict[str, Any]) -> list[dict[str, str]]:
+        """
+        Возвращает строки, у которых значения столбцов равны `where`.
+        Если для части столбцов есть индекс, строки ищутся по нему.
+        """
+        return [self.data[position] for position in self._find(where)]
+
+    def _find(self, where: dict[str, Any]) -> list[int]:
+        self._check_loaded()
+        return _find_positions(
+            self.data,
+            len(self.data),
+            self.indexes,
+            self.dictionaries,
+            self.blooms,
+            self._coerce(where),
+        )
+
+    def _prepare_find(self, attrs: tuple[str, ...]) -> Callable[..., list]:
+        """
+        Поиск строк по значениям столбцов `attrs` для `Database.prepare`:
+        имена столбцов проверяются, а индекс выбирается один раз.
+        """
+        criteria = self._criteria(attrs)
+        index_attrs = next(
+            (
+                index_attrs
+                for index_attrs in self.indexes
+                if set(index_attrs) <= set(attrs)
+            ),
+            None,
+        )
+
+        def find(*values: Any) -> list:
+            self._check_loaded()
+            where = criteria(values)
+            indexes = (
+                {}
+                if index_attrs is None
+                else {index_attrs: self.indexes[index_attrs]}
+            )
+            positions = _find_positions(
+                self.data,
+                len(self.data),
+                indexes,
+                self.dictionaries,
+                self.blooms,
+                where,
+            )
+            return [self.data[position] for position in positions]
+
+        return find
+
+    def _criteria(
+        self, attrs: tuple[str, ...]
+    ) -> Callable[[tuple], dict[str, Any]]:
+        """
+        Функция, которая переводит значения столбцов `attrs` в условие
+        поиска. Имена столбцов проверяются, а типы столбцов выбираются
+        один раз, поэтому при каждом вызове только разбираются строки.
+        """
+        self._check_attrs(attrs)
+        typed = [
+            (attr, self.TYPES[attr]) for attr in attrs if attr in self.TYPES
+        ]
+
+        def criteria(values: tuple) -> dict[str, Any]:
+            _check_values_count(attrs, values)
+            where = dict(zip(attrs, values))
+
+            for attr, column_type in typed:
+                if isinstance(where[attr], str):
+                    where[attr] = schema.parse(attr, where[attr], column_type)
+
+            return where
+
+        return criteria
+
+    def _check_attrs(self, values: Iterable[str]) -> None:
+        """Проверяет, что все имена столбцов есть в таблице."""
+        for attr in values:
+            if attr not in self.ATTRS:
+                raise ValueError(
+                    f"'{attr}' is not an attribute "
+                    f"of the '{self.__class__.__name__}'."
+                )
+
+    def _coerce(
+        self, values: dict[str, Any], *, new: bool = False
+    ) -> dict[str, Any]:
+        """
+        Проверяет имена столбцов и разбирает строковые значения.
+        Новые значения строк (`new`) еще и проверяются по типам
+        столбцов (см. `schema.convert`): иначе они записались бы
+        в файл, который потом не загрузится.
+        """
+        self._check_attrs(values)
+
+        if new:
+            return {
+                attr: schema.convert(attr, value, self.TYPES.get(attr, str))
+                for attr, value in values.items()
+            }
+
+        return {
+            attr: (
+                schema.parse(attr, value, self.TYPES[attr])
+                if isinstance(value, str) and attr in self.TYPES
+                else value
+            )
+            for attr, value in values.items()
+        }
+
+    def _check_unique(
+        self, new_row: dict[str, str], ignore: Iterable[int] = ()
+    ) -> None:
+        """
+        Проверка уникальности значений для атрибутов, указанных в UNIQUE_ATTRS.
+        Если значение уже существует, выбрасывается исключение.
+        Строки на позициях `ignore` (например, изменяемые) не учитываются.
+        """
+        for unique_attr in self.UNIQUE_ATTRS:
+            index = self.indexes[_as_attrs(unique_attr)]
+            bloom = self.blooms.get(index.attrs)
+
+            # Если фильтр Блума не знает значения, его точно нет в индексе
+            if bloom is not None and index.key(new_row) not in bloom:
+                continue
+
+            if all(
+                position in ignore
+                for position in index.lookup(index.key(new_row))
+            ):
+                continue
+
+            if isinstance(unique_attr, str):
+                raise ValueError(
+                    f"Value '{new_row[unique_attr]}' already exists in "
+                    f"column '{unique_attr}' of the "
+                    f"'{self.__class__.__name__}', which must be unique."
+                )
+            else:
+                values = ", ".join(
+                    f"{attr}={new_row[attr]}" for attr in unique_attr
+                )
+                raise ValueError(
+                    f"Values '{values}' already exists in "
+                    f"columns {unique_attr} of the "
+                    f"'{self.__class__.__name__}', which must be unique."
+                )
+
+    def _parse_batch(
+        self, entries: list[Mapping[str, Any]]
+    ) -> tuple[list[dict[str, Any]], dict[int, str]]:
+        """
+        Проверяет имена столбцов пачки строк и разбирает строковые
+        значения по столбцам: функция разбора применяется ко всему
+        столбцу одним проходом `map`. Только столбец с некорректными
+        значениями разбирается по одному значению, чтобы найти их все.
+        Пропущенные значения и значения других типов проверяются
+        по типам столбцов (см. `schema.check`).
+
+        Возвращает строки и ошибки по номерам строк в пачке; значения
+        строк с ошибками остаются неразобранными.
+        """
+        rows = [dict(entry) for entry in entries]
+        errors: dict[int, str] = {}
+
+        for number, row in enumerate(rows):
+            try:
+                self._check_attrs(row)
+            except ValueError as error:
+                errors[number] = str(error)
+
+        for attr in self.ATTRS:
+            column_type = self.TYPES.get(attr, str)
+            numbers = []
+
+            for number, row in enumerate(rows):
+                if number in errors:
+                    continue
 
-    _RT = dict[str, str]
+                value = row.get(attr)
 
-    def __init__(self) -> None:
-        self.tables: dict[str, "Table"] = {}
+                if isinstance(value, str):
+                    numbers.append(number)
+                    continue
 
-    def register_table(self, table_name: str, table: "Table") -> None:
-        self.tables[table_name] = table
+                try:
+                    schema.check(attr, value, column_type)
+                except ValueError as error:
+                    errors[number] = str(error)
 
-    def insert(
-        self, table_name, data, *, sep: Literal[" ", ","] = " "
-    ) -> None:
-        table = self.tables.get(table_name)
-        if table:
-            table.insert(data, sep=sep)
-        else:
-            raise ValueError(f"Table '{table_name}' does not exist.")
+            if column_type is str:
+                continue
 
-    def select(self, table_name: str, *args, **kwargs) -> Optional[list[_RT]]:
-        table = self.tables.get(table_name)
-        return table.select(*args, **kwargs) if table else None
+            values = [rows[number][attr] for number in numbers]
 
-    def join(
-        self, tables: tuple[str, ...], join_attrs: list[tuple[str, str]]
-    ) -> list[_RT]:
+            try:
+                parsed = list(map(schema.parser(column_type), values))
+            except ValueError:
+                parsed = []
+
+                for number, value in zip(numbers, values):
+                    try:
+                        value = schema.parse(attr, value, column_type)
+                    except ValueError as error:
+                        errors.setdefault(number, str(error))
+
+                    parsed.append(value)
+
+            for number, value in zip(numbers, parsed):
+                rows[number][attr] = value
+
+        return rows, errors
+
+    def _batch_errors(
+        self, new_rows: Mapping[int, dict[str, Any]]
+    ) -> dict[int, str]:
         """
-        Объединяет несколько таблиц по указанным аттрибутам.
+        Проверяет данные пачки строк (номер строки - строка) и
+        возвращает сообщения об ошибках по номерам некорректных строк.
+        Таблицы с проверками, которые выгодно выполнять по столбцам
+        сразу для всей пачки, переопределяют этот метод.
+        """
+        return _row_errors(self._validate_data, new_rows)
 
-        :param tables: Кортеж имен таблиц.
-        :param join_attrs: Список кортежей, где каждый кортеж представляет
-        пары 'таблица.атрибут' для соединения.
+    def _validate_data(self, new_row: dict[str, str]) -> None:
+        """
+        Проверяет целостность и корректность данных
+        новой строки перед добавлением в таблицу.
 
-        :return: Результат объединения таблиц, если удалось объединить
-        таблицы по указанным атрибутам, иначе пустой список.
+        Метод выполняет базовую проверку новой строки `new_row`,
+        чтобы убедиться, что количество переданных данных совпадает с
+        количеством атрибутов таблицы. Если количество значений не совпадает,
+        метод выбрасывает исключение `ValueError`.
         """
-        if len(tables) < 2:
+        if len(new_row) != len(self.ATTRS):
             raise ValueError(
-                "At least two tables are required to perform a join."
+                f"The number of values in the new row '{len(new_row)}' "
+                f"does not match the number of '{self.__class__.__name__}' "
+                f"attributes '{len(self.ATTRS)}'."
             )
 
-        tables_objects = [self.tables.get(table_name) for table_name in tables]
+    def insert(self, data: str, *, sep: Literal[" ", ","] = " ") -> None:
+        # Строка через запятую разбирается как строка CSV,
+        # поэтому значения с запятыми можно взять в кавычки
+        values = next(csv.reader([data])) if sep == "," else data.split(sep)
+        entry = storage.convert_row(
+            dict(zip(self.ATTRS, values)), self.column_types
+        )
+        self._validate_data(entry)
 
-        for table_name, table in zip(tables, tables_objects):
-            if not table:
-                raise ValueError(f"Table '{table_name}' does not exist.")
+        with self._lock:
+            self._check_unique(entry)
+            self._append([entry])
 
-        if len(join_attrs) != len(tables) - 1:
-            raise ValueError(
-                "Number of join attributes must be "
-                "one less than the number of tables."
+    def insert_many(
+        self, entries: Iterable[Mapping[str, Any]], *, batch_size: int = 10000
+    ) -> int:
+        """
+        Вставляет строки `entries` (словари столбец - значение) пачками
+        по `batch_size` и возвращает их число. Строковые значения
+        разбираются в типы столбцов.
+
+        Каждая пачка проверяется целиком (данные и уникальность среди
+        строк таблицы и самой пачки), индексируется и дописывается
+        в файл одной записью. Значения и данные проверяются по столбцам
+        для всей пачки, и ошибка перечисляет все некорректные строки
+        пачки (с номерами строк от начала `entries`). Пачка с такими
+        строками не вставляется, а предыдущие пачки остаются в таблице.
+        """
+        entries = iter(entries)
+        count = 0
+
+        while entries_batch := list(islice(entries, batch_size)):
+            batch, errors = self._parse_batch(entries_batch)
+            errors.update(
+                self._batch_errors(
+                    {
+                        number: row
+                        for number, row in enumerate(batch)
+                        if number not in errors
+                    }
+                )
             )
+            _raise_row_errors(errors, first=count + 1)
 
-        for attrs in join_attrs:
-            if len(attrs) != 2:
-                raise ValueError(
-                    "The join_attrs elements must consist of 2 "
-                    "elements with which the tables will be linked"
-                )
+            with self._lock:
+                self._check_new_rows(batch, ignore={}, validated=True)
+                self._append(batch)
 
-            for attr in attrs:
-                if not attr.count("."):
-                    raise ValueError(
-                        f"Join attribute '{attr}' must have the "
-                        f"following format 'table_name.table_attribute'."
-                    )
+            count += len(batch)
 
-                _table_name, _attr = attr.split(".")
-                _table = self.tables.get(_table_name)
+        return count
 
-                if not _table:
-                    raise ValueError(f"Table '{_table_name}' does not exist.")
+    def update(self, where: dict[str, Any], values: dict[str, Any]) -> int:
+        """
+        Изменяет значения `values` в строках, подходящих под `where`,
+        и возвращает число измененных строк.
 
-                if _attr not in _table.ATTRS:
-                    raise ValueError(
-                        f"'{_attr}' is not an "
-                        f"attribute of table '{_table_name}'."
-                    )
+        Старая версия строки помечается удаленной, а новая дописывается
+        в конец таблицы и файла, поэтому файл целиком не перезаписывается.
+        Если новые значения нарушают уникальность или проверку данных,
+        таблица не изменяется.
+        """
+        with self._lock:
+            values = self._coerce(values, new=True)
+            positions = self._find(where)
 
-        result: list[dict[str, str]] = [
-            {f"{tables[0]}.{key}": value for key, value in row.items()}
-            for row in tables_objects[0].data
-        ]
+            if not positions:
+                return 0
 
-        for i in range(1, len(tables_objects)):
-            table = tables_objects[i]
-            join_attr1, join_attr2 = join_attrs[i - 1]
-            join_attr2 = join_attr2.split(".")[1]
-            new_result = []
-
-            for row1 in result:
-                for row2 in table.data:
-                    if row1[join_attr1] == row2[join_attr2]:
-                        new_row2 = {
-                            f"{tables[i]}.{key}": value
-                            for key, value in row2.items()
-                        }
-                        merged_row = {**row1, **new_row2}
-                        new_result.append(merged_row)
-
-            result = new_result
+            new_rows = [
+                {**self.data[position], **values} for position in positions
+            ]
 
-        return result
+            self._check_new_rows(new_rows, ignore=set(positions))
 
-    def aggregate(
+            self._remove(positions)
+            self._append(new_rows)
+            self._auto_compact()
+
+            return len(positions)
+
+    def _check_new_rows(
         self,
-        table_name: str,
-        column: str,
-        operation: Literal["SUM", "AVG", "COUNT", "MIN", "MAX"],
+        new_rows: list[dict[str, Any]],
+        ignore: Any,
         *,
-        group_by: Optional[str] = None,
-    ) -> Union[_RT, list[_RT]]:
+        validated: bool = False,
+    ) -> None:
         """
-        Выполняет агрегацию по указанной таблице и столбцу.
+        Проверяет новые или измененные строки: данные (если они еще
+        не проверены, `validated`), уникальность среди строк таблицы
+        (строки `ignore` не учитываются) и уникальность среди самих
+        новых строк.
+        """
+        if not validated:
+            _raise_row_errors(
+                self._batch_errors(dict(enumerate(new_rows))), first=1
+            )
 
-        :param table_name: Имя таблицы
-        :param column: Столбец для агрегации
-        :param operation: Операция агрегации
-        ('SUM', 'AVG', 'COUNT', 'MIN', 'MAX')
+        seen: dict[tuple[str, ...], set] = {}
 
-        :param group_by: Столбец для группировки
-        :return: Результат агрегации
-        """
-        table = self.tables.get(table_name)
+        for new_row in new_rows:
+            self._check_unique(new_row, ignore=ignore)
 
-        if not table:
-            raise ValueError(f"Table '{table_name}' does not exist.")
+            # Новые строки не должны совпасть и друг с другом
+            for unique_attr in self.UNIQUE_ATTRS:
+                index = self.indexes[_as_attrs(unique_attr)]
+                keys = seen.setdefault(index.attrs, set())
 
-        if column not in table.ATTRS:
-            raise ValueError(
-                f"Column '{column}' does not exist in table '{table_name}'."
-            )
+                if index.key(new_row) in keys:
+                    raise ValueError(
+                        f"New values of {unique_attr} of the "
+                        f"'{self.__class__.__name__}' repeat, "
+                        f"which must be unique."
+                    )
 
-        if group_by and group_by not in table.ATTRS:
-            raise ValueError(
-                f"Column '{group_by}' does not exist in table '{table_name}'."
-            )
+                keys.add(index.key(new_row))
 
-        aggregate_func = self._aggregate_functions.get(operation)
+    def delete(self, where: dict[str, Any]) -> int:
+        """
+        Удаляет строки, подходящие под `where`, и возвращает их число.
 
-        if not aggregate_func:
-            raise ValueError(f"Operation '{operation}' is not supported.")
+        Строки помечаются удаленными, а их позиции дописываются в журнал
+        удалений. Файл таблицы перезаписывается только при компактизации.
+        """
+        with self._lock:
+            positions = self._find(where)
 
-        if operation in ("AVG", "SUM") and not all(
-            sym.replace(".", "", 1).isdigit()
-            for row in table.data
-            for sym in row[column]
+            if not positions:
+                return 0
+
+            self._remove(positions)
+            self._auto_compact()
+
+            return len(positions)
+
+    def _auto_compact(self) -> None:
+        """Компактизирует таблицу, если удаленных строк слишком много."""
+        if (
+            self.AUTO_COMPACT_RATIO is not None
+            and self._deleted > len(self.data) * self.AUTO_COMPACT_RATIO
         ):
-            raise TypeError(
-                f"The '{operation}' operation cannot be applied to column "
-                f"'{column}' as it contains non-numeric data."
-            )
+            self.compact()
 
-        if not group_by:
-            values = [
-                (
-                    float(row[column])
-                    if row[column].count(".") == 1
-                    else (
-                        int(row[column])
-                        if all(sym.isdigit() for sym in row[column])
-                        else row[column]
-                    )
-                )
-                for row in table.data
-            ]
+    def _remove(self, positions: list[int]) -> None:
+        self._check_writable()
+        self._detach()
 
-            return {f"{operation}({column})": str(aggregate_func(values))}
+        for position in positions:
+            for index in self.indexes.values():
+                index.remove(self.data[position], position)
 
+            self.data[position] = None
+
+        self._deleted += len(positions)
+
+        if self._file_rows != len(self.data):
+            self.save()
         else:
-            grouping: dict[str, list[Union[int, float, str]]] = {}
-
-            for row in table.data:
-                key = row[group_by]
-                if key not in grouping:
-                    grouping[key] = []
-
-                value = [
-                    (
-                        float(row[column])
-                        if row[column].count(".") == 1
-                        else (
-                            int(row[column])
-                            if all(sym.isdigit() for sym in row[column])
-                            else row[column]
-                        )
-                    )
-                ][0]
+            with open(self.deleted_path, "a") as f:
+                f.writelines(f"{position}\n" for position in positions)
 
-                grouping[key].append(value)
+            if self._file_state is not None:
+                self._file_state = self._file_state._replace(
+                    deleted_size=_file_size(self.deleted_path)
+                )
 
-            return [
-                {
-                    f"{group_by}": key,
-                    f"{operation}({column})": str(aggregate_func(value)),
-                }
-                for key, value in grouping.items()
-            ]
+    def _append(self, new_rows: list[dict[str, Any]]) -> None:
+        self._check_writable()
+        start = len(self.data)
+        in_sync = self._file_rows == start
+        self._add_rows(new_rows)
 
+        if not in_sync:
+            self.save()
+            return
 
-class Table(ABC):
-    """Абстрактный базовый класс для таблиц с вводом/выводом файлов CSV."""
+        compression.write_rows(
+            self.FILE_PATH,
+            self.ATTRS,
+            self.data[start:],
+            self.COMPRESSION,
+            append=True,
+        )
 
-    ATTRS: tuple[str, ...] = ()
-    UNIQUE_ATTRS: tuple[Union[str, tuple[str, ...]], ...] = ()
-    FILE_PATH: str = ""
+        self._file_rows = len(self.data)
+        self._file_state = _file_state(self.FILE_PATH, self.deleted_path)
+
+    def _add_rows(self, new_rows: Iterable[Mapping[str, Any]]) -> None:
+        """Добавляет строки в конец data, индексы, фильтры и скетчи."""
+        for new_row in new_rows:
+            if self.row_type is not None:
+                new_row = self.row_type(*map(new_row.get, self.ATTRS))
+
+            for index in self.indexes.values():
+                index.add(new_row, len(self.data))
+
+            for bloom in self.blooms.values():
+                bloom.add(bloom.key(new_row))
+
+            for attr, sketch in self.sketches.items():
+                sketch.add(new_row[attr])
+
+            self.data.append(new_row)
+
+        if any(bloom.count > bloom.capacity for bloom in self.blooms.values()):
+            self._build_blooms()
+
+
+def _row_errors(
+    check: Callable[[dict[str, Any]], None],
+    new_rows: Mapping[int, dict[str, Any]],
+) -> dict[int, str]:
+    """Проверяет строки по одной и собирает сообщения об ошибках."""
+    errors = {}
+
+    for number, new_row in new_rows.items():
+        try:
+            check(new_row)
+        except ValueError as error:
+            errors[number] = str(error)
+
+    return errors
+
+
+def _raise_row_errors(errors: Mapping[int, str], first: int) -> None:
+    """
+    Выбрасывает одно исключение ValueError со всеми ошибками пачки.
+    Номера строк пачки отсчитываются от 0 и выводятся начиная с `first`.
+    """
+    if errors:
+        lines = "".join(
+            f"\nrow {number + first}: {errors[number]}"
+            for number in sorted(errors)
+        )
+        raise ValueError(f"Found {len(errors)} invalid row(s):{lines}")
+
+
+class TableSnapshot:
+    """
+    Неизменяемая версия таблицы, созданная `Table.snapshot`.
+
+    Снимок видит строки и индексы таблицы на момент создания,
+    а остальные атрибуты (ATTRS, TYPES, словари) берет у самой таблицы.
+    """
+
+    def __init__(self, table: Table) -> None:
+        self.table = table
+        self.data = table.data
+        self.length = len(table.data)
+        self.indexes = table.indexes
+        self.blooms = table.blooms
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.table, name)
+
+    def rows(self) -> Iterator[dict[str, str]]:
+        """
+        Строки снимка без удаленных и без вставленных после него.
+        Генератор держит ссылку на снимок, поэтому тот остается
+        действующим, пока строки не перебраны до конца.
+        """
+        yield from filter(None, islice(self.data, self.length))
+
+    def find(self, where: dict[str, Any]) -> list[dict[str, str]]:
+        """Как `Table.find`, но по строкам и индексам снимка."""
+        positions = _find_positions(
+            self.data,
+            self.length,
+            self.indexes,
+            self.dictionaries,
+            self.blooms,
+            self.table._coerce(where),
+        )
+        return [self.data[position] for position in positions]
+
+
+def _stable_hash(value: Any) -> int:
+    """
+    Хеш значения для выбора раздела. В отличие от `hash` строк он
+    одинаков во всех процессах и запусках, поэтому строка после
+    перезапуска ищется в том же разделе, в файл которого записана.
+    """
+    if isinstance(value, int):
+        return value
+
+    return zlib.crc32(str(value).encode())
+
+
+def _partition_path(path: str, number: int) -> str:
+    """Файл раздела: table.csv -> table.p0.csv."""
+    root, extension = os.path.splitext(path)
+    return f"{root}.p{number}{extension}"
+
+
+@cache
+def _partition_class(table_class: type["PartitionedTable"]) -> type[Table]:
+    """
+    Класс разделов таблицы: ее класс без разбиения на разделы,
+    путь файла которого вычисляется по пути файла всей таблицы.
+    """
+    base = next(
+        cls
+        for cls in table_class.__mro__
+        if not issubclass(cls, PartitionedTable)
+    )
+    return type(
+        base.__name__,
+        (base,),
+        {
+            "FILE_PATH": property(
+                lambda self: _partition_path(
+                    self._parent.FILE_PATH, self._number
+                )
+            )
+        },
+    )
+
+
+class PartitionedTable(Table):
+    """
+    Таблица, строки которой разбиты на разделы по значению столбца
+    PARTITION_BY. Каждый раздел - таблица того же класса со своим
+    файлом, журналом удалений и индексами, поэтому разделы загружаются
+    и сохраняются независимо, а запросы с условием на PARTITION_BY
+    читают только раздел с этим значением.
+
+    Указывается в базовых классах перед классом таблицы, как в
+    `PartitionedEmployeeProjectTable`.
+    """
+
+    PARTITION_BY: str = ""
+    # Число хеш-разделов или возрастающие границы диапазонов: с границами
+    # (b1, b2) значения меньше b1 попадают в раздел 0, значения
+    # из [b1, b2) - в раздел 1, остальные - в раздел 2
+    PARTITIONS: Union[int, tuple[Any, ...]] = 4
 
     def __init__(self, load_data=True) -> None:
-        self.data: list[dict[str, str]] = []
+        super().__init__(False)
+        # Фильтры Блума и скетчи есть у каждого раздела
+        self.blooms = {}
+        self.sketches = {}
+        partition_class = _partition_class(type(self))
+        count = (
+            self.PARTITIONS
+            if isinstance(self.PARTITIONS, int)
+            else len(self.PARTITIONS) + 1
+        )
+        self.partitions: list[Table] = []
+
+        for number in range(count):
+            partition = partition_class(load_data=False)
+            partition._parent, partition._number = self, number
+            # Разделы кодируют значения общими словарями, поэтому коды
+            # строк из разных разделов сравнимы между собой
+            partition.dictionaries = self.dictionaries
+            partition._encoded_row_type = self._encoded_row_type
+            self.partitions.append(partition)
 
         if load_data:
-            self.load()  # Подгружаем из CSV-файла сразу при инициализации
+            self.load()
+
+    def _partition_number(self, value: Any) -> int:
+        if value is None:
+            return 0
+
+        if isinstance(self.PARTITIONS, int):
+            return _stable_hash(value) % self.PARTITIONS
+
+        return bisect_right(self.PARTITIONS, value)
+
+    def _partitions_for(self, where: dict[str, Any]) -> list[Table]:
+        """Разделы, в которых могут быть строки, подходящие под `where`."""
+        where = self._coerce(where)
+
+        if self.PARTITION_BY not in where:
+            return self.partitions
+
+        number = self._partition_number(where[self.PARTITION_BY])
+        return [self.partitions[number]]
+
+    def stored_tables(self) -> list[Table]:
+        return self.partitions
+
+    def snapshot(self) -> "PartitionedSnapshot":  # type: ignore[override]
+        with self._lock:
+            return PartitionedSnapshot(self)
+
+    def publish_shared(
+        self, prefix: str, segments: shared.SharedSegments
+    ) -> None:
+        for number, partition in enumerate(self.partitions):
+            partition.publish_shared(f"{prefix}_p{number}", segments)
+
+    def attach_shared(
+        self, prefix: str, segments: shared.SharedSegments
+    ) -> None:
+        with self._lock:
+            for number, partition in enumerate(self.partitions):
+                partition.attach_shared(f"{prefix}_p{number}", segments)
+
+            self._read_only = True
 
     def save(self) -> None:
-        with open(self.FILE_PATH, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=self.ATTRS)
-            writer.writeheader()
-            writer.writerows(self.data)
+        with self._lock:
+            for partition in self.partitions:
+                partition.save()
 
     def load(self) -> None:
-        if os.path.exists(self.FILE_PATH):
-            with open(self.FILE_PATH, "r") as f:
-                reader = csv.DictReader(f)
-                self.data = [row for row in reader]
+        with self._lock:
+            for partition in self.partitions:
+                partition.load()
+
+    def refresh(self) -> bool:
+        with self._lock:
+            return any([partition.refresh() for partition in self.partitions])
+
+    def read_range(self, start: int, stop: int) -> list:
+        raise ValueError(
+            f"Table '{self.__class__.__name__}' is partitioned: "
+            f"read ranges of its partitions instead."
+        )
+
+    def rows(self) -> Iterator[dict[str, str]]:
+        return chain.from_iterable(
+            partition.rows() for partition in self.partitions
+        )
+
+    def find(self, where: dict[str, Any]) -> list[dict[str, str]]:
+        return [
+            row
+            for partition in self._partitions_for(where)
+            for row in partition.find(where)
+        ]
 
-    @abstractmethod
-    def select(self, *args, **kwargs) -> list[dict[str, str]]:
-        pass  # pragma: no cover
+    def _prepare_find(self, attrs: tuple[str, ...]) -> Callable[..., list]:
+        finds = [
+            partition._prepare_find(attrs) for partition in self.partitions
+        ]
+
+        if self.PARTITION_BY not in attrs:
+            return lambda *values: [
+                row for find in finds for row in find(*values)
+            ]
 
-    def _check_unique(self, new_row: dict[str, str]) -> None:
+        criteria = self._criteria(attrs)
+
+        def find(*values: Any) -> list:
+            where = criteria(values)
+            number = self._partition_number(where[self.PARTITION_BY])
+            return finds[number](*where.values())
+
+        return find
+
+    def _check_unique(
+        self,
+        new_row: dict[str, str],
+        ignore: Mapping[Table, Iterable[int]] = {},
+    ) -> None:
         """
-        Проверка уникальности значений для атрибутов, указанных в UNIQUE_ATTRS.
-        Если значение уже существует, выбрасывается исключение.
+        Проверяет уникальность во всех разделах: уникальные столбцы
+        могут не включать PARTITION_BY. `ignore` - позиции строк,
+        которые не учитываются, по разделам.
         """
-        for unique_attr in self.UNIQUE_ATTRS:
-            if isinstance(unique_attr, str):
-                if any(
-                    row[unique_attr] == new_row[unique_attr]
-                    for row in self.data
-                ):
-                    raise ValueError(
-                        f"Value '{new_row[unique_attr]}' already exists in "
-                        f"column '{unique_attr}' of the "
-                        f"'{self.__class__.__name__}', which must be unique."
-                    )
-            else:
-                if any(
-                    all(row[attr] == new_row[attr] for attr in unique_attr)
-                    for row in self.data
-                ):
-                    values = ", ".join(
-                        f"{attr}={new_row[attr]}" for attr in unique_attr
-                    )
-                    raise ValueError(
-                        f"Values '{values}' already exists in "
-                        f"columns {unique_attr} of the "
-                        f"'{self.__class__.__name__}', which must be unique."
-                    )
+        for partition in self.partitions:
+            partition._check_unique(new_row, ignore.get(partition, ()))
 
-    def _validate_data(self, new_row: dict[str, str]) -> None:
+    def update(self, where: dict[str, Any], values: dict[str, Any]) -> int:
         """
-        Проверяет целостность и корректность данных
-        новой строки перед добавлением в таблицу.
-
-        Метод выполняет базовую проверку новой строки `new_row`,
-        чтобы убедиться, что количество переданных данных совпадает с
-        количеством атрибутов таблицы. Если количество значений не совпадает,
-        метод выбрасывает исключение `ValueError`.
+        Как `Table.update`. Если меняется значение PARTITION_BY,
+        строка переносится в раздел нового значения.
         """
-        if len(new_row) != len(self.ATTRS):
-            raise ValueError(
-                f"The number of values in the new row '{len(new_row)}' "
-                f"does not match the number of '{self.__class__.__name__}' "
-                f"attributes '{len(self.ATTRS)}'."
+        with self._lock:
+            values = self._coerce(values, new=True)
+            matches = {
+                partition: positions
+                for partition in self._partitions_for(where)
+                if (positions := partition._find(where))
+            }
+            new_rows = [
+                {**partition.data[position], **values}
+                for partition, positions in matches.items()
+                for position in positions
+            ]
+
+            if not new_rows:
+                return 0
+
+            self._check_new_rows(
+                new_rows,
+                ignore={
+                    partition: set(positions)
+                    for partition, positions in matches.items()
+                },
             )
 
-    def insert(self, data: str, *, sep: Literal[" ", ","] = " ") -> None:
-        entry = dict(zip(self.ATTRS, data.split(sep)))
-        self._validate_data(entry)
-        self._check_unique(entry)
-        self.data.append(entry)
-        self.save()
+            for partition, positions in matches.items():
+                partition._remove(positions)
+
+            self._append(new_rows)
+
+            for partition in self.partitions:
+                partition._auto_compact()
+
+            return len(new_rows)
+
+    def delete(self, where: dict[str, Any]) -> int:
+        with self._lock:
+            return sum(
+                partition.delete(where)
+                for partition in self._partitions_for(where)
+            )
+
+    def _append(self, new_rows: list[dict[str, Any]]) -> None:
+        groups: dict[int, list[dict[str, Any]]] = {}
+
+        for new_row in new_rows:
+            number = self._partition_number(new_row[self.PARTITION_BY])
+            groups.setdefault(number, []).append(new_row)
+
+        for number, rows in groups.items():
+            self.partitions[number]._append(rows)
+
+
+class PartitionedSnapshot:
+    """Снимок разделенной таблицы: снимки всех ее разделов."""
+
+    def __init__(self, table: PartitionedTable) -> None:
+        self.table = table
+        self.partitions = [
+            partition.snapshot() for partition in table.partitions
+        ]
+        self.length = sum(snapshot.length for snapshot in self.partitions)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.table, name)
+
+    def rows(self) -> Iterator[dict[str, str]]:
+        for snapshot in self.partitions:
+            yield from snapshot.rows()
+
+    def find(self, where: dict[str, Any]) -> list[dict[str, str]]:
+        numbers = [
+            partition._number
+            for partition in self.table._partitions_for(where)
+        ]
+        return [
+            row
+            for number in numbers
+            for row in self.partitions[number].find(where)
+        ]
+
+
+class DeclaredTable(Table):
+    """
+    Таблица, описанная через `Database.create_table`. Ее столбцы, типы
+    и индексы задаются атрибутами класса, созданного при описании.
+    """
+
+    def select(self, **where: Any) -> list[dict[str, str]]:
+        """
+        Строки, у которых значения столбцов равны `where` (все строки,
+        если условий нет). Строки ищутся по объявленным индексам.
+        """
+        if not where:
+            return list(self.rows())
+
+        return self.find(where)
 
 
 class EmployeeTable(Table):
     """Таблица сотрудников с методами ввода-вывода из файла CSV."""
 
     ATTRS = ("id", "name", "age", "salary", "department_id")
+    TYPES = {"id": int, "age": int, "salary": int, "department_id": int}
     UNIQUE_ATTRS = ("id", "department_id")
+    BLOOM_ATTRS = ("id",)
+    SKETCH_ATTRS = ("age", "salary")
     FILE_PATH = "employee_table.csv"
 
     def __init__(self, load_data=True) -> None:
         super().__init__(load_data)
 
     def select(self, start_id: int, end_id: int) -> list[dict[str, str]]:
-        return [
-            row for row in self.data if start_id <= int(row["id"]) <= end_id
-        ]
+        return [row for row in self.rows() if start_id <= row["id"] <= end_id]
 
 
 class DepartmentTable(Table):
     """Таблица подразделений с вводом-выводом в/из CSV файла."""
 
     ATTRS = ("id", "department_name")
+    TYPES = {"id": int}
     UNIQUE_ATTRS = ("id",)
     FILE_PATH = "department_table.csv"
 
@@ -336,17 +3036,14 @@ class DepartmentTable(Table):
         super().__init__(load_data)
 
     def select(self, department_name) -> list[dict[str, str]]:
-        return [
-            row
-            for row in self.data
-            if row["department_name"] == department_name
-        ]
+        return self.find({"department_name": department_name})
 
 
 class ProjectTable(Table):
     """Таблица проектов с вводом-выводом в/из CSV файла."""
 
     ATTRS = ("id", "name", "start_date", "end_date")
+    TYPES = {"id": int, "start_date": date, "end_date": date}
     UNIQUE_ATTRS = ("id",)
     FILE_PATH = "project_table.csv"
 
@@ -354,9 +3051,7 @@ class ProjectTable(Table):
         super().__init__(load_data)
 
     def select(self, start_id: int, end_id: int) -> list[dict[str, str]]:
-        return [
-            row for row in self.data if start_id <= int(row["id"]) <= end_id
-        ]
+        return [row for row in self.rows() if start_id <= row["id"] <= end_id]
 
     def insert(self, data: str, *, sep: Literal[" ", ","] = " ") -> None:
         super().insert(data, sep=",")
@@ -372,21 +3067,57 @@ class ProjectTable(Table):
         """
         super()._validate_data(new_row)
 
-        start_date = date.fromisoformat(new_row["start_date"])
-        end_date = date.fromisoformat(new_row["end_date"])
+        start_date = new_row["start_date"]
+        end_date = new_row["end_date"]
 
         if start_date > end_date:
-            raise ValueError(
-                f"Invalid date range: 'start_date' ({start_date}) "
-                f"cannot be later than 'end_date' ({end_date})."
-            )
+            raise ValueError(_date_range_error(start_date, end_date))
+
+    def _batch_errors(
+        self, new_rows: Mapping[int, dict[str, Any]]
+    ) -> dict[int, str]:
+        """
+        Проверяет пачку проектов: диапазоны дат сравниваются
+        по столбцам 'start_date' и 'end_date' одним проходом,
+        без вызова `_validate_data` для каждой строки. Строки
+        без одной из дат сравнить нельзя, и они считаются ошибочными.
+        """
+        errors = _row_errors(super()._validate_data, new_rows)
+
+        for number, new_row in new_rows.items():
+            for attr in ("start_date", "end_date"):
+                if number not in errors and new_row.get(attr) is None:
+                    errors[number] = f"Value of column '{attr}' is missing."
+
+        numbers = [number for number in new_rows if number not in errors]
+        starts = [new_rows[number]["start_date"] for number in numbers]
+        ends = [new_rows[number]["end_date"] for number in numbers]
+
+        for number, start_date, end_date, invalid in zip(
+            numbers, starts, ends, map(gt, starts, ends)
+        ):
+            if invalid:
+                errors[number] = _date_range_error(start_date, end_date)
+
+        return errors
+
+
+def _date_range_error(start_date: date, end_date: date) -> str:
+    return (
+        f"Invalid date range: 'start_date' ({start_date}) "
+        f"cannot be later than 'end_date' ({end_date})."
+    )
 
 
 class EmployeeProjectTable(Table):
     """Таблица проектов сотрудников с вводом-выводом в/из CSV файла."""
 
     ATTRS = ("employee_id", "project_id", "role")
+    TYPES = {"employee_id": int, "project_id": int}
     UNIQUE_ATTRS = (("employee_id", "project_id"),)
+    INDEXES = ("employee_id", "project_id")
+    BLOOM_ATTRS = (("employee_id", "project_id"), "employee_id")
+    ENCODED_ATTRS = ("role",)
     FILE_PATH = "employee_project_table.csv"
 
     def __init__(self, load_data=True) -> None:
@@ -397,29 +3128,25 @@ class EmployeeProjectTable(Table):
         employee_id: Optional[int] = None,
         project_id: Optional[int] = None,
     ) -> list[dict[str, str]]:
-        if employee_id and project_id:
-            result = [
-                row
-                for row in self.data
-                if int(row["employee_id"]) == employee_id
-                and int(row["project_id"]) == project_id
-            ]
-        elif employee_id:
-            result = [
-                row
-                for row in self.data
-                if int(row["employee_id"]) == employee_id
-            ]
-        elif project_id:
-            result = [
-                row
-                for row in self.data
-                if int(row["project_id"]) == project_id
-            ]
-        else:
-            result = []
+        where = {}
 
-        return result
+        if employee_id:
+            where["employee_id"] = employee_id
+
+        if project_id:
+            where["project_id"] = project_id
+
+        return self.find(where) if where else []
 
     def insert(self, data: str, *, sep: Literal[" ", ","] = " ") -> None:
         super().insert(data, sep=",")
+
+
+class PartitionedEmployeeProjectTable(PartitionedTable, EmployeeProjectTable):
+    """
+    Таблица проектов сотрудников, разбитая на хеш-разделы по проекту:
+    выборка по `project_id` читает только один раздел.
+    """
+
+    PARTITION_BY = "project_id"
+    PARTITIONS = 8
@@ -0,0 +1,211 @@
+import copy
+import sys
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, Mapping, NamedTuple, Optional
+
+
+class HashIndex:
+    """
+    Хеш-индекс по одному или нескольким столбцам таблицы: значение
+    ключа (или кортеж значений) → позиции строк в `Table.data`.
+    """
+
+    def __init__(self, attrs: tuple[str, ...]) -> None:
+        self.attrs = attrs
+        # Для одного столбца ключ - само значение, для нескольких - кортеж
+        self.key = itemgetter(*attrs)
+        self.positions: dict[Any, Any] = {}
+        # После copy списки позиций общие с другим индексом, и свои
+        # создаются только для изменяемых ключей: здесь ключи уже
+        # созданных своих списков (None - все списки свои)
+        self._owned: Optional[set] = None
+
+    def _own(self, key: Any) -> list[int]:
+        """Список позиций ключа, который можно изменять."""
+        positions = self.positions[key]
+
+        if self._owned is not None and key not in self._owned:
+            positions = self.positions[key] = list(positions)
+            self._owned.add(key)
+
+        return positions
+
+    def add(self, row: Mapping[str, Any], position: int) -> None:
+        key = self.key(row)
+
+        if key in self.positions:
+            self._own(key).append(position)
+            return
+
+        self.positions[key] = [position]
+
+        if self._owned is not None:
+            self._owned.add(key)
+
+    def remove(self, row: Mapping[str, Any], position: int) -> None:
+        key = self.key(row)
+        positions = self._own(key)
+        positions.remove(position)
+
+        if not positions:
+            del self.positions[key]
+
+    def lookup(self, key: Any) -> list[int]:
+        return self.positions.get(key, [])
+
+    def copy(self) -> "HashIndex":
+        """
+        Независимая копия индекса. Копируется только словарь ключей,
+        а списки позиций остаются общими, пока их не изменит одна
+        из копий, поэтому копия стоит O(число ключей), а не O(число
+        строк).
+        """
+        index = copy.copy(self)
+        index.positions = dict(self.positions)
+        index._owned = set()
+        self._owned = set()
+        return index
+
+    def memory_usage(self) -> int:
+        """
+        Примерный объем памяти индекса в байтах. Ключи - значения строк
+        таблицы и не учитываются, размер списков позиций оценивается
+        по первым из них.
+        """
+        sample = list(islice(self.positions.values(), 100))
+        values_size = sum(map(sys.getsizeof, sample)) // max(1, len(sample))
+        return sys.getsizeof(self.positions) + values_size * len(
+            self.positions
+        )
+
+    def build(self, data: Iterable[Optional[Mapping[str, Any]]]) -> None:
+        """Строит индекс заново, пропуская удаленные строки."""
+        self.positions = {}
+        self._owned = None
+
+        for position, row in enumerate(data):
+            if row is not None:
+                self.add(row, position)
+
+
+class UniqueIndex(HashIndex):
+    """Уникальный индекс: каждому ключу соответствует одна строка."""
+
+    def add(self, row: Mapping[str, Any], position: int) -> None:
+        self.positions[self.key(row)] = position
+
+    def remove(self, row: Mapping[str, Any], position: int) -> None:
+        del self.positions[self.key(row)]
+
+    def lookup(self, key: Any) -> list[int]:
+        position = self.positions.get(key)
+        return [] if position is None else [position]
+
+    def copy(self) -> "UniqueIndex":
+        index = copy.copy(self)
+        index.positions = dict(self.positions)
+        return index
+
+
+class SortedIndex:
+    """
+    Упорядоченный индекс по столбцу: строки, отсортированные по его
+    значению, в которых строки со значением из диапазона находятся
+    двоичным поиском. Строки с пустым значением в индекс не попадают.
+    """
+
+    def __init__(self, attr: str, rows: Iterable[Mapping[str, Any]]) -> None:
+        self.attr = attr
+        key = itemgetter(attr)
+        self.rows = sorted(
+            (row for row in rows if key(row) is not None), key=key
+        )
+        self.keys = list(map(key, self.rows))
+
+    def range(self, low: Any = None, high: Any = None) -> list:
+        """Строки со значением в [low, high] (None - без границы)."""
+        start = 0 if low is None else bisect_left(self.keys, low)
+        stop = (
+            len(self.keys) if high is None else bisect_right(self.keys, high)
+        )
+        return self.rows[start:stop]
+
+
+class _IntervalNode(NamedTuple):
+    center: Any
+    # Отрезки, содержащие center, по возрастанию начала
+    # и по убыванию конца
+    by_start: list
+    by_end: list
+    left: Optional["_IntervalNode"]
+    right: Optional["_IntervalNode"]
+
+
+class IntervalIndex:
+    """
+    Дерево отрезков [start, end] из столбцов строк (centered interval
+    tree): находит строки, отрезок которых содержит точку, за
+    O(log n + k), где k - число найденных строк. Строки с пустой
+    границей или с началом позже конца в индекс не попадают.
+    """
+
+    def __init__(
+        self, start_attr: str, end_attr: str, rows: Iterable[Mapping]
+    ) -> None:
+        self.start = itemgetter(start_attr)
+        self.end = itemgetter(end_attr)
+        self.root = self._build(
+            [
+                row
+                for row in rows
+                if self.start(row) is not None
+                and self.end(row) is not None
+                and self.start(row) <= self.end(row)
+            ]
+        )
+
+    def _build(self, rows: list) -> Optional[_IntervalNode]:
+        if not rows:
+            return None
+
+        # Медиана концов отрезков: в каждое поддерево попадает
+        # не больше половины отрезков
+        points = sorted([*map(self.start, rows), *map(self.end, rows)])
+        center = points[len(points) // 2]
+        here = [
+            row for row in rows if self.start(row) <= center <= self.end(row)
+        ]
+        return _IntervalNode(
+            center,
+            sorted(here, key=self.start),
+            sorted(here, key=self.end, reverse=True),
+            self._build([row for row in rows if self.end(row) < center]),
+            self._build([row for row in rows if self.start(row) > center]),
+        )
+
+    def stab(self, point: Any) -> Iterator[Mapping]:
+        """Строки, у которых start <= point <= end."""
+        node = self.root
+
+        while node is not None:
+            if point < node.center:
+                for row in node.by_start:
+                    if self.start(row) > point:
+                        break
+
+                    yield row
+
+                node = node.left
+            elif point > node.center:
+                for row in node.by_end:
+                    if self.end(row) < point:
+                        break
+
+                    yield row
+
+                node = node.right
+            else:
+                yield from node.by_start
+                return
@@ -0,0 +1,43 @@
+import json
+from collections.abc import Mapping
+from datetime import date
+from typing import Any
+
+# Методы Database, которые можно вызвать через сервер
+METHODS = ("insert", "update", "delete", "select", "join", "aggregate")
+
+# Исключения, которые клиент выбрасывает с тем же типом, что и сервер
+ERRORS: dict[str, type[Exception]] = {
+    error.__name__: error for error in (ValueError, TypeError)
+}
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+
+    if isinstance(value, Mapping):  # Компактные строки таблиц
+        return dict(value)
+
+    raise TypeError(
+        f"Value of type '{type(value).__name__}' is not supported."
+    )
+
+
+def _object_hook(obj: dict[str, Any]) -> Any:
+    if obj.keys() == {"$date"}:
+        return date.fromisoformat(obj["$date"])
+
+    return obj
+
+
+def encode(message: Any) -> bytes:
+    """
+    Сообщение протокола - одна строка JSON, оканчивающаяся переводом
+    строки. Даты передаются объектами {"$date": "YYYY-MM-DD"}.
+    """
+    return json.dumps(message, default=_default).encode() + b"\n"
+
+
+def decode(line: bytes) -> Any:
+    return json.loads(line, object_hook=_object_hook)
@@ -0,0 +1,253 @@
+from collections.abc import Mapping
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable, Iterator
+
+
+class Row(Mapping):
+    """
+    Компактная строка таблицы: значения хранятся в слотах объекта,
+    без отдельного словаря на каждую строку.
+
+    Строка поддерживает интерфейс Mapping только для чтения, поэтому
+    сравнивается со словарями и подходит везде, где используются
+    строки-словари. Классы строк создаются функцией `row_type`.
+    """
+
+    __slots__ = ()
+
+    ATTRS: tuple[str, ...] = ()
+    _getters: dict[str, Callable[["Row"], Any]] = {}
+    _codes: dict[str, Callable[["Row"], int]] = {}
+    _astuple: Callable[["Row"], tuple]
+
+    def __getitem__(self, key: str) -> Any:
+        return self._getters[key](self)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ATTRS)
+
+    def __len__(self) -> int:
+        return len(self.ATTRS)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.as_dict()!r})"
+
+    def __reduce__(self) -> tuple:
+        return _restore_row, (
+            self.__class__.__name__,
+            self.ATTRS,
+            self.astuple(),
+        )
+
+    def code(self, key: str) -> int:
+        """Код значения столбца, закодированного словарем."""
+        return self._codes[key](self)
+
+    def astuple(self) -> tuple:
+        """Значения строки в порядке ATTRS."""
+        return self._astuple(self)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Строка в виде обычного словаря."""
+        return dict(zip(self.ATTRS, self.astuple()))
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping[str, Any]) -> "Row":
+        return cls(*map(mapping.get, cls.ATTRS))
+
+
+class JoinedRow(Mapping):
+    """
+    Строка результата соединения, которая не копирует значения: она
+    хранит ссылки на соединенные строки таблиц, а столбец
+    'таблица.атрибут' читается из строки своей таблицы при обращении.
+
+    Строки таблиц не изменяются на месте (update создает новую версию
+    строки), поэтому результат остается верным и после изменений
+    таблиц. Классы строк создаются функцией `joined_row_type`.
+    """
+
+    __slots__ = ("rows",)
+
+    TABLES: tuple[tuple[str, tuple[str, ...]], ...] = ()
+    ATTRS: tuple[str, ...] = ()
+    # Столбец результата - номер строки в `rows` и столбец этой строки
+    _sources: dict[str, tuple[int, str]] = {}
+
+    def __init__(self, *rows: Mapping[str, Any]) -> None:
+        self.rows = rows
+
+    def __getitem__(self, key: str) -> Any:
+        index, attr = self._sources[key]
+        return self.rows[index][attr]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ATTRS)
+
+    def __len__(self) -> int:
+        return len(self.ATTRS)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.as_dict()!r})"
+
+    def __reduce__(self) -> tuple:
+        return _restore_joined_row, (self.TABLES, self.rows)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Строка в виде обычного словаря."""
+        return dict(self.items())
+
+
+class ColumnDictionary:
+    """
+    Словарь различных значений столбца. Каждое значение хранится
+    в одном экземпляре, а строки таблицы хранят его целочисленный код.
+    Коды только добавляются, поэтому выданные ранее строки остаются
+    корректными.
+    """
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self.codes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+
+        return code
+
+
+@lru_cache(maxsize=None)
+def row_type(name: str, attrs: tuple[str, ...]) -> type[Row]:
+    """
+    Создает класс компактной строки с атрибутами `attrs`.
+
+    Значения хранятся в слотах `_0`, `_1`, ..., поэтому имена столбцов
+    не конфликтуют с методами Mapping. Для одинаковых аргументов
+    возвращается один и тот же класс, благодаря чему строки можно
+    сериализовать через pickle и передавать между процессами.
+    """
+    return _make_row_type(name, attrs, {})
+
+
+@lru_cache(maxsize=None)
+def joined_row_type(
+    tables: tuple[tuple[str, tuple[str, ...]], ...]
+) -> type[JoinedRow]:
+    """
+    Создает класс строки соединения таблиц `tables` (пары имя таблицы -
+    ее столбцы) в порядке соединения. Для одинаковых аргументов
+    возвращается один и тот же класс.
+    """
+    sources = {
+        f"{table_name}.{attr}": (index, attr)
+        for index, (table_name, attrs) in enumerate(tables)
+        for attr in attrs
+    }
+    return type(
+        "JoinedRow",
+        (JoinedRow,),
+        {
+            "__module__": __name__,
+            "__slots__": (),
+            "TABLES": tables,
+            "ATTRS": tuple(sources),
+            "_sources": sources,
+        },
+    )
+
+
+def encoded_row_type(
+    name: str,
+    attrs: tuple[str, ...],
+    dictionaries: dict[str, ColumnDictionary],
+) -> type[Row]:
+    """
+    Создает класс компактной строки, в которой столбцы из `dictionaries`
+    хранятся кодами словаря. Значения кодируются в конструкторе
+    и декодируются при чтении, а сами коды доступны через `Row.code`.
+
+    Класс привязан к словарям конкретной таблицы и не кешируется;
+    после pickle строка восстанавливается как обычная компактная строка.
+    """
+    return _make_row_type(name, attrs, dictionaries)
+
+
+def _make_row_type(
+    name: str,
+    attrs: tuple[str, ...],
+    dictionaries: dict[str, ColumnDictionary],
+) -> type[Row]:
+    slots = tuple(f"_{i}" for i in range(len(attrs)))
+    namespace: dict[str, Any] = {}
+    assignments = []
+    values = []
+
+    for attr, slot in zip(attrs, slots):
+        if attr in dictionaries:
+            namespace[f"encode{slot}"] = dictionaries[attr].encode
+            namespace[f"values{slot}"] = dictionaries[attr].values
+            assignments.append(f"self.{slot} = encode{slot}({slot})")
+            values.append(f"values{slot}[row.{slot}]")
+        else:
+            assignments.append(f"self.{slot} = {slot}")
+            values.append(f"row.{slot}")
+
+    exec(
+        f"def __init__(self, {', '.join(slots)}):\n    "
+        + "\n    ".join(assignments)
+        + f"\ndef _astuple(row):\n    return ({', '.join(values)},)",
+        namespace,
+    )
+
+    getters: dict[str, Callable[[Row], Any]] = {}
+
+    for attr, slot in zip(attrs, slots):
+        if attr in dictionaries:
+            getters[attr] = eval(
+                f"lambda row: values{slot}[row.{slot}]", namespace
+            )
+        else:
+            getters[attr] = attrgetter(slot)
+
+    if dictionaries:
+        astuple = namespace["_astuple"]
+    else:
+        getter = attrgetter(*slots)
+        astuple = getter if len(slots) > 1 else lambda row: (getter(row),)
+
+    return type(
+        name,
+        (Row,),
+        {
+            "__module__": __name__,
+            "__slots__": slots,
+            "__init__": namespace["__init__"],
+            "ATTRS": attrs,
+            "_getters": getters,
+            "_codes": {
+                attr: attrgetter(slot)
+                for attr, slot in zip(attrs, slots)
+                if attr in dictionaries
+            },
+            "_astuple": staticmethod(astuple),
+        },
+    )
+
+
+def _restore_row(name: str, attrs: tuple[str, ...], values: tuple) -> Row:
+    return row_type(name, attrs)(*values)
+
+
+def _restore_joined_row(
+    tables: tuple[tuple[str, tuple[str, ...]], ...],
+    rows: tuple[Mapping[str, Any], ...],
+) -> JoinedRow:
+    return joined_row_type(tables)(*rows)
@@ -0,0 +1,68 @@
+from datetime import date
+from typing import Any, Callable
+
+# Функции разбора строковых значений из CSV-файла и insert в типы столбцов
+PARSERS: dict[type, Callable[[str], Any]] = {
+    int: int,
+    float: float,
+    date: date.fromisoformat,
+    str: str,
+}
+
+NUMERIC_TYPES = (int, float)
+
+
+def parser(column_type: type) -> Callable[[str], Any]:
+    """Функция разбора строки для указанного типа столбца."""
+    try:
+        return PARSERS[column_type]
+    except KeyError:
+        raise TypeError(
+            f"Column type '{column_type.__name__}' is not supported."
+        ) from None
+
+
+def parse(attr: str, value: str, column_type: type) -> Any:
+    """
+    Переводит строковое значение столбца `attr` в тип `column_type`.
+    Если значение не подходит под тип, выбрасывается ValueError.
+    """
+    try:
+        return parser(column_type)(value)
+    except ValueError:
+        raise ValueError(
+            f"Value '{value}' of column '{attr}' is not "
+            f"a valid '{column_type.__name__}'."
+        ) from None
+
+
+def check(attr: str, value: Any, column_type: type) -> None:
+    """
+    Проверяет нестроковое значение столбца `attr`: оно должно быть
+    типа `column_type` (целое подходит и для float), чтобы записаться
+    в файл и прочитаться обратно без потерь. Пустое значение (None)
+    или значение другого типа - ValueError.
+    """
+    if value is None:
+        raise ValueError(f"Value of column '{attr}' is missing.")
+
+    if type(value) is not column_type and not (
+        column_type is float and type(value) is int
+    ):
+        raise ValueError(
+            f"Value '{value}' of column '{attr}' is not "
+            f"a valid '{column_type.__name__}'."
+        )
+
+
+def convert(attr: str, value: Any, column_type: type) -> Any:
+    """
+    Новое значение столбца `attr`: строка разбирается в тип
+    `column_type` (см. `parse`), а значение другого типа проверяется
+    (см. `check`).
+    """
+    if isinstance(value, str):
+        return parse(attr, value, column_type)
+
+    check(attr, value, column_type)
+    return value
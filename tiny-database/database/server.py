@@ -0,0 +1,84 @@
+import socket
+import socketserver
+from typing import Union
+
+from database import protocol
+from database.database import Database
+
+Address = Union[str, tuple[str, int]]
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Обрабатывает соединение клиента: каждая строка - запрос
+    {"method": ..., "args": [...], "kwargs": {...}}, на который
+    в том же порядке отправляется ответ {"result": ...} или
+    {"error": {"type": ..., "message": ...}}. Клиент может отправить
+    несколько запросов, не дожидаясь ответов.
+    """
+
+    server: "DatabaseServer"
+
+    def setup(self) -> None:
+        # Ответы TCP-сервера отправляются сразу, без задержки Нейгла
+        self.disable_nagle_algorithm = (
+            self.server.address_family == socket.AF_INET
+        )
+        super().setup()
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            self.wfile.write(self.server.execute(line))
+
+
+class DatabaseServer:
+    """Общая часть TCP- и Unix-серверов базы данных."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+    database: Database
+
+    def execute(self, line: bytes) -> bytes:
+        """Выполняет запрос и возвращает закодированный ответ на него."""
+        try:
+            request = protocol.decode(line)
+            method = request["method"]
+
+            if method not in protocol.METHODS:
+                raise ValueError(f"Method '{method}' is not supported.")
+
+            result = getattr(self.database, method)(
+                *request.get("args", ()), **request.get("kwargs", {})
+            )
+            return protocol.encode({"result": result})
+        except Exception as e:
+            return protocol.encode(
+                {"error": {"type": type(e).__name__, "message": str(e)}}
+            )
+
+
+class TCPDatabaseServer(DatabaseServer, socketserver.ThreadingTCPServer):
+    pass
+
+
+class UnixDatabaseServer(
+    DatabaseServer, socketserver.ThreadingUnixStreamServer
+):
+    pass
+
+
+def make_server(database: Database, address: Address) -> DatabaseServer:
+    """
+    Создает сервер, который обслуживает `database` в отдельном потоке
+    на каждое соединение. Строка `address` - путь Unix-сокета,
+    кортеж (host, port) - адрес TCP-сокета.
+
+    Сервер запускается методом `serve_forever` и останавливается
+    методами `shutdown` и `server_close`.
+    """
+    server_class = (
+        UnixDatabaseServer if isinstance(address, str) else TCPDatabaseServer
+    )
+    server = server_class(address, RequestHandler)
+    server.database = database
+    return server
@@ -0,0 +1,236 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from datetime import date
+from multiprocessing import parent_process, resource_tracker
+from multiprocessing.shared_memory import ShareableList
+from operator import itemgetter
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from database.rows import Row
+
+# Типы столбцов, которые ShareableList не хранит, и функции перевода
+# их значений в поддерживаемые типы и обратно
+CONVERTERS: dict[type, tuple[Callable[[Any], Any], Callable[[Any], Any]]] = {
+    date: (date.toordinal, date.fromordinal),
+}
+
+# Имена сегментов, опубликованных этим процессом
+_published: set[str] = set()
+
+
+def _nullable(convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    return lambda value: None if value is None else convert(value)
+
+
+def _converter(column_type: Optional[type], direction: int) -> Callable:
+    """Перевод значений столбца в разделяемую память (0) или из нее (1)."""
+    if column_type not in CONVERTERS:
+        return lambda value: value
+
+    return _nullable(CONVERTERS[column_type][direction])
+
+
+def _attach(name: str) -> ShareableList:
+    """
+    Подключается к существующему списку в разделяемой памяти.
+
+    При подключении SharedMemory регистрирует сегмент в resource_tracker,
+    который удалил бы его при выходе процесса, хотя владеет сегментом
+    процесс-публикатор. Поэтому регистрация сразу снимается. Исключение -
+    сегменты самого процесса и дочерние процессы multiprocessing: они
+    используют resource_tracker публикатора, и снятие регистрации
+    отменило бы его собственную.
+    """
+    shared = ShareableList(name=name)
+
+    if parent_process() is None and name not in _published:
+        resource_tracker.unregister(shared.shm._name, "shared_memory")
+
+    return shared
+
+
+class SharedRows(Sequence):
+    """
+    Строки таблицы, значения которых хранятся по столбцам в разделяемой
+    памяти. Строка собирается из столбцов при каждом обращении к ней,
+    поэтому процесс хранит только те строки, с которыми работает.
+    """
+
+    def __init__(
+        self,
+        attrs: tuple[str, ...],
+        columns: list[ShareableList],
+        decoders: list[Callable[[Any], Any]],
+        row_type: Optional[type[Row]],
+    ) -> None:
+        self.attrs = attrs
+        self.columns = columns
+        self.decoders = decoders
+        self.row_type = row_type
+
+    def __len__(self) -> int:
+        return len(self.columns[0])
+
+    def __getitem__(self, position: int) -> Any:  # type: ignore[override]
+        return self._make_row([column[position] for column in self.columns])
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(self._make_row, zip(*self.columns))
+
+    def _make_row(self, values: Iterable[Any]) -> Any:
+        values = [
+            decode(value) for decode, value in zip(self.decoders, values)
+        ]
+
+        if self.row_type is None:
+            return dict(zip(self.attrs, values))
+
+        return self.row_type(*values)
+
+    def key_getter(self, attrs: tuple[str, ...]) -> Callable[[int], Any]:
+        """Ключ индекса строки по ее позиции, без сборки всей строки."""
+        getters = []
+
+        for attr in attrs:
+            i = self.attrs.index(attr)
+            getters.append(
+                lambda position, i=i: self.decoders[i](
+                    self.columns[i][position]
+                )
+            )
+
+        if len(getters) == 1:
+            return getters[0]
+
+        return lambda position: tuple(getter(position) for getter in getters)
+
+
+class SharedIndex:
+    """
+    Индекс таблицы в разделяемой памяти: позиции строк, упорядоченные
+    по значению ключа. Строки ищутся двоичным поиском.
+    """
+
+    def __init__(
+        self, attrs: tuple[str, ...], order: ShareableList, rows: SharedRows
+    ) -> None:
+        self.attrs = attrs
+        self.key = itemgetter(*attrs)
+        self.order = order
+        self._row_key = rows.key_getter(attrs)
+
+    def lookup(self, key: Any) -> list[int]:
+        start = bisect_left(self.order, key, key=self._row_key)
+        end = bisect_right(self.order, key, lo=start, key=self._row_key)
+        return [self.order[i] for i in range(start, end)]
+
+
+class SharedSegments:
+    """
+    Сегменты разделяемой памяти, опубликованные или подключенные
+    базой данных. Процесс-публикатор при закрытии удаляет сегменты,
+    остальные процессы только отключаются от них.
+    """
+
+    def __init__(self, owner: bool) -> None:
+        self.owner = owner
+        self.lists: list[ShareableList] = []
+
+    def __enter__(self) -> "SharedSegments":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for shared in self.lists:
+            shared.shm.close()
+
+            if self.owner:
+                shared.shm.unlink()
+                _published.discard(shared.shm.name)
+
+        self.lists = []
+
+
+def _create(values: list, name: str, segments: SharedSegments) -> None:
+    segments.lists.append(ShareableList(values, name=name))
+    _published.add(name)
+
+
+def publish(table: Any, prefix: str, segments: SharedSegments) -> None:
+    """
+    Публикует строки и индексы таблицы в разделяемой памяти
+    в сегментах с именами, начинающимися с `prefix`.
+
+    Каждый столбец хранится отдельным ShareableList, закодированный
+    словарем столбец - кодами вместе со списком значений словаря,
+    а каждый индекс - списком позиций строк, отсортированных по ключу.
+    Удаленные строки не публикуются. Созданные сегменты добавляются
+    в `segments`.
+    """
+    rows = list(table.rows())
+
+    for i, attr in enumerate(table.ATTRS):
+        dictionary = table.dictionaries.get(attr)
+
+        if dictionary is not None:
+            _create(dictionary.values, f"{prefix}_d{i}", segments)
+            values: Iterable[Any] = (row.code(attr) for row in rows)
+        else:
+            encode = _converter(table.TYPES.get(attr), 0)
+            values = (encode(row[attr]) for row in rows)
+
+        _create(list(values), f"{prefix}_c{i}", segments)
+
+    for j, index in enumerate(table.indexes.values()):
+        # Строки с пустыми значениями ключа в индекс не попадают
+        keys = [
+            (index.key(row), position)
+            for position, row in enumerate(rows)
+            if None not in map(row.get, index.attrs)
+        ]
+        keys.sort(key=itemgetter(0))
+        _create([position for _, position in keys], f"{prefix}_i{j}", segments)
+
+
+def attach(
+    table: Any, prefix: str, segments: SharedSegments
+) -> tuple[SharedRows, dict[tuple[str, ...], SharedIndex]]:
+    """
+    Подключается к таблице, опубликованной функцией `publish`,
+    и возвращает ее строки и индексы. Подключенные сегменты
+    добавляются в `segments`.
+
+    Значения закодированных столбцов добавляются в словари таблицы,
+    чтобы поиск по кодам работал без перебора строк.
+    """
+    columns = []
+    decoders = []
+
+    for i, attr in enumerate(table.ATTRS):
+        dictionary = table.dictionaries.get(attr)
+
+        if dictionary is not None:
+            values = _attach(f"{prefix}_d{i}")
+            segments.lists.append(values)
+
+            for value in values:
+                dictionary.encode(value)
+
+            decoders.append(values.__getitem__)
+        else:
+            decoders.append(_converter(table.TYPES.get(attr), 1))
+
+        columns.append(_attach(f"{prefix}_c{i}"))
+        segments.lists.append(columns[-1])
+
+    rows = SharedRows(table.ATTRS, columns, decoders, table.row_type)
+    indexes = {}
+
+    for j, attrs in enumerate(table.indexes):
+        order = _attach(f"{prefix}_i{j}")
+        segments.lists.append(order)
+        indexes[attrs] = SharedIndex(attrs, order, rows)
+
+    return rows, indexes
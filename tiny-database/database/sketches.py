@@ -0,0 +1,149 @@
+import random
+from math import ceil, log, log2
+from typing import Any, Iterable, Optional
+
+from database.bloom import digest
+
+
+class HyperLogLog:
+    """
+    Оценка числа различных значений (HyperLogLog).
+
+    Хранит 2^p однобайтовых регистров; относительная ошибка оценки
+    около 1.04 / sqrt(2^p), поэтому p выбирается по допустимой
+    ошибке `error`.
+    """
+
+    def __init__(self, error: float) -> None:
+        self.p = min(18, max(4, ceil(log2((1.04 / error) ** 2))))
+        self.m = 1 << self.p
+        self.registers = bytearray(self.m)
+
+    def add(self, value: Any) -> None:
+        h = int.from_bytes(digest(value, 8), "little")
+        index = h & (self.m - 1)
+        # Номер первой единицы в оставшихся 64 - p битах
+        rank = 64 - self.p - (h >> self.p).bit_length() + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(
+            m, 0.7213 / (1 + 1.079 / m)
+        )
+        estimate = alpha * m * m / sum(2.0**-rank for rank in self.registers)
+        zeros = self.registers.count(0)
+
+        # Для малого числа значений точнее подсчет пустых регистров
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * log(m / zeros)
+
+        return round(estimate)
+
+
+class KLLSketch:
+    """
+    Оценка квантилей (KLL-скетч).
+
+    Значения хранятся в компакторах: когда компактор уровня h
+    заполняется, он сортируется, и на уровень h + 1 переходит каждое
+    второе значение, которое там весит вдвое больше. Вместимость
+    уровней убывает к нижним в 2/3 раза, поэтому скетч хранит
+    O(k) значений. Ошибка ранга квантиля около 2.7 / k
+    (по оценке авторов DataSketches), поэтому k выбирается
+    по допустимой ошибке `error`.
+    """
+
+    def __init__(self, error: float) -> None:
+        self.k = max(8, ceil(2.7 / error))
+        self.compactors: list[list[Any]] = []
+        self.size = 0
+        self.max_size = 0
+        self._grow()
+
+    def _grow(self) -> None:
+        self.compactors.append([])
+        self.max_size = sum(map(self._capacity, range(len(self.compactors))))
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return ceil(self.k * (2 / 3) ** depth) + 1
+
+    def add(self, value: Any) -> None:
+        self.compactors[0].append(value)
+        self.size += 1
+
+        if self.size >= self.max_size:
+            self._compress()
+
+    def _compress(self) -> None:
+        for level, items in enumerate(self.compactors):
+            if len(items) < self._capacity(level):
+                continue
+
+            if level + 1 == len(self.compactors):
+                self._grow()
+
+            items.sort()
+            # Нечетное значение остается на уровне
+            cut = len(items) - len(items) % 2
+            offset = random.getrandbits(1)
+            self.compactors[level + 1].extend(items[offset:cut:2])
+            self.compactors[level] = items[cut:]
+            self.size = sum(map(len, self.compactors))
+
+            if self.size < self.max_size:
+                break
+
+    def quantile(self, q: float) -> Optional[Any]:
+        """Значение, меньше которого примерно доля `q` значений."""
+        weighted = sorted(
+            (value, 1 << level)
+            for level, items in enumerate(self.compactors)
+            for value in items
+        )
+        total = sum(weight for _, weight in weighted)
+        rank = 0
+
+        for value, weight in weighted:
+            rank += weight
+
+            if rank >= q * total:
+                return value
+
+        return None
+
+
+class ColumnSketch:
+    """
+    Приближенная сводка значений столбца: число различных значений
+    и квантили. Пустые значения не учитываются. Сводку можно
+    дополнять по одному значению, поэтому таблица обновляет ее
+    при каждой вставке.
+    """
+
+    def __init__(self, error: float) -> None:
+        self.distinct_values = HyperLogLog(error)
+        self.quantiles = KLLSketch(error)
+
+    @classmethod
+    def of(cls, values: Iterable[Any], error: float) -> "ColumnSketch":
+        sketch = cls(error)
+
+        for value in values:
+            sketch.add(value)
+
+        return sketch
+
+    def add(self, value: Any) -> None:
+        if value is not None:
+            self.distinct_values.add(value)
+            self.quantiles.add(value)
+
+    def distinct(self) -> int:
+        return self.distinct_values.count()
+
+    def quantile(self, q: float) -> Optional[Any]:
+        return self.quantiles.quantile(q)
@@ -0,0 +1,44 @@
+import pickle
+import tempfile
+from typing import Any, Callable, Hashable, Iterable, Iterator
+
+
+class SpillFile:
+    """
+    Временный файл, в который последовательно сбрасываются объекты
+    (строки таблиц, пары ключ-значение), не помещающиеся в память.
+    Файл удаляется автоматически при закрытии.
+    """
+
+    def __init__(self) -> None:
+        self._file = tempfile.TemporaryFile()
+        self.count = 0
+
+    def write(self, obj: Any) -> None:
+        pickle.dump(obj, self._file, pickle.HIGHEST_PROTOCOL)
+        self.count += 1
+
+    def __iter__(self) -> Iterator[Any]:
+        self._file.flush()
+        self._file.seek(0)
+
+        for _ in range(self.count):
+            yield pickle.load(self._file)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def partition(
+    items: Iterable[Any], key: Callable[[Any], Hashable], partitions: int
+) -> list[SpillFile]:
+    """
+    Раскладывает элементы по `partitions` временным файлам по хешу ключа.
+    Элементы с одинаковым ключом всегда попадают в один и тот же файл.
+    """
+    files = [SpillFile() for _ in range(partitions)]
+
+    for item in items:
+        files[hash(key(item)) % partitions].write(item)
+
+    return files
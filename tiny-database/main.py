@@ -10,10 +10,15 @@ if __name__ == "__main__":
     db = Database()
 
     # Создание таблиц в базе данных
-    db.register_table("employees", EmployeeTable())
-    db.register_table("departments", DepartmentTable())
-    db.register_table("projects", ProjectTable())
-    db.register_table("employees_projects", EmployeeProjectTable())
+    db.register_table("employees", EmployeeTable(load_data=False))
+    db.register_table("departments", DepartmentTable(load_data=False))
+    db.register_table("projects", ProjectTable(load_data=False))
+    db.register_table(
+        "employees_projects", EmployeeProjectTable(load_data=False)
+    )
+
+    # Загружаем все таблицы из CSV-файлов
+    db.load_all()
 
     # Вставка элементов
     db.insert("employees", "1 John 28 50000 1")
@@ -0,0 +1,47 @@
+import io
+import pickle
+
+import pytest
+from database.bloom import BloomFilter, dump_filters, load_filters
+
+
+def test_bloom_filter():
+    data = [{"id": i, "name": f"Employee{i}"} for i in range(1000)]
+    data[5] = None
+    bloom = BloomFilter(("id",), len(data))
+    bloom.build(data)
+
+    assert bloom.count == 999
+    assert all(i in bloom for i in range(1000) if i != 5)
+    # Равные ключи словаря дают одинаковые биты
+    assert 10.0 in bloom and True in bloom
+
+    misses = sum(i in bloom for i in range(1000, 11000))
+    assert misses < 300  # Около 1% ложноположительных ответов
+
+
+def test_composite_bloom_filter_survives_pickle():
+    bloom = BloomFilter(("employee_id", "project_id"), 0)
+    bloom.add(bloom.key({"employee_id": 1, "project_id": 2}))
+
+    assert bloom.capacity == 64
+    restored = pickle.loads(pickle.dumps(bloom))
+    assert (1, 2.0) in restored
+    assert restored.key({"employee_id": 3, "project_id": 4}) == (3, 4)
+    assert (2, 1) not in restored
+
+
+def test_dump_and_load_filters():
+    bloom = BloomFilter(("employee_id", "project_id"), 100)
+    bloom.add((1, 2))
+    f = io.BytesIO()
+    dump_filters([bloom, BloomFilter(("id",), 0)], f)
+
+    f.seek(0)
+    blooms = load_filters(f)
+    restored = blooms[("employee_id", "project_id")]
+    assert restored.bits == bloom.bits and restored.count == 1
+    assert (1, 2) in restored and blooms[("id",)].capacity == 64
+
+    with pytest.raises(ValueError):
+        load_filters(io.BytesIO(f.getvalue()[:-1]))
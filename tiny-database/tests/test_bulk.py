@@ -0,0 +1,40 @@
+from datetime import date
+
+import pytest
+from database import bulk
+from database.rows import row_type
+
+
+def test_detect_format():
+    assert bulk.detect_format("rows.CSV") == "csv"
+    assert bulk.detect_format("rows.txt", "jsonl") == "jsonl"
+
+    with pytest.raises(ValueError):
+        bulk.detect_format("rows.txt")
+
+
+@pytest.mark.parametrize("file_format", bulk.FORMATS)
+def test_write_and_read_file(tmp_path, file_format):
+    path = str(tmp_path / f"rows.{file_format}")
+    compact = row_type("Project", ("id", "name", "start_date"))
+    rows = [
+        {"id": 1, "name": "Web, Redesign", "start_date": date(2024, 1, 15)},
+        compact(2, 'CRM "Pro"', date(2024, 2, 1)),
+    ]
+
+    # Строки записываются по мере получения из генератора
+    assert bulk.write_file(path, iter(rows)) == 2
+
+    read = list(bulk.read_file(path))
+
+    if file_format == "csv":
+        assert read[1] == {
+            "id": "2",
+            "name": 'CRM "Pro"',
+            "start_date": "2024-02-01",
+        }
+    else:
+        assert read == [dict(row) for row in rows]
+
+    assert bulk.write_file(path, []) == 0
+    assert list(bulk.read_file(path)) == []
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+from database import compression
+
+
+@pytest.mark.parametrize("codec", ["gzip", "bz2", "lzma"])
+def test_write_and_read_compressed_blocks(tmp_path, monkeypatch, codec):
+    monkeypatch.setattr(compression, "BLOCK_ROWS", 2)
+    path = str(tmp_path / "table.csv")
+    attrs = ("id", "name")
+    rows = [{"id": str(i), "name": f"Name{i}"} for i in range(5)]
+
+    compression.write_rows(path, attrs, rows[:3], codec, append=False)
+    compression.write_rows(path, attrs, rows[3:], codec, append=True)
+
+    # Заголовок и блоки из 2, 1 и 2 строк
+    with open(compression.blocks_path(path)) as f:
+        assert [line.split()[1] for line in f] == ["0", "2", "1", "2"]
+
+    with compression.open_text(path, codec) as f:
+        assert f.read().splitlines() == ["id,name"] + [
+            f"{i},Name{i}" for i in range(5)
+        ]
+
+    assert compression.read_range(path, codec, 1, 4) == rows[1:4]
+    assert compression.read_range(path, codec, 4, 9) == rows[4:]
+    assert compression.read_range(path, codec, 7, 9) == []
+
+
+def test_read_range_of_uncompressed_file(tmp_path):
+    path = str(tmp_path / "table.csv")
+    rows = [{"id": "1"}, {"id": "2"}]
+    compression.write_rows(path, ("id",), rows, None, append=True)
+
+    assert compression.read_range(path, None, 1, 2) == rows[1:]
+    assert not os.path.exists(compression.blocks_path(path))
+
+
+def test_unsupported_compression(tmp_path):
+    with pytest.raises(ValueError, match="not supported"):
+        compression.open_text(str(tmp_path / "table.csv"), "zip")
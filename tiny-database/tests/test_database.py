@@ -1,43 +1,68 @@
+import glob
+import gzip
+import heapq
 import os
-import tempfile
+import pickle
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from multiprocessing import get_context
+from operator import itemgetter
 
 import pytest
+from database import bulk, compression, spill
+from database.bloom import BloomFilter
 from database.database import (
     Database,
     DepartmentTable,
     EmployeeProjectTable,
     EmployeeTable,
+    PartitionedEmployeeProjectTable,
+    PartitionedTable,
     ProjectTable,
+    _read_table,
 )
+from database.rows import joined_row_type, row_type
 
 
 @pytest.fixture
-def temp_employee_file():
+def tables_dir(tmp_path):
+    """
+    Каталог файлов таблиц. Файлы рядом с таблицей (журнал удалений,
+    фильтры Блума) удаляются вместе с ним.
+    """
+    path = tmp_path / "tables"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def temp_employee_file(tables_dir):
     """Создаем временный файл для таблицы рабочих"""
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
-    yield temp_file.name
-    os.remove(temp_file.name)
+    path = tables_dir / "employees.csv"
+    path.touch()
+    return str(path)
 
 
 @pytest.fixture
-def temp_department_file():
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
-    yield temp_file.name
-    os.remove(temp_file.name)
+def temp_department_file(tables_dir):
+    path = tables_dir / "departments.csv"
+    path.touch()
+    return str(path)
 
 
 @pytest.fixture
-def temp_projects_file():
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
-    yield temp_file.name
-    os.remove(temp_file.name)
+def temp_projects_file(tables_dir):
+    path = tables_dir / "projects.csv"
+    path.touch()
+    return str(path)
 
 
 @pytest.fixture
-def temp_employees_projects_file():
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
-    yield temp_file.name
-    os.remove(temp_file.name)
+def temp_employees_projects_file(tables_dir):
+    path = tables_dir / "employees_projects.csv"
+    path.touch()
+    return str(path)
 
 
 # Пример, как используются фикстуры
@@ -49,7 +74,7 @@ def database(
     temp_employees_projects_file,
 ):
     """Данная фикстура задает БД и определяет таблицы."""
-    db = Database()
+    db = Database(memory_limit=None, memory_budget=None)
 
     # Используем временные файлы для тестирования файлового
     # ввода-вывода в EmployeeTable и DepartmentTable
@@ -79,18 +104,18 @@ def test_insert_employee(database):
 
     assert len(data) == 2
     assert data[0] == {
-        "id": "1",
+        "id": 1,
         "name": "John",
-        "age": "28",
-        "salary": "50000",
-        "department_id": "1",
+        "age": 28,
+        "salary": 50000,
+        "department_id": 1,
     }
     assert data[1] == {
-        "id": "2",
+        "id": 2,
         "name": "Jane",
-        "age": "34",
-        "salary": "60000",
-        "department_id": "2",
+        "age": 34,
+        "salary": 60000,
+        "department_id": 2,
     }
 
 
@@ -111,25 +136,25 @@ def test_select_method_of_the_employee_table(database):
 
     data = [
         {
-            "id": "1",
+            "id": 1,
             "name": "John",
-            "age": "28",
-            "salary": "50000",
-            "department_id": "1",
+            "age": 28,
+            "salary": 50000,
+            "department_id": 1,
         },
         {
-            "id": "2",
+            "id": 2,
             "name": "Jane",
-            "age": "34",
-            "salary": "60000",
-            "department_id": "2",
+            "age": 34,
+            "salary": 60000,
+            "department_id": 2,
         },
         {
-            "id": "3",
+            "id": 3,
             "name": "Alice",
-            "age": "29",
-            "salary": "45000",
-            "department_id": "3",
+            "age": 29,
+            "salary": 45000,
+            "department_id": 3,
         },
     ]
 
@@ -161,12 +186,12 @@ def test_insert_department(database):
     data = database.select("departments", "HR")
 
     assert len(data) == 1
-    assert data[0] == {"id": "1", "department_name": "HR"}
+    assert data[0] == {"id": 1, "department_name": "HR"}
 
     data = database.select("departments", "Finance")
 
     assert len(data) == 1
-    assert data[0] == {"id": "2", "department_name": "Finance"}
+    assert data[0] == {"id": 2, "department_name": "Finance"}
 
 
 def test_unique_attrs_of_the_department_table(database):
@@ -187,14 +212,14 @@ def test_select_method_of_the_department_table(database):
     database.insert("departments", "8 Sales")
 
     data = [
-        {"id": "1", "department_name": "HR"},
-        {"id": "2", "department_name": "Finance"},
-        {"id": "3", "department_name": "Engineering"},
-        {"id": "4", "department_name": "Engineering"},
-        {"id": "5", "department_name": "Marketing"},
-        {"id": "6", "department_name": "Sales"},
-        {"id": "7", "department_name": "Sales"},
-        {"id": "8", "department_name": "Sales"},
+        {"id": 1, "department_name": "HR"},
+        {"id": 2, "department_name": "Finance"},
+        {"id": 3, "department_name": "Engineering"},
+        {"id": 4, "department_name": "Engineering"},
+        {"id": 5, "department_name": "Marketing"},
+        {"id": 6, "department_name": "Sales"},
+        {"id": 7, "department_name": "Sales"},
+        {"id": 8, "department_name": "Sales"},
     ]
 
     res = database.select("departments", "HR")
@@ -222,16 +247,16 @@ def test_insert_project(database):
 
     assert len(data) == 2
     assert data[0] == {
-        "id": "1",
+        "id": 1,
         "name": "Website Redesign",
-        "start_date": "2024-01-15",
-        "end_date": "2024-03-15",
+        "start_date": date(2024, 1, 15),
+        "end_date": date(2024, 3, 15),
     }
     assert data[1] == {
-        "id": "2",
+        "id": 2,
         "name": "CRM Development",
-        "start_date": "2024-02-01",
-        "end_date": "2024-08-01",
+        "start_date": date(2024, 2, 1),
+        "end_date": date(2024, 8, 1),
     }
 
 
@@ -278,64 +303,64 @@ def test_select_method_of_the_project_table(database):
 
     data = [
         {
-            "id": "1",
+            "id": 1,
             "name": "Website Redesign",
-            "start_date": "2024-01-15",
-            "end_date": "2024-03-15",
+            "start_date": date(2024, 1, 15),
+            "end_date": date(2024, 3, 15),
         },
         {
-            "id": "2",
+            "id": 2,
             "name": "CRM Development",
-            "start_date": "2024-02-01",
-            "end_date": "2024-08-01",
+            "start_date": date(2024, 2, 1),
+            "end_date": date(2024, 8, 1),
         },
         {
-            "id": "3",
+            "id": 3,
             "name": "HR Automation",
-            "start_date": "2024-01-20",
-            "end_date": "2024-04-20",
+            "start_date": date(2024, 1, 20),
+            "end_date": date(2024, 4, 20),
         },
         {
-            "id": "4",
+            "id": 4,
             "name": "Marketing Campaign",
-            "start_date": "2024-03-10",
-            "end_date": "2024-06-10",
+            "start_date": date(2024, 3, 10),
+            "end_date": date(2024, 6, 10),
         },
         {
-            "id": "5",
+            "id": 5,
             "name": "Financial Report Tool",
-            "start_date": "2024-02-15",
-            "end_date": "2024-05-15",
+            "start_date": date(2024, 2, 15),
+            "end_date": date(2024, 5, 15),
         },
         {
-            "id": "6",
+            "id": 6,
             "name": "Mobile App Development",
-            "start_date": "2024-04-01",
-            "end_date": "2024-09-01",
+            "start_date": date(2024, 4, 1),
+            "end_date": date(2024, 9, 1),
         },
         {
-            "id": "7",
+            "id": 7,
             "name": "Data Migration",
-            "start_date": "2024-05-01",
-            "end_date": "2024-07-31",
+            "start_date": date(2024, 5, 1),
+            "end_date": date(2024, 7, 31),
         },
         {
-            "id": "8",
+            "id": 8,
             "name": "Internal Wiki",
-            "start_date": "2024-02-05",
-            "end_date": "2024-04-05",
+            "start_date": date(2024, 2, 5),
+            "end_date": date(2024, 4, 5),
         },
         {
-            "id": "9",
+            "id": 9,
             "name": "Cloud Infrastructure Setup",
-            "start_date": "2024-06-01",
-            "end_date": "2024-12-01",
+            "start_date": date(2024, 6, 1),
+            "end_date": date(2024, 12, 1),
         },
         {
-            "id": "10",
+            "id": 10,
             "name": "Customer Feedback Analysis",
-            "start_date": "2024-07-01",
-            "end_date": "2024-09-01",
+            "start_date": date(2024, 7, 1),
+            "end_date": date(2024, 9, 1),
         },
     ]
 
@@ -368,13 +393,13 @@ def test_insert_employee_project(database):
 
     assert len(data) == 2
     assert data[0] == {
-        "employee_id": "1",
-        "project_id": "1",
+        "employee_id": 1,
+        "project_id": 1,
         "role": "Developer",
     }
     assert data[1] == {
-        "employee_id": "2",
-        "project_id": "1",
+        "employee_id": 2,
+        "project_id": 1,
         "role": "Project Manager",
     }
 
@@ -398,19 +423,19 @@ def test_select_method_of_the_employee_project_table(database):
     database.insert("employees_projects", "21,2,Developer")
 
     data = [
-        {"employee_id": "1", "project_id": "1", "role": "Developer"},
-        {"employee_id": "2", "project_id": "1", "role": "Project Manager"},
-        {"employee_id": "10", "project_id": "1", "role": "Consultant"},
+        {"employee_id": 1, "project_id": 1, "role": "Developer"},
+        {"employee_id": 2, "project_id": 1, "role": "Project Manager"},
+        {"employee_id": 10, "project_id": 1, "role": "Consultant"},
         {
-            "employee_id": "20",
-            "project_id": "1",
+            "employee_id": 20,
+            "project_id": 1,
             "role": "Customer Success Manager",
         },
-        {"employee_id": "1", "project_id": "2", "role": "Developer"},
-        {"employee_id": "3", "project_id": "2", "role": "Tester"},
-        {"employee_id": "4", "project_id": "2", "role": "Team Lead"},
-        {"employee_id": "11", "project_id": "2", "role": "UI/UX Designer"},
-        {"employee_id": "21", "project_id": "2", "role": "Developer"},
+        {"employee_id": 1, "project_id": 2, "role": "Developer"},
+        {"employee_id": 3, "project_id": 2, "role": "Tester"},
+        {"employee_id": 4, "project_id": 2, "role": "Team Lead"},
+        {"employee_id": 11, "project_id": 2, "role": "UI/UX Designer"},
+        {"employee_id": 21, "project_id": 2, "role": "Developer"},
     ]
 
     res = database.select("employees_projects", employee_id=1)
@@ -460,30 +485,30 @@ def test_join_employees_departments(database):
 
     data = [
         {
-            "employees.id": "1",
+            "employees.id": 1,
             "employees.name": "John",
-            "employees.age": "28",
-            "employees.salary": "50000",
-            "employees.department_id": "1",
-            "departments.id": "1",
+            "employees.age": 28,
+            "employees.salary": 50000,
+            "employees.department_id": 1,
+            "departments.id": 1,
             "departments.department_name": "HR",
         },
         {
-            "employees.id": "2",
+            "employees.id": 2,
             "employees.name": "Jane",
-            "employees.age": "34",
-            "employees.salary": "60000",
-            "employees.department_id": "2",
-            "departments.id": "2",
+            "employees.age": 34,
+            "employees.salary": 60000,
+            "employees.department_id": 2,
+            "departments.id": 2,
             "departments.department_name": "Finance",
         },
         {
-            "employees.id": "3",
+            "employees.id": 3,
             "employees.name": "Alice",
-            "employees.age": "29",
-            "employees.salary": "45000",
-            "employees.department_id": "3",
-            "departments.id": "3",
+            "employees.age": 29,
+            "employees.salary": 45000,
+            "employees.department_id": 3,
+            "departments.id": 3,
             "departments.department_name": "Engineering",
         },
     ]
@@ -508,46 +533,46 @@ def test_join_employees_employees_projects_projects(database):
 
     data = [
         {
-            "employees.id": "1",
+            "employees.id": 1,
             "employees.name": "John",
-            "employees.age": "28",
-            "employees.salary": "50000",
-            "employees.department_id": "1",
-            "employees_projects.employee_id": "1",
-            "employees_projects.project_id": "1",
+            "employees.age": 28,
+            "employees.salary": 50000,
+            "employees.department_id": 1,
+            "employees_projects.employee_id": 1,
+            "employees_projects.project_id": 1,
             "employees_projects.role": "Developer",
-            "projects.id": "1",
+            "projects.id": 1,
             "projects.name": "Website Redesign",
-            "projects.start_date": "2024-01-15",
-            "projects.end_date": "2024-03-15",
+            "projects.start_date": date(2024, 1, 15),
+            "projects.end_date": date(2024, 3, 15),
         },
         {
-            "employees.id": "1",
+            "employees.id": 1,
             "employees.name": "John",
-            "employees.age": "28",
-            "employees.salary": "50000",
-            "employees.department_id": "1",
-            "employees_projects.employee_id": "1",
-            "employees_projects.project_id": "2",
+            "employees.age": 28,
+            "employees.salary": 50000,
+            "employees.department_id": 1,
+            "employees_projects.employee_id": 1,
+            "employees_projects.project_id": 2,
             "employees_projects.role": "Developer",
-            "projects.id": "2",
+            "projects.id": 2,
             "projects.name": "CRM Development",
-            "projects.start_date": "2024-02-01",
-            "projects.end_date": "2024-08-01",
+            "projects.start_date": date(2024, 2, 1),
+            "projects.end_date": date(2024, 8, 1),
         },
         {
-            "employees.id": "2",
+            "employees.id": 2,
             "employees.name": "Jane",
-            "employees.age": "34",
-            "employees.salary": "60000",
-            "employees.department_id": "2",
-            "employees_projects.employee_id": "2",
-            "employees_projects.project_id": "1",
+            "employees.age": 34,
+            "employees.salary": 60000,
+            "employees.department_id": 2,
+            "employees_projects.employee_id": 2,
+            "employees_projects.project_id": 1,
             "employees_projects.role": "Project Manager",
-            "projects.id": "1",
+            "projects.id": 1,
             "projects.name": "Website Redesign",
-            "projects.start_date": "2024-01-15",
-            "projects.end_date": "2024-03-15",
+            "projects.start_date": date(2024, 1, 15),
+            "projects.end_date": date(2024, 3, 15),
         },
     ]
 
@@ -576,52 +601,52 @@ def test_join_employees_departments_employees_projects_projects(database):
 
     data = [
         {
-            "employees.id": "1",
+            "employees.id": 1,
             "employees.name": "John",
-            "employees.age": "28",
-            "employees.salary": "50000",
-            "employees.department_id": "1",
-            "departments.id": "1",
+            "employees.age": 28,
+            "employees.salary": 50000,
+            "employees.department_id": 1,
+            "departments.id": 1,
             "departments.department_name": "HR",
-            "employees_projects.employee_id": "1",
-            "employees_projects.project_id": "1",
+            "employees_projects.employee_id": 1,
+            "employees_projects.project_id": 1,
             "employees_projects.role": "Developer",
-            "projects.id": "1",
+            "projects.id": 1,
             "projects.name": "Website Redesign",
-            "projects.start_date": "2024-01-15",
-            "projects.end_date": "2024-03-15",
+            "projects.start_date": date(2024, 1, 15),
+            "projects.end_date": date(2024, 3, 15),
         },
         {
-            "employees.id": "1",
+            "employees.id": 1,
             "employees.name": "John",
-            "employees.age": "28",
-            "employees.salary": "50000",
-            "employees.department_id": "1",
-            "departments.id": "1",
+            "employees.age": 28,
+            "employees.salary": 50000,
+            "employees.department_id": 1,
+            "departments.id": 1,
             "departments.department_name": "HR",
-            "employees_projects.employee_id": "1",
-            "employees_projects.project_id": "2",
+            "employees_projects.employee_id": 1,
+            "employees_projects.project_id": 2,
             "employees_projects.role": "Developer",
-            "projects.id": "2",
+            "projects.id": 2,
             "projects.name": "CRM Development",
-            "projects.start_date": "2024-02-01",
-            "projects.end_date": "2024-08-01",
+            "projects.start_date": date(2024, 2, 1),
+            "projects.end_date": date(2024, 8, 1),
         },
         {
-            "employees.id": "2",
+            "employees.id": 2,
             "employees.name": "Jane",
-            "employees.age": "34",
-            "employees.salary": "60000",
-            "employees.department_id": "2",
-            "departments.id": "2",
+            "employees.age": 34,
+            "employees.salary": 60000,
+            "employees.department_id": 2,
+            "departments.id": 2,
             "departments.department_name": "Finance",
-            "employees_projects.employee_id": "2",
-            "employees_projects.project_id": "1",
+            "employees_projects.employee_id": 2,
+            "employees_projects.project_id": 1,
             "employees_projects.role": "Project Manager",
-            "projects.id": "1",
+            "projects.id": 1,
             "projects.name": "Website Redesign",
-            "projects.start_date": "2024-01-15",
-            "projects.end_date": "2024-03-15",
+            "projects.start_date": date(2024, 1, 15),
+            "projects.end_date": date(2024, 3, 15),
         },
     ]
 
@@ -774,16 +799,16 @@ def test_aggregate_method_with_group_by_of_the_database(database):
     database.insert("employees_projects", "20,10,Customer Success Manager")
 
     data = [
-        {"project_id": "1", "COUNT(employee_id)": "4"},
-        {"project_id": "2", "COUNT(employee_id)": "5"},
-        {"project_id": "3", "COUNT(employee_id)": "5"},
-        {"project_id": "4", "COUNT(employee_id)": "5"},
-        {"project_id": "5", "COUNT(employee_id)": "5"},
-        {"project_id": "6", "COUNT(employee_id)": "5"},
-        {"project_id": "7", "COUNT(employee_id)": "4"},
-        {"project_id": "8", "COUNT(employee_id)": "4"},
-        {"project_id": "9", "COUNT(employee_id)": "4"},
-        {"project_id": "10", "COUNT(employee_id)": "4"},
+        {"project_id": 1, "COUNT(employee_id)": "4"},
+        {"project_id": 2, "COUNT(employee_id)": "5"},
+        {"project_id": 3, "COUNT(employee_id)": "5"},
+        {"project_id": 4, "COUNT(employee_id)": "5"},
+        {"project_id": 5, "COUNT(employee_id)": "5"},
+        {"project_id": 6, "COUNT(employee_id)": "5"},
+        {"project_id": 7, "COUNT(employee_id)": "4"},
+        {"project_id": 8, "COUNT(employee_id)": "4"},
+        {"project_id": 9, "COUNT(employee_id)": "4"},
+        {"project_id": 10, "COUNT(employee_id)": "4"},
     ]
 
     res = database.aggregate(
@@ -846,6 +871,151 @@ def test_join_with_incorrect_arguments(database):
         )
 
 
+def test_join_on_composite_key(database):
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "1,2,Tester")
+    database.insert("employees_projects", "2,1,Developer")
+    reviews = database.create_table(
+        "reviews",
+        ("employee_id", "project_id", "mark"),
+        {"employee_id": int, "project_id": int, "mark": int},
+        unique=(("employee_id", "project_id"),),
+        storage=database.tables["departments"].FILE_PATH + ".reviews",
+    )
+    reviews.insert_many(
+        [
+            {"employee_id": 1, "project_id": 2, "mark": 5},
+            {"employee_id": 2, "project_id": 1, "mark": 4},
+            {"employee_id": 2, "project_id": 2, "mark": 3},
+        ]
+    )
+
+    join_attrs = [
+        [
+            ("employees_projects.employee_id", "reviews.employee_id"),
+            ("reviews.project_id", "=", "employees_projects.project_id"),
+            ("employees_projects.project_id", "<", "reviews.mark"),
+        ]
+    ]
+    expected = [
+        ("Tester", 5),
+        ("Developer", 4),
+    ]
+    result = database.join(("employees_projects", "reviews"), join_attrs)
+    assert [
+        (row["employees_projects.role"], row["reviews.mark"]) for row in result
+    ] == expected
+
+    # Составной ключ годится и для соединения по разделам
+    Database(memory_limit=1)
+    result = database.join(("employees_projects", "reviews"), join_attrs)
+    assert sorted(
+        (row["employees_projects.role"], row["reviews.mark"]) for row in result
+    ) == sorted(expected)
+
+    del database.tables["reviews"]
+
+
+def test_range_join(database, monkeypatch):
+    database.insert("projects", "1,Website Redesign,2024-01-15,2024-03-15")
+    database.insert("projects", "2,CRM Development,2024-02-01,2024-08-01")
+    database.insert("projects", "3,HR Automation,2024-01-01,2024-01-10")
+    calendar = database.create_table(
+        "calendar",
+        ("day", "note"),
+        {"day": date},
+        storage=database.tables["departments"].FILE_PATH + ".calendar",
+    )
+
+    for day in ("2024-01-01", "2024-01-20", "2024-02-01", "2024-06-01"):
+        calendar.insert(f"{day} -")
+
+    # Пустые значения (например, в строках, добавленных в data вручную)
+    # ни с чем не совпадают
+    calendar.data.append({"day": None, "note": "-"})
+    database.tables["projects"].data.append(
+        {"id": 4, "name": "Draft", "start_date": None, "end_date": None}
+    )
+
+    # Строки таблицы не перебираются для каждой строки результата
+    monkeypatch.setattr(
+        database,
+        "_hash_join",
+        lambda *args: pytest.fail("equality join for range conditions"),
+    )
+
+    def days(tables, join_attrs):
+        return sorted(
+            (row["projects.id"], str(row["calendar.day"]))
+            for row in database.join(tables, join_attrs)
+        )
+
+    expected = [
+        (1, "2024-01-20"),
+        (1, "2024-02-01"),
+        (2, "2024-02-01"),
+        (2, "2024-06-01"),
+        (3, "2024-01-01"),
+    ]
+    # Дни внутри отрезков проектов: упорядоченный индекс по дням
+    assert (
+        days(
+            ("projects", "calendar"),
+            [
+                [
+                    ("projects.start_date", "<=", "calendar.day"),
+                    ("calendar.day", "<=", "projects.end_date"),
+                ]
+            ],
+        )
+        == expected
+    )
+    # Проекты, отрезки которых содержат день: дерево отрезков
+    assert (
+        days(
+            ("calendar", "projects"),
+            [
+                [
+                    ("calendar.day", ">=", "projects.start_date"),
+                    ("calendar.day", "<=", "projects.end_date"),
+                ]
+            ],
+        )
+        == expected
+    )
+    assert days(
+        ("projects", "calendar"),
+        [("projects.end_date", "<", "calendar.day")],
+    ) == [
+        (1, "2024-06-01"),
+        (3, "2024-01-20"),
+        (3, "2024-02-01"),
+        (3, "2024-06-01"),
+    ]
+    assert days(
+        ("projects", "calendar"),
+        [("calendar.day", "<", "projects.start_date")],
+    ) == [
+        (1, "2024-01-01"),
+        (2, "2024-01-01"),
+        (2, "2024-01-20"),
+    ]
+
+    with pytest.raises(ValueError, match="operator"):
+        database.join(
+            ("projects", "calendar"),
+            [("projects.start_date", "!=", "calendar.day")],
+        )
+
+    with pytest.raises(ValueError, match="must link table 'calendar'"):
+        database.join(
+            ("projects", "calendar"),
+            [("projects.start_date", "<=", "projects.end_date")],
+        )
+
+    del database.tables["calendar"]
+
+
 def test_aggregate_with_incorrect_arguments(database):
     database.insert("employees", "1 John 28 50000 1")
     database.insert("employees", "2 Jane 34 60000 2")
@@ -888,25 +1058,1770 @@ def test_load_table_data():
     table2 = EmployeeTable()
     assert table2.data == [
         {
-            "id": "1",
+            "id": 1,
             "name": "John",
-            "age": "28",
-            "salary": "50000",
-            "department_id": "1",
+            "age": 28,
+            "salary": 50000,
+            "department_id": 1,
         },
         {
-            "id": "2",
+            "id": 2,
             "name": "Jane",
-            "age": "34",
-            "salary": "60000",
-            "department_id": "2",
+            "age": 34,
+            "salary": 60000,
+            "department_id": 2,
         },
     ]
 
     os.remove(new_file_path)
+    os.remove(table.bloom_path)
     EmployeeTable.FILE_PATH = old_file_path
 
 
 def test_insert_data_into_table_with_fewer_parameters(database):
     with pytest.raises(ValueError):
         database.insert("employees", "1 John")
+
+
+def test_join_with_memory_limit(database):
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    database.insert("employees", "3 Alice 29 45000 3")
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "2,1,Project Manager")
+    database.insert("employees_projects", "1,2,Developer")
+    database.insert("employees_projects", "3,2,Tester")
+    database.insert("projects", "1,Website Redesign,2024-01-15,2024-03-15")
+    database.insert("projects", "2,CRM Development,2024-02-01,2024-08-01")
+
+    tables = ("employees", "employees_projects", "projects")
+    join_attrs = [
+        ("employees.id", "employees_projects.employee_id"),
+        ("employees_projects.project_id", "projects.id"),
+    ]
+    data = database.join(tables=tables, join_attrs=join_attrs)
+
+    # Присоединяемые таблицы больше лимита и разбиваются на разделы
+    Database(memory_limit=1)
+    res = database.join(tables=tables, join_attrs=join_attrs)
+
+    def key(row):
+        return row["employees.id"], row["projects.id"]
+
+    assert len(res) == 4
+    assert sorted(res, key=key) == sorted(data, key=key)
+
+
+def test_iter_join_returns_rows_lazily(database):
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("departments", "1 HR")
+
+    rows = database.iter_join(
+        tables=("employees", "departments"),
+        join_attrs=[("employees.department_id", "departments.id")],
+    )
+
+    assert next(rows)["departments.department_name"] == "HR"
+    assert next(rows, None) is None
+
+    with pytest.raises(ValueError):
+        database.iter_join(
+            tables=("employees", "departments"),
+            join_attrs=[("employees.year_of_birth", "departments.id")],
+        )
+
+
+def test_aggregate_with_group_by_and_memory_limit(database):
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "2,1,Project Manager")
+    database.insert("employees_projects", "10,1,Consultant")
+    database.insert("employees_projects", "1,2,Developer")
+    database.insert("employees_projects", "3,2,Tester")
+    database.insert("employees_projects", "2,3,Project Manager")
+
+    Database(memory_limit=2)
+    res = database.aggregate(
+        table_name="employees_projects",
+        column="employee_id",
+        operation="SUM",
+        group_by="project_id",
+    )
+
+    assert sorted(res, key=lambda row: row["project_id"]) == [
+        {"project_id": 1, "SUM(employee_id)": "13"},
+        {"project_id": 2, "SUM(employee_id)": "4"},
+        {"project_id": 3, "SUM(employee_id)": "2"},
+    ]
+
+
+def test_aggregate_closes_spill_files_on_error(database, monkeypatch):
+    for i in range(1, 5):
+        database.insert("employees_projects", f"{i},{i},Developer")
+
+    closed = []
+    close = spill.SpillFile.close
+
+    def spy_close(self):
+        closed.append(self)
+        close(self)
+
+    def failing_group(self, *args):
+        raise RuntimeError("Aggregation failed.")
+
+    monkeypatch.setattr(spill.SpillFile, "close", spy_close)
+    monkeypatch.setattr(Database, "_group", failing_group)
+    Database(memory_limit=2)
+
+    with pytest.raises(RuntimeError):
+        database.aggregate(
+            "employees_projects", "employee_id", "SUM", group_by="project_id"
+        )
+
+    assert len(closed) == 2
+
+
+def test_typed_columns(database, monkeypatch):
+    employees = database.tables["employees"]
+    monkeypatch.setattr(
+        employees, "TYPES", {**employees.TYPES, "salary": float}
+    )
+
+    database.insert("employees", "1 John 28 50000.5 1")
+    database.insert("employees", "2 Jane 34 60000.5 2")
+    database.insert("projects", "1,Website Redesign,2024-01-15,2024-03-15")
+
+    # Значения разбираются один раз и хранятся в своих типах
+    employees.load()
+    assert employees.data[0]["salary"] == 50000.5
+    assert employees.data[0]["age"] == 28
+
+    res = database.aggregate(
+        table_name="employees", column="salary", operation="SUM"
+    )
+    assert res == {"SUM(salary)": "110001.0"}
+
+    projects = database.tables["projects"]
+    projects.load()
+    assert projects.data[0]["start_date"] == date(2024, 1, 15)
+
+    with pytest.raises(ValueError, match="is not a valid 'int'"):
+        database.insert("employees", "3 Alice old 45000 3")
+
+    with pytest.raises(ValueError, match="is not a valid 'date'"):
+        database.insert("projects", "2,CRM Development,2024-02-30,2024-08-01")
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_load_all_tables(database, processes):
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("departments", "1 HR")
+    database.insert("projects", "1,Website Redesign,2024-01-15,2024-03-15")
+    database.insert("employees_projects", "1,1,Developer")
+
+    for table in database.tables.values():
+        table.data = []
+
+    database.load_all(processes=processes, max_workers=2)
+
+    assert database.select("employees", 1, 1)[0]["name"] == "John"
+    assert database.select("departments", "HR") == [
+        {"id": 1, "department_name": "HR"}
+    ]
+    assert database.select("projects", 1, 1)[0]["name"] == "Website Redesign"
+    assert database.select("employees_projects", 1, 1) == [
+        {"employee_id": 1, "project_id": 1, "role": "Developer"}
+    ]
+
+
+def test_read_table_with_row_type_arguments(temp_employee_file):
+    table = EmployeeTable(load_data=False)
+    table.FILE_PATH = temp_employee_file
+    table.insert("1 John 28 50000 1")
+
+    # Так таблица читается в процессах пула load_all
+    data, file_rows, deleted, _ = _read_table(
+        table.FILE_PATH,
+        table.deleted_path,
+        ("EmployeeTable", EmployeeTable.ATTRS),
+        table.column_types,
+    )
+
+    assert (file_rows, deleted) == (1, 0)
+    assert type(data[0]) is row_type("EmployeeTable", EmployeeTable.ATTRS)
+    assert data[0]["salary"] == 50000
+
+
+def test_compact_rows(database, monkeypatch):
+    for table in database.tables.values():
+        monkeypatch.setattr(table, "COMPACT_ROWS", True)
+
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    database.insert("departments", "1 HR")
+    database.insert("departments", "2 Finance")
+
+    employees = database.tables["employees"]
+    employees.load()
+
+    res = database.select("employees", 1, 1)
+    assert type(res[0]) is employees.row_type
+    assert res[0].as_dict() == {
+        "id": 1,
+        "name": "John",
+        "age": 28,
+        "salary": 50000,
+        "department_id": 1,
+    }
+
+    res = database.join(
+        tables=("employees", "departments"),
+        join_attrs=[("employees.department_id", "departments.id")],
+    )
+    assert [row["departments.department_name"] for row in res] == [
+        "HR",
+        "Finance",
+    ]
+    # Строки результата ссылаются на компактные строки таблиц
+    assert type(res[1]) is joined_row_type(
+        (
+            ("employees", EmployeeTable.ATTRS),
+            ("departments", DepartmentTable.ATTRS),
+        )
+    )
+    assert res[1].rows[0] is employees.data[1]
+    assert res[1] == {
+        "employees.id": 2,
+        "employees.name": "Jane",
+        "employees.age": 34,
+        "employees.salary": 60000,
+        "employees.department_id": 2,
+        "departments.id": 2,
+        "departments.department_name": "Finance",
+    }
+
+    # Соединение по разделам во временных файлах дает строки того же класса
+    Database(memory_limit=1)
+    spilled = database.join(
+        tables=("employees", "departments"),
+        join_attrs=[("employees.department_id", "departments.id")],
+    )
+    assert {type(row) for row in spilled} == {type(res[1])}
+    assert sorted(spilled, key=itemgetter("employees.id")) == res
+    Database(memory_limit=None)
+
+    res = database.aggregate(
+        table_name="employees", column="salary", operation="SUM"
+    )
+    assert res == {"SUM(salary)": "110000"}
+
+
+def test_dictionary_encoded_columns(database, monkeypatch):
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "2,1,Project Manager")
+    database.insert("employees_projects", "1,2,Developer")
+    database.insert("employees_projects", "3,2,Developer")
+
+    table = database.tables["employees_projects"]
+    table.load()
+
+    assert table.dictionaries["role"].values == [
+        "Developer",
+        "Project Manager",
+    ]
+    assert [row.code("role") for row in table.data] == [0, 1, 0, 0]
+    assert database.select("employees_projects", 1, 2) == [
+        {"employee_id": 1, "project_id": 2, "role": "Developer"}
+    ]
+
+    res = database.aggregate(
+        table_name="employees_projects",
+        column="employee_id",
+        operation="COUNT",
+        group_by="role",
+    )
+    assert res == [
+        {"role": "Developer", "COUNT(employee_id)": "3"},
+        {"role": "Project Manager", "COUNT(employee_id)": "1"},
+    ]
+
+    # Таблица передается в другие процессы вместе со словарями
+    restored = pickle.loads(pickle.dumps(table))
+    assert restored.dictionaries["role"].values == [
+        "Developer",
+        "Project Manager",
+    ]
+    assert restored.row_type("4", "3", "Tester").code("role") == 2
+
+
+def test_select_by_dictionary_encoded_department_name(
+    database, monkeypatch, temp_department_file
+):
+    monkeypatch.setattr(DepartmentTable, "ENCODED_ATTRS", ("department_name",))
+    table = DepartmentTable(load_data=False)
+    table.FILE_PATH = temp_department_file
+    database.register_table("departments", table)
+
+    database.insert("departments", "1 HR")
+    database.insert("departments", "2 Finance")
+    database.insert("departments", "3 HR")
+
+    assert database.select("departments", "HR") == [
+        {"id": 1, "department_name": "HR"},
+        {"id": 3, "department_name": "HR"},
+    ]
+    assert database.select("departments", "Legal") == []
+
+
+def test_update_rows(database):
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    database.insert("employees", "3 Alice 29 45000 3")
+    employees = database.tables["employees"]
+
+    assert database.update("employees", {"id": 2}, {"salary": "65000"}) == 1
+    assert database.update("employees", {"id": 7}, {"salary": 1}) == 0
+
+    # Новая версия строки дописывается в конец таблицы
+    assert [row["id"] for row in employees.rows()] == [1, 3, 2]
+    assert database.select("employees", 2, 2)[0]["salary"] == 65000
+    assert employees.find({"name": "Jane"})[0]["salary"] == 65000
+
+    employees.load()
+    assert database.select("employees", 2, 2)[0]["salary"] == 65000
+
+    with pytest.raises(ValueError):
+        database.update("employees", {"id": 2}, {"department_id": 1})
+
+    with pytest.raises(ValueError):
+        database.update("employees", {"id": 3}, {"year_of_birth": 1990})
+
+    # Неудачные изменения не затрагивают таблицу
+    assert [row["department_id"] for row in employees.rows()] == [1, 3, 2]
+
+    assert database.update("employees", {"age": 29}, {"age": 30}) == 1
+    assert [row["age"] for row in employees.rows()] == [28, 34, 30]
+
+    employees.compact()
+    assert not os.path.exists(employees.deleted_path)
+
+
+def test_update_keeps_unique_values_of_updated_rows_apart(database):
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "1,2,Developer")
+
+    with pytest.raises(ValueError):
+        database.update(
+            "employees_projects", {"employee_id": 1}, {"project_id": 3}
+        )
+
+    assert (
+        database.update(
+            "employees_projects", {"employee_id": 1}, {"role": "Team Lead"}
+        )
+        == 2
+    )
+    assert database.select("employees_projects", 1) == [
+        {"employee_id": 1, "project_id": 1, "role": "Team Lead"},
+        {"employee_id": 1, "project_id": 2, "role": "Team Lead"},
+    ]
+
+    database.tables["employees_projects"].compact()
+
+
+def test_delete_rows(database, monkeypatch):
+    employees = database.tables["employees"]
+    monkeypatch.setattr(employees, "AUTO_COMPACT_RATIO", None)
+
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    database.insert("employees", "3 Alice 29 45000 3")
+
+    with open(employees.FILE_PATH) as f:
+        file_content = f.read()
+
+    assert database.delete("employees", {"id": "2"}) == 1
+    assert database.delete("employees", {"id": 2}) == 0
+    assert [row["id"] for row in employees.rows()] == [1, 3]
+
+    # Удаление не перезаписывает файл, а дописывает журнал
+    with open(employees.FILE_PATH) as f:
+        assert f.read() == file_content
+
+    employees.load()
+    assert database.select("employees", 1, 3) == [
+        employees.data[0],
+        employees.data[2],
+    ]
+
+    # Удаленное значение уникального столбца можно вставить снова
+    database.insert("employees", "2 Jane 34 60000 2")
+    assert [row["id"] for row in employees.rows()] == [1, 3, 2]
+
+    employees.compact()
+    assert employees.data == list(employees.rows())
+    assert not os.path.exists(employees.deleted_path)
+
+    employees.load()
+    assert [row["id"] for row in employees.rows()] == [1, 3, 2]
+
+
+def test_delete_compacts_table_automatically(database):
+    database.insert("departments", "1 HR")
+    database.insert("departments", "2 Finance")
+    database.insert("departments", "3 Engineering")
+    departments = database.tables["departments"]
+
+    database.delete("departments", {"id": 1})
+    assert len(departments.data) == 3
+
+    database.delete("departments", {"department_name": "Finance"})
+    assert departments.data == [{"id": 3, "department_name": "Engineering"}]
+    assert not os.path.exists(departments.deleted_path)
+
+
+def test_update_compacts_table_automatically(database):
+    database.insert("departments", "1 HR")
+    departments = database.tables["departments"]
+
+    for name in ("Finance", "Legal", "Sales"):
+        database.update("departments", {"id": 1}, {"department_name": name})
+
+    # Старые версии строки не накапливаются в файле и журнале удалений
+    assert len(departments.data) <= 2
+    departments.load()
+    assert list(departments.rows()) == [{"id": 1, "department_name": "Sales"}]
+
+
+def test_load_discards_stale_deletion_log(database):
+    database.insert("departments", "1 HR")
+    database.insert("departments", "2 Finance")
+    departments = database.tables["departments"]
+
+    with open(departments.deleted_path, "w") as f:
+        f.write("0\n5\n")
+
+    departments.load()
+
+    assert len(list(departments.rows())) == 2
+    assert not os.path.exists(departments.deleted_path)
+
+
+def test_update_and_delete_in_non_existent_table(database):
+    with pytest.raises(ValueError):
+        database.update("e", {"id": 1}, {"age": 30})
+
+    with pytest.raises(ValueError):
+        database.delete("e", {"id": 1})
+
+
+def test_changes_of_table_not_synced_with_file(temp_employee_file):
+    table = EmployeeTable(load_data=False)
+    table.FILE_PATH = temp_employee_file
+    table.insert("1 John 28 50000 1")
+    table.insert("2 Jane 34 60000 2")
+
+    # Таблица, не загруженная из файла, перезаписывает его целиком
+    other = EmployeeTable(load_data=False)
+    other.FILE_PATH = temp_employee_file
+    other.insert("3 Alice 29 45000 3")
+
+    table.load()
+    assert [row["name"] for row in table.rows()] == ["Alice"]
+
+    # Строки, добавленные в data вручную, сохраняются при следующем изменении
+    other.data.append(
+        {
+            "id": 4,
+            "name": "Bob",
+            "age": 40,
+            "salary": 70000,
+            "department_id": 4,
+        }
+    )
+    other.delete({"id": 3})
+
+    table.load()
+    assert [row["name"] for row in table.rows()] == ["Bob"]
+
+
+def test_insert_into_loaded_table_without_file(tmp_path):
+    table = EmployeeTable(load_data=False)
+    table.FILE_PATH = str(tmp_path / "employees.csv")
+    table.load()
+    table.insert("1 John 28 50000 1")
+
+    table.load()
+    assert [row["name"] for row in table.rows()] == ["John"]
+
+
+def test_refresh_reads_appended_rows(temp_employee_file):
+    writer = EmployeeTable(load_data=False)
+    writer.FILE_PATH = temp_employee_file
+    writer.load()
+    writer.insert("1 John 28 50000 1")
+    writer.insert("2 Jane 34 60000 2")
+
+    # Другой процесс видит изменения файла после refresh
+    reader = EmployeeTable(load_data=False)
+    reader.FILE_PATH = temp_employee_file
+    reader.load()
+    data = reader.data
+    assert reader.refresh() is False
+
+    writer.insert("3 Alice 29 45000 3")
+    writer.delete({"id": 1})
+    assert reader.refresh() is True
+    assert reader.data is data
+    assert [row["name"] for row in reader.rows()] == ["Jane", "Alice"]
+    assert reader.find({"id": 3})[0]["name"] == "Alice"
+    assert reader.find({"id": 1}) == []
+
+    # Недописанная строка читается, когда ее допишут
+    with open(temp_employee_file, "a") as f:
+        f.write("4,Bob,40,70000,4\n5,Kat")
+
+    assert reader.refresh() is True
+    assert [row["id"] for row in reader.rows()] == [2, 3, 4]
+    assert reader.refresh() is False
+
+    with open(temp_employee_file, "a") as f:
+        f.write("hy,30,52000,5\n")
+
+    assert reader.refresh() is True
+    assert reader.data is data
+    assert reader.find({"id": 5})[0]["name"] == "Kathy"
+    assert reader.refresh() is False
+
+    # Перезаписанный или укороченный файл загружается целиком
+    writer.compact()
+    assert reader.refresh() is True
+    assert reader.data is not data
+    assert [row["name"] for row in reader.rows()] == ["Jane", "Alice"]
+
+    with open(writer.deleted_path, "w") as f:
+        f.write("7\n")
+
+    assert reader.refresh() is True
+    assert [row["name"] for row in reader.rows()] == ["Jane", "Alice"]
+
+    os.remove(temp_employee_file)
+    assert reader.refresh() is True
+    assert reader.data == []
+    assert reader.refresh() is False
+
+    writer.save()
+    assert reader.refresh() is True
+    assert len(reader.data) == 2
+
+
+def test_join_reads_snapshot_of_tables(database):
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    database.insert("departments", "1 HR")
+    database.insert("departments", "2 Engineering")
+    employees = database.tables["employees"]
+    data = employees.data
+
+    result = database.iter_join(
+        ("employees", "departments"),
+        [("employees.department_id", "departments.id")],
+    )
+
+    # Изменения во время перебора не видны уже начатому соединению
+    database.insert("employees", "3 Alice 29 45000 3")
+    database.update("employees", {"id": 1}, {"name": "Johnny"})
+    database.delete("departments", {"id": 2})
+
+    assert [
+        (row["employees.name"], row["departments.department_name"])
+        for row in result
+    ] == [("John", "HR"), ("Jane", "Engineering")]
+
+    # Измененные после снимка строки скопированы, а не изменены на месте
+    assert employees.data is not data
+    assert [row["name"] for row in employees.rows()] == [
+        "Jane",
+        "Alice",
+        "Johnny",
+    ]
+
+
+def test_table_snapshot(database, monkeypatch):
+    monkeypatch.setattr(EmployeeProjectTable, "AUTO_COMPACT_RATIO", None)
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "1,2,Manager")
+    table = database.tables["employees_projects"]
+
+    snapshot = table.snapshot()
+    data, indexes = table.data, table.indexes
+
+    # Вставка не копирует данные: снимок отсекает новые строки по длине
+    table.insert("1,3,Tester")
+    assert table.data is data and table.indexes is indexes
+    assert snapshot.ATTRS == table.ATTRS
+    assert len(snapshot.find({"employee_id": 1})) == 2
+    assert snapshot.find({"employee_id": 1, "project_id": "3"}) == []
+    assert len(list(snapshot.rows())) == 2
+
+    table.delete({"project_id": 1})
+    table.save()
+    table.load()
+    assert table.data is not data and table.indexes is not indexes
+    assert [row["role"] for row in snapshot.rows()] == [
+        "Developer",
+        "Manager",
+    ]
+    assert snapshot.find({"project_id": 1})[0]["role"] == "Developer"
+    assert [row["role"] for row in table.rows()] == ["Manager", "Tester"]
+
+    # Без снимков таблица изменяется на месте
+    del snapshot
+    data = table.data
+    table.delete({"project_id": 2})
+    assert table.data is data
+
+
+def test_aggregate_reads_snapshot(database, monkeypatch):
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    group = Database._group
+
+    def group_with_concurrent_insert(self, pairs, *args):
+        # Вставка из другого потока, пока aggregate читает таблицу
+        database.insert("employees", "3 Alice 28 45000 3")
+        return group(self, pairs, *args)
+
+    monkeypatch.setattr(Database, "_group", group_with_concurrent_insert)
+
+    assert database.aggregate(
+        "employees", "salary", "COUNT", group_by="age"
+    ) == [
+        {"age": 28, "COUNT(salary)": "1"},
+        {"age": 34, "COUNT(salary)": "1"},
+    ]
+
+
+def _attached_employee_names(name):
+    """Выполняется в отдельном процессе со своим экземпляром Database."""
+    db = Database()
+    db.register_table("employees", EmployeeTable(load_data=False))
+
+    with db.attach(name):
+        return [row["name"] for row in db.select("employees", 1, 9)]
+
+
+def test_publish_and_attach_shared_tables(
+    database, monkeypatch, temp_department_file
+):
+    monkeypatch.setattr(DepartmentTable, "ENCODED_ATTRS", ("department_name",))
+    departments = DepartmentTable(load_data=False)
+    departments.FILE_PATH = temp_department_file
+    database.register_table("departments", departments)
+
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    database.insert("employees", "3 Alice 29 45000 3")
+    database.delete("employees", {"id": 3})
+    database.insert("departments", "1 HR")
+    database.insert("departments", "2 Finance")
+    database.insert("projects", "1,Website Redesign,2024-01-15,2024-03-15")
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "2,1,Tester")
+
+    name = f"tiny_database_{os.getpid()}"
+
+    with database.publish(name):
+        with pytest.raises(FileExistsError):
+            database.publish(name)
+
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+            assert pool.submit(_attached_employee_names, name).result() == [
+                "John",
+                "Jane",
+            ]
+
+        # Новые таблицы подключаются к опубликованным данным без CSV
+        for table_name, table in list(database.tables.items()):
+            database.register_table(table_name, type(table)(load_data=False))
+
+        with database.attach(name):
+            assert [
+                row["name"] for row in database.select("employees", 1, 3)
+            ] == [
+                "John",
+                "Jane",
+            ]
+            assert database.select("departments", "HR") == [
+                {"id": 1, "department_name": "HR"}
+            ]
+            assert database.select("projects", 1, 1)[0]["end_date"] == date(
+                2024, 3, 15
+            )
+            assert database.select("employees_projects", project_id=1) == [
+                {"employee_id": 1, "project_id": 1, "role": "Developer"},
+                {"employee_id": 2, "project_id": 1, "role": "Tester"},
+            ]
+            assert database.tables["employees_projects"].find(
+                {"employee_id": 2, "project_id": 1}
+            ) == [{"employee_id": 2, "project_id": 1, "role": "Tester"}]
+
+            res = database.join(
+                tables=("employees", "departments"),
+                join_attrs=[("employees.department_id", "departments.id")],
+            )
+            assert [row["departments.department_name"] for row in res] == [
+                "HR",
+                "Finance",
+            ]
+            assert database.aggregate("employees", "salary", "SUM") == {
+                "SUM(salary)": "110000"
+            }
+
+            # Подключенные таблицы не занимают бюджет памяти процесса
+            assert database.memory_usage()["tables"]["employees"] == 0
+            Database(memory_budget=10**6)
+            res = database.join(
+                tables=("employees", "departments"),
+                join_attrs=[("employees.department_id", "departments.id")],
+            )
+            assert len(res) == 2
+            assert database.aggregate(
+                "employees", "salary", "SUM", group_by="department_id"
+            ) == [
+                {"department_id": 1, "SUM(salary)": "50000"},
+                {"department_id": 2, "SUM(salary)": "60000"},
+            ]
+
+            with pytest.raises(ValueError):
+                database.insert("employees", "4 Bob 40 70000 4")
+
+            with pytest.raises(ValueError):
+                database.delete("employees", {"id": 1})
+
+            with pytest.raises(ValueError):
+                database.tables["employees"].load()
+
+    # После закрытия публикации сегменты удалены
+    with pytest.raises(FileNotFoundError):
+        database.attach(name)
+
+
+def test_filters_on_dictionary_encoded_column(database, monkeypatch):
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "2,1,Tester")
+    database.insert("employees_projects", "3,2,Developer")
+    table = database.tables["employees_projects"]
+
+    # Значения сравниваются по кодам словаря, а не строками
+    monkeypatch.setattr(
+        type(table.data[0]),
+        "_getters",
+        {**type(table.data[0])._getters, "role": None},
+    )
+    assert [row.code("role") for row in table.find({"role": "Developer"})] == [
+        0,
+        0,
+    ]
+    assert table.find({"role": "Manager"}) == []
+    monkeypatch.undo()
+
+    assert (
+        database.update(
+            "employees_projects", {"role": "Tester"}, {"role": "Team Lead"}
+        )
+        == 1
+    )
+    assert database.delete("employees_projects", {"role": "Developer"}) == 2
+    assert list(table.rows()) == [
+        {"employee_id": 2, "project_id": 1, "role": "Team Lead"}
+    ]
+
+
+def test_compressed_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(compression, "BLOCK_ROWS", 2)
+    monkeypatch.setattr(EmployeeTable, "COMPRESSION", "gzip")
+    monkeypatch.setattr(EmployeeTable, "AUTO_COMPACT_RATIO", None)
+    table = EmployeeTable(load_data=False)
+    table.FILE_PATH = str(tmp_path / "employees.csv.gz")
+
+    for i in range(1, 6):
+        table.insert(f"{i} Employee{i} {20 + i} 50000 {i}")
+
+    table.delete({"id": 2})
+
+    with gzip.open(table.FILE_PATH, "rt") as f:
+        assert f.readline() == "id,name,age,salary,department_id\n"
+
+    assert [row["id"] for row in table.read_range(0, 3)] == [1, 3]
+    assert [row["id"] for row in table.read_range(3, 10)] == [4, 5]
+
+    table.load()
+    assert [row["id"] for row in table.rows()] == [1, 3, 4, 5]
+
+    table.compact()
+    table.load()
+    assert [row["name"] for row in table.rows()] == [
+        "Employee1",
+        "Employee3",
+        "Employee4",
+        "Employee5",
+    ]
+
+
+@pytest.fixture
+def partitioned_table(tmp_path, database):
+    table = PartitionedEmployeeProjectTable(load_data=False)
+    table.FILE_PATH = str(tmp_path / "employees_projects.csv")
+    database.register_table("employees_projects", table)
+    return table
+
+
+def test_partitioned_table(partitioned_table, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        PartitionedEmployeeProjectTable, "AUTO_COMPACT_RATIO", None
+    )
+    table = partitioned_table
+
+    for employee_id, project_id in [(1, 1), (2, 1), (1, 2), (3, 9)]:
+        table.insert(f"{employee_id},{project_id},Developer")
+
+    # Строки проекта лежат в файле одного раздела
+    assert sorted(glob.glob("*.csv", root_dir=tmp_path)) == [
+        "employees_projects.p1.csv",
+        "employees_projects.p2.csv",
+    ]
+    assert table.partitions[1].select(project_id=9) == [
+        {"employee_id": 3, "project_id": 9, "role": "Developer"}
+    ]
+
+    # Выборка по ключу разбиения читает только его раздел
+    for number in (0, 2, 3, 4, 5, 6, 7):
+        monkeypatch.setattr(table.partitions[number], "find", None)
+
+    assert table.select(project_id=1) == [
+        {"employee_id": 1, "project_id": 1, "role": "Developer"},
+        {"employee_id": 2, "project_id": 1, "role": "Developer"},
+    ]
+    monkeypatch.undo()
+
+    assert table.select(employee_id=1) == [
+        {"employee_id": 1, "project_id": 1, "role": "Developer"},
+        {"employee_id": 1, "project_id": 2, "role": "Developer"},
+    ]
+
+    with pytest.raises(ValueError):
+        table.insert("1,1,Tester")
+
+    # Перенос строки в раздел нового значения ключа
+    assert table.update({"employee_id": 2}, {"project_id": 2}) == 1
+    assert table.update({"project_id": 5}, {"role": "Tester"}) == 0
+    assert table.select(project_id=2) == [
+        {"employee_id": 1, "project_id": 2, "role": "Developer"},
+        {"employee_id": 2, "project_id": 2, "role": "Developer"},
+    ]
+
+    with pytest.raises(ValueError):
+        table.update({"project_id": 2}, {"employee_id": 3})
+
+    assert table.delete({"project_id": "9"}) == 1
+
+    # Разделы загружаются и сохраняются независимо
+    reloaded = PartitionedEmployeeProjectTable(load_data=False)
+    reloaded.FILE_PATH = table.FILE_PATH
+    reloaded.partitions[2].load()
+    assert reloaded.select(project_id=2) == table.select(project_id=2)
+    assert reloaded.select(project_id=1) == []
+
+    reloaded.load()
+    assert list(reloaded.rows()) == list(table.rows())
+    assert len(list(table.rows())) == 3
+
+    # Разделы дочитываются независимо
+    assert reloaded.refresh() is False
+    table.insert("3,2,Tester")
+    assert reloaded.refresh() is True
+    assert reloaded.select(project_id=2) == table.select(project_id=2)
+
+    table.compact()
+    assert not os.path.exists(table.partitions[1].deleted_path)
+
+    with pytest.raises(ValueError):
+        table.read_range(0, 1)
+
+
+def test_range_partitioned_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(PartitionedEmployeeProjectTable, "PARTITIONS", (3, 6))
+    table = PartitionedEmployeeProjectTable(load_data=False)
+    table.FILE_PATH = str(tmp_path / "employees_projects.csv")
+
+    for project_id in range(1, 9):
+        table.insert(f"1,{project_id},Developer")
+
+    assert [
+        [row["project_id"] for row in partition.rows()]
+        for partition in table.partitions
+    ] == [[1, 2], [3, 4, 5], [6, 7, 8]]
+    assert table._partition_number(None) == 0
+
+    monkeypatch.setattr(
+        PartitionedEmployeeProjectTable, "FILE_PATH", table.FILE_PATH
+    )
+    assert list(PartitionedEmployeeProjectTable().rows()) == list(table.rows())
+
+
+def test_hash_partitions_are_stable_across_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        PartitionedEmployeeProjectTable, "PARTITION_BY", "role"
+    )
+    table = PartitionedEmployeeProjectTable(load_data=False)
+    table.FILE_PATH = str(tmp_path / "employees_projects.csv")
+    table.insert("1,1,Developer")
+
+    # crc32 не зависит от PYTHONHASHSEED, в отличие от hash строк
+    assert [len(list(p.rows())) for p in table.partitions].index(1) == (
+        zlib.crc32(b"Developer") % 8
+    )
+    assert table.select(employee_id=1, project_id=1)[0]["role"] == "Developer"
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_partitioned_table_in_database(database, partitioned_table, processes):
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "2,2,Tester")
+
+    for partition in partitioned_table.partitions:
+        partition.data = []
+
+    database.load_all(processes=processes, max_workers=2)
+
+    assert isinstance(partitioned_table, PartitionedTable)
+    assert sorted(
+        (row["employees.name"], row["employees_projects.role"])
+        for row in database.join(
+            ("employees", "employees_projects"),
+            [("employees.id", "employees_projects.employee_id")],
+        )
+    ) == [("Jane", "Tester"), ("John", "Developer")]
+    assert database.aggregate(
+        "employees_projects", "employee_id", "COUNT", group_by="role"
+    ) == [
+        {"role": "Developer", "COUNT(employee_id)": "1"},
+        {"role": "Tester", "COUNT(employee_id)": "1"},
+    ]
+
+    snapshot = partitioned_table.snapshot()
+    database.delete("employees_projects", {"project_id": 1})
+    assert snapshot.length == 2
+    assert [row["role"] for row in snapshot.find({"project_id": 1})] == [
+        "Developer"
+    ]
+    assert len(list(snapshot.rows())) == 2
+    assert partitioned_table.select(project_id=1) == []
+
+
+def test_publish_and_attach_partitioned_table(database, partitioned_table):
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "2,2,Tester")
+    name = f"tiny_database_partitions_{os.getpid()}"
+
+    with database.publish(name):
+        attached = PartitionedEmployeeProjectTable(load_data=False)
+        database.register_table("employees_projects", attached)
+
+        with database.attach(name):
+            assert database.select("employees_projects", 2, 2) == [
+                {"employee_id": 2, "project_id": 2, "role": "Tester"}
+            ]
+
+            with pytest.raises(ValueError):
+                attached.insert("3,3,Developer")
+
+
+def test_bloom_filters(tmp_path, monkeypatch):
+    table = EmployeeProjectTable(load_data=False)
+    table.FILE_PATH = str(tmp_path / "employees_projects.csv")
+
+    for employee_id in range(1, 4):
+        table.insert(f"{employee_id},1,Developer")
+
+    bloom = table.blooms[("employee_id", "project_id")]
+    assert (2, 1) in bloom and (2, 2) not in bloom
+
+    # Проверки и поиск заведомо отсутствующих значений не трогают индексы
+    monkeypatch.setattr(table.indexes[("employee_id",)], "lookup", None)
+    monkeypatch.setattr(
+        table.indexes[("employee_id", "project_id")], "lookup", None
+    )
+    table.insert("4,1,Tester")
+    assert table.find({"employee_id": 5}) == []
+    monkeypatch.undo()
+
+    with pytest.raises(ValueError):
+        table.insert("4,1,Tester")
+
+    # Фильтры сохраняются вместе с таблицей и не строятся при загрузке
+    table.save()
+    table.insert("5,2,Tester")
+    build = BloomFilter.build
+    added = []
+
+    def logged_build(self, data):
+        added.append(list(data))
+        build(self, added[-1])
+
+    monkeypatch.setattr(BloomFilter, "build", logged_build)
+
+    loaded = EmployeeProjectTable(load_data=False)
+    loaded.FILE_PATH = table.FILE_PATH
+    added.clear()
+    loaded.load()
+    assert added == [[loaded.data[4]]] * 2
+    assert loaded.find({"employee_id": 5})[0]["role"] == "Tester"
+
+    # Устаревшие или переполненные фильтры перестраиваются
+    added.clear()
+    with open(table.bloom_path, "rb") as f:
+        header, filters = f.readline().split(maxsplit=1), f.read()
+
+    with open(table.bloom_path, "wb") as f:
+        f.write(b" ".join([b"100", *header[1:]]) + b"\n" + filters)
+
+    loaded.load()
+    assert len(added[0]) == 5
+
+    # Поврежденный файл фильтров тоже не читается
+    added.clear()
+    with open(table.bloom_path, "r+b") as f:
+        f.truncate(os.path.getsize(table.bloom_path) - 1)
+
+    loaded.load()
+    assert len(added[0]) == 5
+
+    for bloom in loaded.blooms.values():
+        bloom.count = bloom.capacity
+
+    loaded._save_blooms()
+    loaded.insert("6,2,Tester")
+    added.clear()
+    loaded.load()
+    assert [len(rows) for rows in added] == [1, 1, 6, 6]
+    assert loaded.blooms[("employee_id",)].capacity == 64
+
+
+def test_bloom_filters_of_rewritten_file_are_rebuilt(tmp_path):
+    table = EmployeeTable(load_data=False)
+    table.FILE_PATH = str(tmp_path / "employees.csv")
+
+    for employee_id in range(1, 4):
+        table.insert(f"{employee_id} John 28 50000 {employee_id}")
+
+    table.save()
+
+    # Файл перезаписан вне базы с тем же числом строк
+    with open(table.FILE_PATH, "w") as f:
+        f.write("id,name,age,salary,department_id\n")
+
+        for employee_id in range(4, 7):
+            f.write(f"{employee_id},Jane,34,60000,{employee_id}\n")
+
+    loaded = EmployeeTable(load_data=False)
+    loaded.FILE_PATH = table.FILE_PATH
+    loaded.load()
+    assert loaded.find({"id": 4})[0]["name"] == "Jane"
+
+    with pytest.raises(ValueError):
+        loaded.insert("4 Jane 34 60000 7")
+
+
+def test_bloom_filters_are_not_saved_without_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    table = EmployeeTable()
+
+    assert table.blooms and os.listdir(tmp_path) == []
+    table.FILE_PATH = str(tmp_path / "employees.csv")
+    table.save()
+    assert not os.path.exists(table.bloom_path)
+
+
+def test_join_does_not_spill_rows_without_pair(database, monkeypatch):
+    Database(memory_limit=1)
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "1,2,Tester")
+
+    written = []
+    write = spill.SpillFile.write
+    monkeypatch.setattr(
+        spill.SpillFile,
+        "write",
+        lambda self, obj: written.append(obj) or write(self, obj),
+    )
+
+    assert (
+        len(
+            database.join(
+                ("employees", "employees_projects"),
+                [("employees.id", "employees_projects.employee_id")],
+            )
+        )
+        == 2
+    )
+    assert (
+        sum("name" in row or "employees.name" in row for row in written) == 1
+    )
+
+
+def test_select_with_order_by_and_limit(database, monkeypatch):
+    for i, salary in enumerate([50000, 60000, 45000, 70000, 60000], 1):
+        database.insert("employees", f"{i} Employee{i} {20 + i} {salary} {i}")
+
+    def ids(rows):
+        return [row["id"] for row in rows]
+
+    assert ids(
+        database.select(
+            "employees", 1, 5, order_by="salary", descending=True, limit=3
+        )
+    ) == [4, 2, 5]
+    assert ids(database.select("employees", 1, 5, order_by="salary")) == [
+        3,
+        1,
+        2,
+        5,
+        4,
+    ]
+    assert ids(
+        database.select(
+            "employees", 1, 5, order_by=("salary", "age"), descending=True
+        )
+    ) == [4, 5, 2, 1, 3]
+    assert ids(database.select("employees", 1, 5, limit=2)) == [1, 2]
+    assert database.select("employees", 1, 5, order_by="id", limit=0) == []
+
+    # Пустые значения идут последними при любом порядке
+    table = database.tables["employees"]
+    table.data[0]["salary"] = None
+
+    for descending in (False, True):
+        assert (
+            ids(
+                database.select(
+                    "employees",
+                    1,
+                    5,
+                    order_by="salary",
+                    descending=descending,
+                    limit=5,
+                )
+            )[-1]
+            == 1
+        )
+
+    with pytest.raises(ValueError):
+        database.select("employees", 1, 5, order_by="rank")
+
+    with pytest.raises(ValueError):
+        database.select("employees", 1, 5, limit=-1)
+
+    assert database.select("missing", order_by="id") is None
+
+
+def test_join_with_order_by_and_limit(database, monkeypatch):
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "2,1,Tester")
+    database.insert("employees_projects", "2,2,Tester")
+
+    # В памяти держатся только `limit` строк соединения
+    nsmallest = heapq.nsmallest
+    calls = []
+
+    def logged_nsmallest(n, iterable, key):
+        calls.append((n, iterable))
+        return nsmallest(n, iterable, key=key)
+
+    monkeypatch.setattr(heapq, "nsmallest", logged_nsmallest)
+    rows = database.join(
+        ("employees", "employees_projects"),
+        [("employees.id", "employees_projects.employee_id")],
+        order_by=("employees.salary", "employees_projects.project_id"),
+        limit=2,
+    )
+
+    assert [
+        (row["employees.name"], row["employees_projects.project_id"])
+        for row in rows
+    ] == [("John", 1), ("Jane", 1)]
+    assert calls[0][0] == 2 and not isinstance(calls[0][1], list)
+
+    with pytest.raises(ValueError):
+        database.join(
+            ("employees", "employees_projects"),
+            [("employees.id", "employees_projects.employee_id")],
+            order_by="salary",
+        )
+
+
+def test_approximate_aggregates(database, monkeypatch):
+    for i in range(1, 101):
+        database.insert("employees", f"{i} Employee{i} {20 + i % 10} {i} {i}")
+
+    # Скетч столбца обновлен вставками, поэтому строки не перебираются
+    table = database.tables["employees"]
+    monkeypatch.setattr(table, "snapshot", None)
+
+    assert database.aggregate("employees", "age", "APPROX_COUNT_DISTINCT") == {
+        "APPROX_COUNT_DISTINCT(age)": "10"
+    }
+    assert database.aggregate("employees", "salary", "APPROX_MEDIAN") == {
+        "APPROX_MEDIAN(salary)": "50"
+    }
+    assert database.aggregate(
+        "employees", "salary", "APPROX_PERCENTILE", percentile=0.9
+    ) == {"APPROX_PERCENTILE(salary)": "90"}
+    monkeypatch.undo()
+
+    # Без скетча и с группировкой скетчи строятся по строкам
+    assert database.aggregate(
+        "employees", "name", "APPROX_COUNT_DISTINCT"
+    ) == {"APPROX_COUNT_DISTINCT(name)": "100"}
+    assert database.aggregate(
+        "employees", "salary", "APPROX_MEDIAN", group_by="age"
+    )[:2] == [
+        {"age": 21, "APPROX_MEDIAN(salary)": "41"},
+        {"age": 22, "APPROX_MEDIAN(salary)": "42"},
+    ]
+
+    Database(memory_limit=10)
+    assert (
+        len(
+            database.aggregate(
+                "employees", "id", "APPROX_COUNT_DISTINCT", group_by="age"
+            )
+        )
+        == 10
+    )
+
+    with pytest.raises(ValueError):
+        database.aggregate(
+            "employees", "salary", "APPROX_PERCENTILE", percentile=2
+        )
+
+    # Компактизация перестраивает скетчи без удаленных строк
+    database.delete("employees", {"department_id": 100})
+    table.compact()
+    assert database.aggregate(
+        "employees", "salary", "APPROX_PERCENTILE", percentile=1
+    ) == {"APPROX_PERCENTILE(salary)": "99"}
+
+
+def test_import_and_export_files(database, tmp_path):
+    csv_path = tmp_path / "projects.csv"
+    csv_path.write_text(
+        "id,name,start_date,end_date\n"
+        '1,"Website Redesign, phase 2",2024-01-15,2024-03-15\n'
+        "2,CRM Development,2024-02-01,2024-08-01\n"
+        "3,HR Automation,2024-01-20,2024-04-20\n"
+    )
+
+    assert database.import_file("projects", str(csv_path), batch_size=2) == 3
+    assert database.select("projects", 1, 1)[0]["name"] == (
+        "Website Redesign, phase 2"
+    )
+
+    # Пачка с ошибкой не вставляется, предыдущие пачки остаются
+    csv_path.write_text(
+        "id,name,start_date,end_date\n"
+        "4,Internal Wiki,2024-02-05,2024-04-05\n"
+        "5,Data Migration,2024-05-01,2024-07-31\n"
+        "6,Cloud Setup,2024-06-01,2024-12-01\n"
+        "6,Cloud Setup,2024-06-01,2024-12-01\n"
+    )
+
+    with pytest.raises(ValueError, match="repeat"):
+        database.import_file("projects", str(csv_path), batch_size=2)
+
+    assert [row["id"] for row in database.select("projects", 1, 9)] == [
+        1,
+        2,
+        3,
+        4,
+        5,
+    ]
+
+    database.tables["projects"].load()
+    assert len(database.select("projects", 1, 9)) == 5
+
+    jsonl_path = tmp_path / "employees_projects.jsonl"
+    jsonl_path.write_text(
+        '{"employee_id": 1, "project_id": 1, "role": "Developer"}\n\n'
+        '{"employee_id": "2", "project_id": 2, "role": "Tester"}\n'
+    )
+    assert database.import_file("employees_projects", str(jsonl_path)) == 2
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+
+    export_path = str(tmp_path / "joined.csv")
+    assert (
+        database.export_file(
+            export_path,
+            database.iter_join(
+                ("employees", "employees_projects", "projects"),
+                [
+                    ("employees.id", "employees_projects.employee_id"),
+                    ("employees_projects.project_id", "projects.id"),
+                ],
+            ),
+        )
+        == 2
+    )
+    assert [row["projects.name"] for row in bulk.read_file(export_path)] == [
+        "Website Redesign, phase 2",
+        "CRM Development",
+    ]
+
+    export_path = str(tmp_path / "aggregate.jsonl")
+    assert (
+        database.export_file(
+            export_path, database.aggregate("employees", "salary", "SUM")
+        )
+        == 1
+    )
+    assert list(bulk.read_file(export_path)) == [{"SUM(salary)": "110000"}]
+
+    with pytest.raises(ValueError):
+        database.import_file("missing", str(jsonl_path))
+
+    with pytest.raises(ValueError):
+        database.import_file("employees", str(tmp_path / "rows.txt"))
+
+
+def test_import_reports_all_invalid_rows(database, tmp_path):
+    csv_path = tmp_path / "projects.csv"
+    csv_path.write_text(
+        "id,name,start_date,end_date\n"
+        "1,Website Redesign,2024-01-15,2024-03-15\n"
+        "2,CRM Development,2024-02-01,2024-08-01\n"
+        "3,HR Automation,2024-01-20,2024-04-20\n"
+        "x,Internal Wiki,2024-02-05,2024-04-05\n"
+        "5,Cloud Setup,2024-06-01,2024-04-31\n"
+        "6,Mobile App,2024-12-01,2024-06-01\n"
+    )
+
+    with pytest.raises(ValueError) as error:
+        database.import_file("projects", str(csv_path), batch_size=3)
+
+    # Ошибки второй пачки нумеруются от начала файла
+    assert str(error.value).splitlines() == [
+        "Found 3 invalid row(s):",
+        "row 4: Value 'x' of column 'id' is not a valid 'int'.",
+        "row 5: Value '2024-04-31' of column 'end_date' is not "
+        "a valid 'date'.",
+        "row 6: Invalid date range: 'start_date' (2024-12-01) "
+        "cannot be later than 'end_date' (2024-06-01).",
+    ]
+    assert len(database.select("projects", 1, 9)) == 3
+
+    with pytest.raises(ValueError) as error:
+        database.tables["projects"].insert_many(
+            [
+                {"id": 1, "name": "Website Redesign"},
+                {"id": 2, "title": "CRM Development"},
+                {
+                    "id": "3",
+                    "name": "HR Automation",
+                    "start_date": "2024-01-20",
+                    "end_date": "2024-04-20",
+                },
+            ]
+        )
+
+    assert str(error.value).splitlines() == [
+        "Found 2 invalid row(s):",
+        "row 1: Value of column 'start_date' is missing.",
+        "row 2: 'title' is not an attribute of the 'ProjectTable'.",
+    ]
+
+    with pytest.raises(ValueError, match="row 1: Invalid date range"):
+        database.update("projects", {"id": 1}, {"end_date": "2024-01-01"})
+
+    # Строки без дат, добавленные в обход разбора, не сравниваются
+    projects = database.tables["projects"]
+    start = date(2024, 1, 15)
+    assert projects._batch_errors(
+        {
+            0: {"id": 7, "name": "-", "start_date": start, "end_date": None},
+            1: {"id": 8, "name": "-", "start_date": start, "end_date": start},
+        }
+    ) == {0: "Value of column 'end_date' is missing."}
+
+
+def test_import_rejects_missing_and_wrong_typed_values(
+    database, tmp_path, monkeypatch
+):
+    csv_path = tmp_path / "employees.csv"
+    csv_path.write_text(
+        "id,name,age,salary,department_id\n"
+        "1,John,28,50000,1\n"
+        "2,Jane,34\n"
+    )
+
+    with pytest.raises(ValueError) as error:
+        database.import_file("employees", str(csv_path))
+
+    assert str(error.value).splitlines() == [
+        "Found 1 invalid row(s):",
+        "row 2: Value of column 'salary' is missing.",
+    ]
+
+    with pytest.raises(ValueError) as error:
+        database.tables["projects"].insert_many(
+            [
+                {
+                    "id": 1,
+                    "name": "Website Redesign",
+                    "start_date": 5,
+                    "end_date": date(2024, 3, 15),
+                },
+                {
+                    "id": True,
+                    "name": None,
+                    "start_date": date(2024, 1, 15),
+                    "end_date": date(2024, 3, 15),
+                },
+            ]
+        )
+
+    assert str(error.value).splitlines() == [
+        "Found 2 invalid row(s):",
+        "row 1: Value '5' of column 'start_date' is not a valid 'date'.",
+        "row 2: Value 'True' of column 'id' is not a valid 'int'.",
+    ]
+
+    with pytest.raises(ValueError, match="'age' is missing"):
+        database.update("employees", {"id": 1}, {"age": None})
+
+    # Проверки данных подклассов сообщают об ошибках по строкам
+    def validate_data(new_row):
+        if new_row["age"] < 18:
+            raise ValueError("Employee is too young.")
+
+    employees = database.tables["employees"]
+    monkeypatch.setattr(employees, "_validate_data", validate_data)
+
+    with pytest.raises(ValueError, match="row 1: Employee is too young"):
+        employees.insert_many(
+            [dict(zip(employees.ATTRS, (3, "Bob", 16, 1, 3)))]
+        )
+
+    # В файл ничего не записано, и таблицы загружаются
+    for table_name in ("employees", "projects"):
+        database.tables[table_name].load()
+        assert database.tables[table_name].data == []
+
+
+def test_create_table(database, tmp_path):
+    path = str(tmp_path / "goods.csv")
+    goods = database.create_table(
+        "goods",
+        ("id", "name", "category", "price"),
+        {"id": int, "price": float},
+        unique=("id",),
+        indexes=("category",),
+        storage=path,
+    )
+
+    assert database.tables["goods"] is goods
+    assert type(goods).__name__ == "GoodsTable"
+    assert set(goods.indexes) == {("id",), ("category",)}
+
+    database.insert("goods", "1 Pen office 1.5")
+    database.insert("goods", "2 Desk furniture 120")
+    database.insert("goods", "3 Paper office 4.25")
+
+    assert database.select("goods", category="office") == [
+        {"id": 1, "name": "Pen", "category": "office", "price": 1.5},
+        {"id": 3, "name": "Paper", "category": "office", "price": 4.25},
+    ]
+    assert database.select("goods", id="2")[0]["name"] == "Desk"
+    assert [
+        row["id"] for row in database.select("goods", order_by="price")
+    ] == [1, 3, 2]
+
+    with pytest.raises(ValueError, match="must be unique"):
+        database.insert("goods", "1 Chair furniture 80")
+
+    # Строки читаются из файла таблицы новым классом с тем же описанием
+    goods = database.create_table(
+        "goods_copy",
+        ("id", "name", "category", "price"),
+        {"id": int, "price": float},
+        unique=("id",),
+        storage=path,
+    )
+    assert type(goods).__name__ == "GoodsCopyTable"
+    assert len(goods.select()) == 3
+
+    with pytest.raises(ValueError, match="'cost' is not a column"):
+        database.create_table("goods", ("id", "name"), indexes=("cost",))
+
+    with pytest.raises(ValueError, match="must be unique and not empty"):
+        database.create_table("goods", ("id", "id"))
+
+    with pytest.raises(TypeError):
+        database.create_table("goods", ("id", "name"), {"id": bytes})
+
+    assert database.tables["goods"] is not goods
+    del database.tables["goods"], database.tables["goods_copy"]
+
+
+def test_named_databases_and_lazy_tables(database):
+    assert Database() is database
+    tenant = Database(name="tenant")
+    assert Database(name="tenant") is tenant
+    assert tenant is not database and tenant.name == "tenant"
+    assert Database(name=None) is not Database(name=None)
+
+    # Аргументы повторного вызова применяются к существующему экземпляру
+    assert Database(5, memory_budget=100) is database
+    assert (database.memory_limit, database.memory_budget) == (5, 100)
+    Database(memory_limit=None, memory_budget=None)
+
+    with pytest.raises(TypeError):
+        Database(memory_size=100)
+
+    database.insert("employees", "1 John 28 50000 1")
+    created = []
+
+    def employees():
+        table = EmployeeTable(load_data=False)
+        table.FILE_PATH = database.tables["employees"].FILE_PATH
+        table.load()
+        created.append(table)
+        return table
+
+    tenant.register_table("employees", employees)
+    tenant.register_table("departments", DepartmentTable)
+
+    # Отложенные таблицы не создаются до первого обращения к ним
+    tenant.load_all()
+    assert "employees" in tenant.tables and created == []
+    assert list(tenant.tables) == ["employees", "departments"]
+    assert tenant.tables.created() == {}
+
+    assert tenant.select("employees", 1, 1)[0]["name"] == "John"
+    assert tenant.select("employees", 1, 1)[0]["name"] == "John"
+    assert list(tenant.tables.created().values()) == created
+    assert len(created) == 1
+    assert database.tables["employees"] is not created[0]
+
+    tenant.register_table("departments", DepartmentTable(load_data=False))
+    assert len(tenant.tables.created()) == 2
+    tenant.register_table("projects", ProjectTable)
+    del tenant.tables["projects"]
+    del tenant.tables["employees"]
+    assert len(tenant.tables) == 1
+
+    with pytest.raises(KeyError):
+        tenant.tables["employees"]
+
+
+def test_memory_budget(database):
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "2,1,Project Manager")
+    database.insert("employees_projects", "1,2,Developer")
+    database.insert("employees_projects", "2,2,Tester")
+
+    usage = database.memory_usage()
+    employees = database.tables["employees"]
+    assert usage["budget"] is None and usage["queries"] == 0
+    assert usage["tables"]["employees"] == employees.memory_usage() > 0
+    assert usage["total"] == sum(usage["tables"].values())
+
+    tables = ("employees", "employees_projects")
+    join_attrs = [("employees.id", "employees_projects.employee_id")]
+    data = database.join(tables=tables, join_attrs=join_attrs)
+
+    # Свободной памяти хватает на две строки из четырех, и соединение
+    # выполняется по разделам
+    row_size = database.tables["employees_projects"].row_size()
+    Database(memory_budget=usage["total"] + 2 * row_size)
+    rows = database.iter_join(tables=tables, join_attrs=join_attrs)
+    first = next(rows)
+    assert database.memory_usage()["queries"] == 2 * row_size
+    res = [first, *rows]
+    assert database.memory_usage()["queries"] == 0
+
+    def key(row):
+        return row["employees.id"], row["employees_projects.project_id"]
+
+    assert sorted(res, key=key) == sorted(data, key=key)
+
+    # Без свободной памяти запрос отклоняется
+    Database(memory_budget=usage["total"])
+
+    with pytest.raises(MemoryError):
+        database.join(tables=tables, join_attrs=join_attrs)
+
+    with pytest.raises(MemoryError):
+        database.aggregate("employees", "age", "AVG", group_by="department_id")
+
+
+def test_memory_budget_unloads_lazy_tables(database):
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("departments", "1 HR")
+    tenant = Database(name="evicting")
+
+    def factory(table_class, table_name):
+        def create():
+            table = table_class(load_data=False)
+            table.FILE_PATH = database.tables[table_name].FILE_PATH
+            table.load()
+            return table
+
+        return create
+
+    tenant.register_table("employees", factory(EmployeeTable, "employees"))
+    tenant.register_table(
+        "departments", factory(DepartmentTable, "departments")
+    )
+    tenant.tables["employees"]
+    Database(memory_budget=tenant.memory_usage()["total"], name="evicting")
+
+    # Давно использованная таблица выгружается, чтобы загрузить новую
+    departments = tenant.tables["departments"]
+    assert departments.data[0]["department_name"] == "HR"
+    assert list(tenant.tables.created()) == ["departments"]
+    assert tenant.select("employees", 1, 1)[0]["name"] == "John"
+    assert list(tenant.tables.created()) == ["employees"]
+
+    # Выгруженная таблица не используется, а подготовленные запросы
+    # составляются заново по загруженной
+    employees = tenant.tables["employees"]
+    find = tenant.prepare("find", "employees", "id")
+    tenant.tables["departments"]
+    assert list(tenant.tables.created()) == ["departments"]
+
+    for use in (
+        lambda: employees.find({"id": 1}),
+        lambda: list(employees.rows()),
+        employees.snapshot,
+        lambda: employees.insert("2 Jane 34 60000 2"),
+    ):
+        with pytest.raises(ValueError, match="was unloaded"):
+            use()
+
+    tenant.insert("employees", "2 Jane 34 60000 2")
+    assert find.execute(2)[0]["name"] == "Jane"
+
+    # Таблица со снимком не выгружается
+    snapshot = tenant.tables["employees"].snapshot()
+    tenant.tables["departments"]
+    assert len(tenant.tables.created()) == 2
+    del snapshot
+
+
+def test_insert_quoted_csv_values(database):
+    database.insert("projects", '1,"Website, Redesign",2024-01-15,2024-03-15')
+
+    assert database.select("projects", 1, 1)[0]["name"] == "Website, Redesign"
+
+
+def test_prepared_queries(database, monkeypatch):
+    database.insert("employees", "1 John 28 50000 1")
+    database.insert("employees", "2 Jane 34 60000 2")
+    database.insert("employees_projects", "1,1,Developer")
+    database.insert("employees_projects", "2,1,Tester")
+    database.insert("employees_projects", "2,2,Tester")
+
+    tables = ("employees", "employees_projects")
+    join_attrs = [("employees.id", "employees_projects.employee_id")]
+    join = database.prepare(
+        "join", tables, join_attrs, order_by="employees.age", limit=2
+    )
+    iter_join = database.prepare("iter_join", tables, join_attrs)
+    aggregate = database.prepare(
+        "aggregate",
+        "employees_projects",
+        "employee_id",
+        "COUNT",
+        group_by="role",
+    )
+    find = database.prepare("find", "employees_projects", "project_id")
+
+    # Выполнение не повторяет проверок и разбора аргументов
+    monkeypatch.setattr(database, "_plan_join", None)
+    monkeypatch.setattr(database, "_plan_aggregate", None)
+    monkeypatch.setattr(database, "tables", {})
+    monkeypatch.setattr(EmployeeProjectTable, "_coerce", None)
+    monkeypatch.setattr(EmployeeProjectTable, "_check_attrs", None)
+
+    assert [row["employees.name"] for row in join.execute()] == [
+        "John",
+        "Jane",
+    ]
+    assert len(list(iter_join.execute())) == 3
+    assert aggregate.execute() == [
+        {"role": "Developer", "COUNT(employee_id)": "1"},
+        {"role": "Tester", "COUNT(employee_id)": "2"},
+    ]
+    assert [row["employee_id"] for row in find.execute(1)] == [1, 2]
+    assert find.execute("2")[0]["role"] == "Tester"
+    assert find.execute(3) == []
+    monkeypatch.undo()
+
+    # Новые строки видны подготовленным запросам
+    database.insert("employees_projects", "1,2,Developer")
+    assert len(find.execute(2)) == 2
+
+    by_role = database.prepare(
+        "find", "employees_projects", ("role", "employee_id")
+    )
+    assert [row["project_id"] for row in by_role.execute("Tester", 2)] == [
+        1,
+        2,
+    ]
+
+    with pytest.raises(ValueError):
+        find.execute(1, 2)
+
+    with pytest.raises(ValueError):
+        database.prepare("find", "employees_projects", "rank")
+
+    with pytest.raises(ValueError):
+        database.prepare("find", "missing", "id")
+
+    with pytest.raises(ValueError):
+        database.prepare("join", tables, join_attrs, order_by="age")
+
+    with pytest.raises(ValueError):
+        database.prepare("aggregate", "employees", "age", "MEDIAN")
+
+    with pytest.raises(ValueError):
+        database.prepare("delete", "employees", {"id": 1})
+
+    with pytest.raises(TypeError, match="unexpected keyword arguments: id"):
+        database.prepare("find", "employees", "name", id=1)
+
+    with pytest.raises(TypeError, match="order_by"):
+        database.prepare("iter_join", tables, join_attrs, order_by="age")
+
+
+def test_prepared_find_on_partitioned_table(database, partitioned_table):
+    for employee_id, project_id in [(1, 1), (2, 1), (1, 2)]:
+        partitioned_table.insert(f"{employee_id},{project_id},Developer")
+
+    by_project = database.prepare("find", "employees_projects", "project_id")
+    by_employee = database.prepare("find", "employees_projects", "employee_id")
+
+    assert [row["employee_id"] for row in by_project.execute("1")] == [1, 2]
+    assert [row["project_id"] for row in by_employee.execute(1)] == [1, 2]
+
+    with pytest.raises(ValueError):
+        by_project.execute()
@@ -0,0 +1,103 @@
+import random
+
+from database.indexes import HashIndex, IntervalIndex, SortedIndex, UniqueIndex
+
+
+def test_hash_index():
+    data = [
+        {"employee_id": 1, "project_id": 1},
+        None,
+        {"employee_id": 2, "project_id": 1},
+        {"employee_id": 1, "project_id": 2},
+    ]
+    index = HashIndex(("employee_id",))
+    index.build(data)
+
+    assert index.lookup(1) == [0, 3]
+    assert index.lookup(3) == []
+
+    index.remove(data[0], 0)
+    index.remove(data[2], 2)
+    assert index.lookup(1) == [3]
+    assert 2 not in index.positions
+
+    composite = HashIndex(("employee_id", "project_id"))
+    composite.build(data)
+    assert composite.lookup((1, 2)) == [3]
+
+
+def test_unique_index():
+    index = UniqueIndex(("id",))
+    index.build([{"id": 1}, {"id": 2}])
+
+    assert index.lookup(2) == [1]
+    assert index.lookup(3) == []
+
+    index.remove({"id": 2}, 1)
+    assert index.lookup(2) == []
+
+
+def test_copy_index():
+    data = [{"id": 1, "role": "Developer"}, {"id": 2, "role": "Developer"}]
+    index = HashIndex(("role",))
+    unique = UniqueIndex(("id",))
+    index.build(data)
+    unique.build(data)
+    index_copy = index.copy()
+    unique_copy = unique.copy()
+
+    index.remove(data[0], 0)
+    unique.remove(data[0], 0)
+
+    assert index_copy.lookup("Developer") == [0, 1]
+    assert unique_copy.lookup(1) == [0]
+    assert index_copy.key is index.key
+
+    # Списки позиций копируются только при изменении
+    data.append({"id": 3, "role": "Tester"})
+    index.add(data[2], 2)
+    index_copy = index.copy()
+    assert index_copy.positions["Tester"] is index.positions["Tester"]
+
+    index_copy.add({"id": 4, "role": "Tester"}, 3)
+    index_copy.add({"id": 5, "role": "Manager"}, 4)
+    index_copy.add({"id": 6, "role": "Manager"}, 5)
+    index.remove(data[1], 1)
+    assert index.lookup("Tester") == [2] and index.lookup("Manager") == []
+    assert index_copy.lookup("Tester") == [2, 3]
+    assert index_copy.lookup("Manager") == [4, 5]
+    assert index_copy.lookup("Developer") == [1]
+
+
+def test_sorted_index():
+    rows = [{"d": d} for d in (5, None, 1, 3, 3, 9)]
+    index = SortedIndex("d", rows)
+
+    assert [row["d"] for row in index.range(3, 5)] == [3, 3, 5]
+    assert [row["d"] for row in index.range(high=3)] == [1, 3, 3]
+    assert [row["d"] for row in index.range(6)] == [9]
+    assert len(index.range()) == 5
+
+
+def test_interval_index_finds_intervals_containing_point():
+    random.seed(7)
+    rows = [
+        {"start": start, "end": start + random.randint(-2, 10)}
+        for start in (random.randint(0, 50) for _ in range(200))
+    ]
+    rows += [{"start": None, "end": 3}, {"start": 1, "end": None}]
+    index = IntervalIndex("start", "end", rows)
+
+    for point in range(-1, 63):
+        expected = [
+            row
+            for row in rows
+            if row["start"] is not None
+            and row["end"] is not None
+            and row["start"] <= point <= row["end"]
+        ]
+        found = list(index.stab(point))
+        assert len(found) == len(expected)
+        assert all(row in expected for row in found)
+
+    assert list(IntervalIndex("start", "end", []).stab(1)) == []
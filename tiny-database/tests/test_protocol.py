@@ -0,0 +1,22 @@
+from datetime import date
+
+import pytest
+from database import protocol
+from database.rows import row_type
+
+
+def test_encode_and_decode_messages():
+    row = row_type("ProjectTable", ("id", "start_date"))(1, date(2024, 1, 15))
+    line = protocol.encode({"result": [row]})
+
+    assert line.endswith(b"\n") and line.count(b"\n") == 1
+    assert protocol.decode(line) == {
+        "result": [{"id": 1, "start_date": date(2024, 1, 15)}]
+    }
+    assert protocol.decode(b'{"$date": "2024-01-15", "id": 1}') == {
+        "$date": "2024-01-15",
+        "id": 1,
+    }
+
+    with pytest.raises(TypeError):
+        protocol.encode({"result": object()})
@@ -0,0 +1,126 @@
+import pickle
+import sys
+
+import pytest
+from database.rows import (
+    ColumnDictionary,
+    encoded_row_type,
+    joined_row_type,
+    row_type,
+)
+
+
+def test_row_behaves_like_a_read_only_mapping():
+    Row = row_type("EmployeeRow", ("id", "name", "keys"))
+    row = Row("1", "John", "k")
+
+    assert row["id"] == "1"
+    assert row["keys"] == "k"
+    assert list(row) == ["id", "name", "keys"]
+    assert len(row) == 3
+    assert row.get("salary") is None
+    assert row == {"id": "1", "name": "John", "keys": "k"}
+    assert {"id": "1", "name": "John", "keys": "k"} == row
+    assert row.astuple() == ("1", "John", "k")
+    assert row.as_dict() == {"id": "1", "name": "John", "keys": "k"}
+    assert repr(row) == "EmployeeRow({'id': '1', 'name': 'John', 'keys': 'k'})"
+
+    with pytest.raises(KeyError):
+        row["salary"]
+
+    with pytest.raises(AttributeError):
+        row.salary = "50000"
+
+
+def test_row_type_is_cached_and_picklable():
+    Row = row_type("DepartmentRow", ("id",))
+    assert row_type("DepartmentRow", ("id",)) is Row
+
+    row = Row.from_mapping({"id": "1", "department_name": "HR"})
+    assert row.astuple() == ("1",)
+
+    restored = pickle.loads(pickle.dumps(row))
+    assert type(restored) is Row
+    assert restored == row
+
+
+def test_row_is_smaller_than_dict():
+    attrs = ("id", "name", "age", "salary", "department_id")
+    values = ("1", "John", "28", "50000", "1")
+
+    row = row_type("EmployeeRow", attrs)(*values)
+    assert sys.getsizeof(row) < sys.getsizeof(dict(zip(attrs, values))) / 2
+
+
+def test_encoded_row_stores_dictionary_codes():
+    dictionary = ColumnDictionary()
+    Row = encoded_row_type(
+        "EmployeeProjectRow",
+        ("employee_id", "project_id", "role"),
+        {"role": dictionary},
+    )
+
+    first = Row("1", "1", "Developer")
+    second = Row("2", "1", "Tester")
+    third = Row("3", "2", "Developer")
+
+    assert len(dictionary) == 2
+    assert dictionary.values == ["Developer", "Tester"]
+    assert [row.code("role") for row in (first, second, third)] == [0, 1, 0]
+    assert third["role"] == "Developer"
+    assert third.astuple() == ("3", "2", "Developer")
+    assert third == {
+        "employee_id": "3",
+        "project_id": "2",
+        "role": "Developer",
+    }
+
+    with pytest.raises(KeyError):
+        third.code("employee_id")
+
+    # После pickle строка восстанавливается без привязки к словарю
+    restored = pickle.loads(pickle.dumps(third))
+    assert type(restored) is row_type("EmployeeProjectRow", Row.ATTRS)
+    assert restored == third
+
+
+def test_joined_row_references_table_rows():
+    employee = {"id": 1, "name": "John", "department_id": 2}
+    department = row_type("DepartmentRow", ("id", "department_name"))(
+        2, "Finance"
+    )
+    JoinedRow = joined_row_type(
+        (
+            ("employees", ("id", "name", "department_id")),
+            ("departments", ("id", "department_name")),
+        )
+    )
+    row = JoinedRow(employee, department)
+
+    assert row.rows[0] is employee
+    assert row["departments.department_name"] == "Finance"
+    assert list(row) == [
+        "employees.id",
+        "employees.name",
+        "employees.department_id",
+        "departments.id",
+        "departments.department_name",
+    ]
+    assert len(row) == 5
+    assert row == {
+        "employees.id": 1,
+        "employees.name": "John",
+        "employees.department_id": 2,
+        "departments.id": 2,
+        "departments.department_name": "Finance",
+    }
+    assert repr(row).startswith("JoinedRow({'employees.id': 1,")
+    # Строка - ссылки на строки таблиц, а не копия их значений
+    assert sys.getsizeof(row) < sys.getsizeof(row.as_dict()) / 4
+
+    with pytest.raises(KeyError):
+        row["employees.salary"]
+
+    restored = pickle.loads(pickle.dumps(row))
+    assert type(restored) is JoinedRow
+    assert restored == row
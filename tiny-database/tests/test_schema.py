@@ -0,0 +1,19 @@
+from datetime import date
+
+import pytest
+from database import schema
+
+
+def test_parse_values_of_supported_types():
+    assert schema.parse("id", "1", int) == 1
+    assert schema.parse("salary", "1.5", float) == 1.5
+    assert schema.parse("start_date", "2024-01-15", date) == date(2024, 1, 15)
+    assert schema.parse("name", "John", str) == "John"
+
+
+def test_parse_invalid_values():
+    with pytest.raises(ValueError):
+        schema.parse("id", "one", int)
+
+    with pytest.raises(TypeError):
+        schema.parse("id", "1", complex)
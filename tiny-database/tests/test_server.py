@@ -0,0 +1,224 @@
+import socket
+import threading
+from datetime import date
+
+import pytest
+from database import client as client_module
+from database.client import Client
+from database.database import Database, EmployeeTable, ProjectTable
+from database.server import make_server
+
+
+@pytest.fixture
+def database(tmp_path):
+    db = Database()
+
+    employee_table = EmployeeTable(load_data=False)
+    employee_table.FILE_PATH = str(tmp_path / "employees.csv")
+    project_table = ProjectTable(load_data=False)
+    project_table.FILE_PATH = str(tmp_path / "projects.csv")
+
+    db.tables = {}
+    db.register_table("employees", employee_table)
+    db.register_table("projects", project_table)
+
+    return db
+
+
+@pytest.fixture(params=["unix", "tcp"])
+def address(request, database, tmp_path):
+    """Запускает сервер в отдельном потоке и возвращает его адрес."""
+    if request.param == "unix":
+        server = make_server(database, str(tmp_path / "database.sock"))
+    else:
+        server = make_server(database, ("127.0.0.1", 0))
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    yield server.server_address
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_client_calls_database_methods(address):
+    with Client(address, pool_size=2) as client:
+        client.insert("employees", "1 John 28 50000 1")
+        client.insert("employees", "2 Jane 34 60000 2")
+        client.insert("projects", "1,Website Redesign,2024-01-15,2024-03-15")
+
+        assert client.select("employees", 1, 1) == [
+            {
+                "id": 1,
+                "name": "John",
+                "age": 28,
+                "salary": 50000,
+                "department_id": 1,
+            }
+        ]
+        assert client.select("projects", 1, 1)[0]["start_date"] == date(
+            2024, 1, 15
+        )
+        assert client.update("employees", {"id": 2}, {"age": 35}) == 1
+        assert client.aggregate(
+            "employees", "age", "MAX", group_by="department_id"
+        ) == [
+            {"department_id": 1, "MAX(age)": "28"},
+            {"department_id": 2, "MAX(age)": "35"},
+        ]
+        assert (
+            len(
+                client.join(
+                    ("employees", "projects"),
+                    [("employees.id", "projects.id")],
+                )
+            )
+            == 1
+        )
+        assert (
+            client.join(
+                ("employees", "projects"),
+                [("employees.id", "projects.id")],
+                order_by="employees.age",
+                limit=1,
+            )[0]["projects.name"]
+            == "Website Redesign"
+        )
+        assert client.delete("employees", {"id": 2}) == 1
+
+        with pytest.raises(ValueError, match="does not exist"):
+            client.insert("departments", "1 HR")
+
+        with pytest.raises(TypeError):
+            client.aggregate("employees", "name", "SUM")
+
+        # Соединение остается пригодным после ошибки запроса
+        assert client.select("employees", 1, 9)[0]["name"] == "John"
+
+
+def test_pipeline(address):
+    client = Client(address)
+    pipe = client.pipeline()
+
+    assert pipe.execute() == []
+
+    for i in range(1, 4):
+        pipe.insert("employees", f"{i} Employee{i} {20 + i} 50000 {i}")
+
+    pipe.select("employees", 1, 9)
+    pipe.aggregate("employees", "age", "SUM")
+    results = pipe.execute()
+
+    assert results[:3] == [None, None, None]
+    assert [row["name"] for row in results[3]] == [
+        "Employee1",
+        "Employee2",
+        "Employee3",
+    ]
+    assert results[4] == {"SUM(age)": "66"}
+
+    # Ошибка одного запроса выбрасывается после чтения всех ответов
+    pipe.insert("employees", "1 Duplicate 30 50000 9")
+    pipe.delete("employees", {"id": 3})
+
+    with pytest.raises(ValueError, match="must be unique"):
+        pipe.execute()
+
+    assert client.select("employees", 1, 9)[-1]["id"] == 2
+    client.close()
+
+
+def test_client_pool(address):
+    client = Client(address, pool_size=2)
+    client.insert("employees", "1 John 28 50000 1")
+    results = []
+
+    def select():
+        for _ in range(20):
+            results.append(client.select("employees", 1, 1)[0]["name"])
+
+    threads = [threading.Thread(target=select) for _ in range(4)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert results == ["John"] * 80
+
+    connections = []
+
+    while not client._pool.empty():
+        connections.append(client._pool.get_nowait())
+
+    assert 1 <= len([c for c in connections if c is not None]) <= 2
+    assert len(connections) == 2
+
+    for connection in connections:
+        client._pool.put(connection)
+
+    client.close()
+
+
+def test_server_rejects_unknown_methods(database):
+    server = make_server(database, ("127.0.0.1", 0))
+
+    assert b"not supported" in server.execute(b'{"method": "load_all"}\n')
+    assert b"RuntimeError" not in server.execute(b"{")
+
+    server.server_close()
+
+
+def test_client_reconnects_after_connection_error(address):
+    client = Client(address, pool_size=1)
+    client.insert("employees", "1 John 28 50000 1")
+
+    # Соединение, закрытое сервером, отбрасывается из пула
+    connection = client._pool.get_nowait()
+    connection.socket.shutdown(socket.SHUT_RDWR)
+    client._pool.put(connection)
+
+    with pytest.raises(OSError):
+        client.select("employees", 1, 1)
+
+    assert client.select("employees", 1, 1)[0]["name"] == "John"
+    client.close()
+
+
+def test_large_pipeline(address, monkeypatch):
+    monkeypatch.setattr(client_module, "WINDOW_SIZE", 1 << 10)
+    client = Client(address)
+    client.insert("employees", "1 John 28 50000 1")
+    pipe = client.pipeline()
+
+    # Ответы намного больше буферов сокетов
+    for _ in range(20000):
+        pipe.select("employees", 1, 1)
+
+    results = pipe.execute()
+
+    assert len(results) == 20000
+    assert results[-1][0]["name"] == "John"
+    client.close()
+
+
+def test_connection_closed_by_server():
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def close_after_request():
+        connection, _ = listener.accept()
+        connection.makefile("rb").readline()
+        connection.close()
+
+    thread = threading.Thread(target=close_after_request)
+    thread.start()
+    client = Client(listener.getsockname())
+
+    with pytest.raises(ConnectionError, match="closed by the server"):
+        client.select("employees", 1, 1)
+
+    thread.join()
+    listener.close()
@@ -0,0 +1,32 @@
+from datetime import date
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import ShareableList
+
+from database import shared
+
+
+def test_attach_to_segment_of_other_process(tmp_path):
+    name = f"tiny_database_{tmp_path.name}"
+    published = ShareableList(
+        [1, None, date(2024, 1, 15).toordinal()], name=name
+    )
+
+    attached = shared._attach(name)
+    rows = shared.SharedRows(
+        ("id", "start_date"),
+        [attached, attached],
+        [lambda value: value, shared._converter(date, 1)],
+        None,
+    )
+
+    assert len(rows) == 3
+    assert rows[0] == {"id": 1, "start_date": date(1, 1, 1)}
+    assert rows[1] == {"id": None, "start_date": None}
+    assert rows.key_getter(("id",))(2) == date(2024, 1, 15).toordinal()
+
+    attached.shm.close()
+    # Подключение сняло регистрацию сегмента, созданного в этом же
+    # процессе; возвращаем ее, чтобы unlink не обращался к пустой записи
+    resource_tracker.register(published.shm._name, "shared_memory")
+    published.shm.close()
+    published.shm.unlink()
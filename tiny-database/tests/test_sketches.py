@@ -0,0 +1,52 @@
+import random
+
+from database.sketches import ColumnSketch, HyperLogLog, KLLSketch
+
+
+def test_hyperloglog():
+    hll = HyperLogLog(0.01)
+    assert hll.p == 14 and hll.count() == 0
+
+    for i in range(200000):
+        hll.add(i % 50000)
+
+    assert abs(hll.count() - 50000) < 50000 * 0.03
+
+    assert HyperLogLog(0.5).m == 16
+    small = HyperLogLog(0.1)
+
+    for value in ["a", "b", "c", "a"]:
+        small.add(value)
+
+    assert small.count() == 3
+
+
+def test_kll_sketch():
+    random.seed(1)
+    values = list(range(100000))
+    random.shuffle(values)
+    kll = KLLSketch(0.01)
+
+    assert kll.quantile(0.5) is None
+
+    for value in values:
+        kll.add(value)
+
+    # Скетч хранит O(k) значений, а не все
+    assert kll.size < 3 * kll.k + 100
+    assert len(kll.compactors) > 1
+
+    for q in (0.1, 0.5, 0.9):
+        assert abs(kll.quantile(q) - q * 100000) < 100000 * 0.02
+
+    assert kll.quantile(0) == min(
+        min(items, default=100000) for items in kll.compactors
+    )
+
+
+def test_column_sketch():
+    sketch = ColumnSketch.of([3, None, 1, 2, 2], 0.01)
+
+    assert sketch.distinct() == 3
+    assert sketch.quantile(0.5) == 2
+    assert sketch.quantile(1) == 3
@@ -0,0 +1,31 @@
+from database.spill import SpillFile, partition
+
+
+def test_spill_file_returns_written_objects():
+    spill_file = SpillFile()
+    spill_file.write({"id": "1"})
+    spill_file.write(("2", 2.5))
+
+    assert spill_file.count == 2
+    assert list(spill_file) == [{"id": "1"}, ("2", 2.5)]
+    # Файл можно перечитывать повторно
+    assert list(spill_file) == [{"id": "1"}, ("2", 2.5)]
+
+    spill_file.close()
+
+
+def test_partition_keeps_equal_keys_together():
+    items = [(key % 5, value) for value, key in enumerate(range(50))]
+    parts = partition(items, lambda item: item[0], 4)
+
+    assert len(parts) == 4
+    assert sum(part.count for part in parts) == len(items)
+
+    seen_keys = set()
+    for part in parts:
+        keys = {key for key, _ in part}
+        assert not keys & seen_keys
+        seen_keys |= keys
+        part.close()
+
+    assert seen_keys == set(range(5))
@@ -0,0 +1,92 @@
+import gc
+import io
+from datetime import date
+
+import pytest
+from database import storage
+from database.rows import row_type
+
+
+def test_read_rows_of_empty_file():
+    assert storage.read_rows(io.StringIO("")) == []
+    assert storage.read_rows(io.StringIO("id,name\n")) == []
+
+
+def test_read_rows_without_quoting(monkeypatch):
+    # Маленькие пачки, чтобы файл читался в несколько заходов
+    monkeypatch.setattr(storage, "CHUNK_SIZE", 8)
+    f = io.StringIO("id,name\n1,John\n2,Jane\n3,Alice")
+
+    assert storage.read_rows(f) == [
+        {"id": "1", "name": "John"},
+        {"id": "2", "name": "Jane"},
+        {"id": "3", "name": "Alice"},
+    ]
+
+
+def test_read_rows_with_quoted_values():
+    f = io.StringIO('id,name\n1,John\n2,"Smith, Jane"\n3,"Multi\nline"\n')
+
+    assert storage.read_rows(f) == [
+        {"id": "1", "name": "John"},
+        {"id": "2", "name": "Smith, Jane"},
+        {"id": "3", "name": "Multi\nline"},
+    ]
+
+
+def test_read_rows_with_irregular_lines():
+    f = io.StringIO("id,name\n1,John\n\n2\n3,Alice,extra\n")
+
+    assert storage.read_rows(f) == [
+        {"id": "1", "name": "John"},
+        {"id": "2", "name": None},
+        {"id": "3", "name": "Alice", None: ["extra"]},
+    ]
+
+
+def test_read_rows_into_compact_rows():
+    Row = row_type("EmployeeRow", ("id", "name", "salary"))
+    f = io.StringIO('name,id\nJohn,1\n"Smith, Jane",2\n')
+
+    rows = storage.read_rows(f, Row)
+
+    assert all(type(row) is Row for row in rows)
+    assert [row.astuple() for row in rows] == [
+        ("1", "John", None),
+        ("2", "Smith, Jane", None),
+    ]
+
+
+def test_read_rows_with_column_types():
+    types = (("id", int), ("start_date", date))
+    text = "id,name,start_date\n1,Wiki,2024-01-15\n"
+
+    assert storage.read_rows(io.StringIO(text), types=types) == [
+        {"id": 1, "name": "Wiki", "start_date": date(2024, 1, 15)}
+    ]
+
+    # Разбор типов выполняется и на медленном пути с кавычками
+    text += '2,"Website, Redesign",2024-02-01\n'
+    Row = row_type("ProjectRow", ("id", "name", "start_date"))
+    rows = storage.read_rows(io.StringIO(text), Row, types)
+    assert [row.astuple() for row in rows] == [
+        (1, "Wiki", date(2024, 1, 15)),
+        (2, "Website, Redesign", date(2024, 2, 1)),
+    ]
+
+    with pytest.raises(ValueError):
+        storage.read_rows(io.StringIO("id\none\n"), types=types)
+
+
+def test_read_rows_does_not_switch_garbage_collector():
+    assert gc.isenabled()
+    storage.read_rows(io.StringIO("id,name\n1,John\n"))
+    assert gc.isenabled()
+
+    gc.disable()
+
+    try:
+        storage.read_rows(io.StringIO("id,name\n1,John\n"))
+        assert not gc.isenabled()
+    finally:
+        gc.enable()